@@ -0,0 +1,250 @@
+"""
+Codeforces Tutor - Activity timelines
+A handle's submissions sorted by creationTimeSeconds, with prefix sums per
+verdict and, over the accepted submissions, per rating bucket and for first
+solves of a problem. The number of submissions (or of any bucket) in a time
+window is a difference of two prefix sums at positions found by bisection, so
+"last 7/30/90/365 days", the daily heatmap and the streaks never rescan the
+submission list. The rating history gets the same treatment.
+
+Days are local calendar days, like the dates shown elsewhere in the app.
+"""
+
+import bisect
+from array import array
+from datetime import date, datetime, time, timedelta
+from itertools import accumulate, islice, repeat
+from operator import eq
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from records import as_submissions
+
+WINDOW_DAYS = (7, 30, 90, 365)
+# The heatmap shows this many whole weeks, the current one last
+HEATMAP_WEEKS = 53
+# Heatmap cell level n (1-4) starts at HEATMAP_LEVELS[n - 1] submissions
+HEATMAP_LEVELS = (1, 3, 6, 10)
+
+_PENDING_VERDICTS = (None, 'TESTING')
+
+
+def day_start(day: date) -> int:
+    """Timestamp of the local midnight starting `day`"""
+    return int(datetime.combine(day, time.min).timestamp())
+
+
+def day_of(timestamp: int) -> int:
+    """Local calendar day (date ordinal) of a timestamp"""
+    return date.fromtimestamp(timestamp).toordinal()
+
+
+def window_bounds(days: int, today: date) -> Tuple[int, int]:
+    """[start, end) timestamps of the last `days` days, today included"""
+    return day_start(today - timedelta(days=days - 1)), day_start(today + timedelta(days=1))
+
+
+def _prefix(flags: Iterable) -> array:
+    return array('I', accumulate(flags, initial=0))
+
+
+def _extend_prefix(prefix: array, flags: Iterable):
+    prefix.extend(islice(accumulate(flags, initial=prefix[-1]), 1, None))
+
+
+def _matches(values: List, value) -> Iterable[bool]:
+    return map(eq, values, repeat(value))
+
+
+class SubmissionTimeline:
+    """Sorted submission times of one handle with per-bucket prefix sums"""
+
+    def __init__(self, submissions: Iterable = ()):
+        self.times = array('q')
+        # verdict -> prefix counts over all submissions (index i: among the first i)
+        self.verdicts: Dict[str, array] = {}
+        # over accepted submissions only: their times, prefix counts per rating
+        # bucket and of first solves (the first accepted submission of a problem)
+        self.accepted_times = array('q')
+        self.ratings: Dict[int, array] = {}
+        self.first_solves = array('I', [0])
+        self.solved = set()
+        # distinct active days (sorted date ordinals) and the longest run of consecutive ones
+        self.days = array('q')
+        self.longest_streak = 0
+        self._run = 0
+        self._next_day_start = None
+        self.max_id = None
+        # submissions still being judged; their verdict may change later
+        self.pending_ids = set()
+        self.extend(submissions)
+
+    def __len__(self):
+        return len(self.times)
+
+    def extend(self, submissions: Iterable) -> bool:
+        """Add submissions newer than all known ones; False (nothing added) if some are older"""
+        rows = sorted((s for s in as_submissions(submissions) if s.creationTimeSeconds is not None),
+                      key=lambda s: (s.creationTimeSeconds, s.id or 0))
+        if not rows:
+            return True
+        if self.times and rows[0].creationTimeSeconds < self.times[-1]:
+            return False
+
+        n = len(self.times)
+        verdicts = [s.verdict or 'UNKNOWN' for s in rows]
+        for verdict in set(verdicts) - set(self.verdicts):
+            self.verdicts[verdict] = array('I', [0] * (n + 1))
+        for verdict, prefix in self.verdicts.items():
+            _extend_prefix(prefix, _matches(verdicts, verdict))
+        self.times.extend(s.creationTimeSeconds for s in rows)
+
+        accepted = [s for s in rows if s.verdict == 'OK']
+        ratings = [s.problem.rating // 100 * 100 if s.problem is not None and s.problem.rating is not None else None
+                   for s in accepted]
+        for bucket in set(ratings) - set(self.ratings) - {None}:
+            self.ratings[bucket] = array('I', [0] * len(self.first_solves))
+        for bucket, prefix in self.ratings.items():
+            _extend_prefix(prefix, _matches(ratings, bucket))
+        first = []
+        for submission in accepted:
+            key = submission.problem.key if submission.problem is not None else None
+            first.append(key is not None and key not in self.solved)
+            if key is not None:
+                self.solved.add(key)
+        _extend_prefix(self.first_solves, first)
+        self.accepted_times.extend(s.creationTimeSeconds for s in accepted)
+
+        for submission in rows:
+            # rows are sorted, so the day only changes past the next midnight
+            if self._next_day_start is None or submission.creationTimeSeconds >= self._next_day_start:
+                day = day_of(submission.creationTimeSeconds)
+                self._add_day(day)
+                self._next_day_start = day_start(date.fromordinal(day + 1))
+            if submission.verdict in _PENDING_VERDICTS:
+                self.pending_ids.add(submission.id)
+            if submission.id is not None and (self.max_id is None or submission.id > self.max_id):
+                self.max_id = submission.id
+        return True
+
+    def _add_day(self, day: int):
+        self._run = self._run + 1 if self.days and self.days[-1] == day - 1 else 1
+        self.longest_streak = max(self.longest_streak, self._run)
+        self.days.append(day)
+
+    def _span(self, times: array, start: int, end: int) -> Tuple[int, int]:
+        return bisect.bisect_left(times, start), bisect.bisect_left(times, end)
+
+    def count(self, start: int, end: int) -> int:
+        """Submissions made in [start, end)"""
+        lo, hi = self._span(self.times, start, end)
+        return hi - lo
+
+    def window(self, start: int, end: int) -> Dict:
+        """Counts for the submissions made in [start, end)"""
+        lo, hi = self._span(self.times, start, end)
+        verdicts = {verdict: prefix[hi] - prefix[lo] for verdict, prefix in self.verdicts.items()}
+        alo, ahi = self._span(self.accepted_times, start, end)
+        ratings = {bucket: prefix[ahi] - prefix[alo] for bucket, prefix in sorted(self.ratings.items())}
+        return {
+            'submissions': hi - lo,
+            'accepted': verdicts.get('OK', 0),
+            'verdicts': {verdict: count for verdict, count in verdicts.items() if count},
+            'newly_solved': self.first_solves[ahi] - self.first_solves[alo],
+            'rating_distribution': {bucket: count for bucket, count in ratings.items() if count},
+            'active_days': self.active_days(start, end),
+        }
+
+    def active_days(self, start: int, end: int) -> int:
+        """Days with a submission in [start, end); the first and last day may be partly outside"""
+        if end <= start:
+            return 0
+        first, last = day_of(start), day_of(end - 1)
+        lo, hi = self._span(self.days, first, last + 1)
+        active = hi - lo
+        # a partly covered day only counts if the submissions fall inside the window
+        if active and self.days[lo] == first and not self.count(start, min(end, day_start(date.fromordinal(first + 1)))):
+            active -= 1
+        if active and last != first and self.days[hi - 1] == last and not self.count(day_start(date.fromordinal(last)), end):
+            active -= 1
+        return active
+
+    def daily_counts(self, first_day: date, last_day: date) -> List[int]:
+        """Submissions on each day from first_day to last_day"""
+        bounds = [bisect.bisect_left(self.times, day_start(first_day + timedelta(days=offset)))
+                  for offset in range((last_day - first_day).days + 2)]
+        return [hi - lo for lo, hi in zip(bounds, bounds[1:])]
+
+    def current_streak(self, today: date) -> int:
+        """Consecutive active days up to today (or yesterday, while today is still open)"""
+        if not self.days or self.days[-1] < today.toordinal() - 1:
+            return 0
+        return self._run
+
+
+class RatingTimeline:
+    """A user.rating history with prefix sums of the rating changes"""
+
+    def __init__(self, rating_history: Optional[List[Dict]]):
+        changes = sorted(rating_history or (), key=lambda change: change.get('ratingUpdateTimeSeconds', 0))
+        self.times = array('q', (change.get('ratingUpdateTimeSeconds', 0) for change in changes))
+        self.new_ratings = array('q', (change.get('newRating', 0) for change in changes))
+        deltas = [change.get('newRating', 0) - change.get('oldRating', 0) for change in changes]
+        self.deltas = array('q', accumulate(deltas, initial=0))
+        self.gains = _prefix(delta > 0 for delta in deltas)
+        self.losses = _prefix(delta < 0 for delta in deltas)
+
+    def __len__(self):
+        return len(self.times)
+
+    def window(self, start: int, end: int) -> Dict:
+        """Rated contests whose results came out in [start, end)"""
+        lo, hi = bisect.bisect_left(self.times, start), bisect.bisect_left(self.times, end)
+        return {
+            'contests': hi - lo,
+            'rating_change': self.deltas[hi] - self.deltas[lo],
+            'gains': self.gains[hi] - self.gains[lo],
+            'losses': self.losses[hi] - self.losses[lo],
+            'rating': self.new_ratings[hi - 1] if hi else None,
+        }
+
+
+def _level(count: int) -> int:
+    return bisect.bisect_right(HEATMAP_LEVELS, count)
+
+
+def heatmap(timeline: SubmissionTimeline, today: date, weeks: int = HEATMAP_WEEKS) -> List[List[Optional[Dict]]]:
+    """Daily submission counts as weeks (Monday first) of {'date', 'count', 'level'}; days after today are None"""
+    first_day = today - timedelta(days=today.weekday() + 7 * (weeks - 1))
+    counts = timeline.daily_counts(first_day, today)
+    cells = [{'date': (first_day + timedelta(days=offset)).isoformat(), 'count': count, 'level': _level(count)}
+             for offset, count in enumerate(counts)]
+    cells += [None] * (7 * weeks - len(cells))
+    return [cells[week * 7:week * 7 + 7] for week in range(weeks)]
+
+
+def submission_activity(timeline: SubmissionTimeline, today: date = None) -> Dict:
+    """Windows, heatmap and streaks of a submission timeline"""
+    today = today or date.today()
+    windows = []
+    for days in WINDOW_DAYS:
+        window = timeline.window(*window_bounds(days, today))
+        window['days'] = days
+        windows.append(window)
+    return {
+        'today': today.isoformat(),
+        'windows': windows,
+        'heatmap': heatmap(timeline, today),
+        'current_streak': timeline.current_streak(today),
+        'longest_streak': timeline.longest_streak,
+    }
+
+
+def rating_activity(timeline: RatingTimeline, today: date = None) -> List[Dict]:
+    """The rating timeline over the WINDOW_DAYS windows"""
+    today = today or date.today()
+    windows = []
+    for days in WINDOW_DAYS:
+        window = timeline.window(*window_bounds(days, today))
+        window['days'] = days
+        windows.append(window)
+    return windows
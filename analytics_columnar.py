@@ -0,0 +1,153 @@
+"""
+Codeforces Tutor - Columnar analytics engine
+Loads submissions into typed NumPy columns and computes the submission
+statistics with vectorized operations. Used for large histories when NumPy
+is installed; the result is identical to the pure Python aggregate.
+"""
+
+from collections import Counter
+from typing import Dict, List
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+from records import Submission, recent_activity_entry
+
+# Verdict codes; the first five have their own counter in the stats dict
+VERDICTS = ['OK', 'WRONG_ANSWER', 'TIME_LIMIT_EXCEEDED', 'RUNTIME_ERROR', 'COMPILATION_ERROR',
+            'TESTING', 'UNKNOWN']
+VERDICT_CODES = {verdict: code for code, verdict in enumerate(VERDICTS)}
+OTHER_VERDICT = len(VERDICTS)
+OK, TESTING, UNKNOWN = VERDICT_CODES['OK'], VERDICT_CODES['TESTING'], VERDICT_CODES['UNKNOWN']
+
+NO_VALUE = -1
+
+
+def available() -> bool:
+    return np is not None
+
+
+class SubmissionColumns:
+    """Submissions stored as parallel typed arrays, one row per submission.
+
+    Strings (problem index, language, tag) are replaced by ids into the
+    `indexes`, `languages` and `tags` lists, assigned in order of first
+    appearance. Missing values are NO_VALUE.
+    """
+
+    def __init__(self, submissions: List[Submission]):
+        n = len(submissions)
+        ids, times, verdicts, ratings, contests, problem_contests, problem_indexes, langs = (
+            [0] * n, [0] * n, [0] * n, [0] * n, [0] * n, [0] * n, [0] * n, [0] * n)
+        tag_ids, tag_rows = [], []
+        index_ids, language_ids, tag_id_of = {}, {}, {}
+
+        for row, submission in enumerate(submissions):
+            problem = submission.problem
+
+            ids[row] = submission.id or 0
+            times[row] = submission.creationTimeSeconds or 0
+            verdicts[row] = VERDICT_CODES.get(submission.verdict or 'UNKNOWN', OTHER_VERDICT)
+            contests[row] = submission.contestId or 0
+            langs[row] = language_ids.setdefault(submission.programmingLanguage or 'Unknown',
+                                                 len(language_ids))
+
+            if problem is None:
+                ratings[row] = problem_indexes[row] = NO_VALUE
+                continue
+
+            ratings[row] = problem.rating if problem.rating is not None else NO_VALUE
+            if problem.key is not None:
+                problem_contests[row] = problem.contestId
+                problem_indexes[row] = index_ids.setdefault(problem.index, len(index_ids))
+            else:
+                problem_indexes[row] = NO_VALUE
+
+            for tag in problem.tags:
+                tag_ids.append(tag_id_of.setdefault(tag, len(tag_id_of)))
+                tag_rows.append(row)
+
+        self.submissions = submissions
+        self.id = np.array(ids, dtype=np.int64)
+        self.time = np.array(times, dtype=np.int64)
+        self.verdict = np.array(verdicts, dtype=np.int8)
+        self.rating = np.array(ratings, dtype=np.int16)
+        self.contest = np.array(contests, dtype=np.int32)
+        self.problem_contest = np.array(problem_contests, dtype=np.int64)
+        self.problem_index = np.array(problem_indexes, dtype=np.int32)
+        self.language = np.array(langs, dtype=np.int32)
+        self.tag = np.array(tag_ids, dtype=np.int32)
+        self.tag_row = np.array(tag_rows, dtype=np.int64)
+        self.indexes = list(index_ids)
+        self.languages = list(language_ids)
+        self.tags = list(tag_id_of)
+
+    def __len__(self):
+        return len(self.id)
+
+
+def _counter_in_first_seen_order(values, labels=None) -> Counter:
+    """Counter of `values` with keys inserted in order of first appearance.
+
+    Keeps most_common() ties in the same order as the pure Python engine.
+    """
+    if len(values) == 0:
+        return Counter()
+    uniques, first_seen, counts = np.unique(values, return_index=True, return_counts=True)
+    order = np.argsort(first_seen, kind='stable')
+    counter = Counter()
+    for value, count in zip(uniques[order].tolist(), counts[order].tolist()):
+        counter[labels[value] if labels is not None else value] = count
+    return counter
+
+
+def _problem_set(columns: SubmissionColumns, mask) -> set:
+    """(contestId, index) pairs of the rows selected by mask"""
+    mask = mask & (columns.problem_index != NO_VALUE)
+    # pack both parts into one int64 so a single np.unique finds the distinct problems
+    keys = np.unique(columns.problem_contest[mask] * len(columns.indexes) + columns.problem_index[mask])
+    contest_ids, index_ids = np.divmod(keys, max(len(columns.indexes), 1))
+    return {(contest_id, columns.indexes[index_id])
+            for contest_id, index_id in zip(contest_ids.tolist(), index_ids.tolist())}
+
+
+def aggregate_state(columns: SubmissionColumns, recent_size: int = 10) -> Dict:
+    """Attributes of a SubmissionAggregate computed from the columns"""
+    verdict_counts = np.bincount(columns.verdict, minlength=OTHER_VERDICT + 1).tolist()
+    verdicts = Counter({
+        'accepted_submissions': verdict_counts[VERDICT_CODES['OK']],
+        'wrong_answer': verdict_counts[VERDICT_CODES['WRONG_ANSWER']],
+        'time_limit_exceeded': verdict_counts[VERDICT_CODES['TIME_LIMIT_EXCEEDED']],
+        'runtime_error': verdict_counts[VERDICT_CODES['RUNTIME_ERROR']],
+        'compilation_error': verdict_counts[VERDICT_CODES['COMPILATION_ERROR']],
+        'other_verdicts': (verdict_counts[TESTING] + verdict_counts[UNKNOWN]
+                           + verdict_counts[OTHER_VERDICT]),
+    })
+
+    accepted = columns.verdict == OK
+    rated = accepted & (columns.rating != NO_VALUE)
+    accepted_tags = columns.tag[accepted[columns.tag_row]] if len(columns.tag) else columns.tag
+
+    pending = (columns.verdict == TESTING) | (columns.verdict == UNKNOWN)
+    has_contest = columns.contest != 0
+
+    # most recent submissions: newest time first, then highest id, then list order
+    order = np.lexsort((np.arange(len(columns)), -columns.id, -columns.time))[:recent_size]
+    recent = [(int(columns.time[row]), int(columns.id[row]), recent_activity_entry(columns.submissions[row]))
+              for row in order.tolist()]
+
+    return {
+        'total_submissions': len(columns),
+        'verdicts': verdicts,
+        'solved_problems': _problem_set(columns, accepted),
+        'attempted_problems': _problem_set(columns, np.ones(len(columns), dtype=bool)),
+        'languages': _counter_in_first_seen_order(columns.language, columns.languages),
+        'tags': _counter_in_first_seen_order(accepted_tags, columns.tags),
+        'rating_distribution': _counter_in_first_seen_order((columns.rating[rated] // 100) * 100),
+        'contest_participation': set(np.unique(columns.contest[has_contest]).tolist()),
+        'recent': recent,
+        'max_id': int(columns.id.max()) if len(columns) else None,
+        'pending_ids': set(columns.id[pending].tolist()),
+    }
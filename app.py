@@ -5,19 +5,77 @@ Codeforces Tutor - Web Application
 Simple Flask-based web interface for the Codeforces tutor
 """
 
-from flask import Flask, render_template, request, redirect, url_for, flash, session
-import sys
-import os
+from flask import Flask, render_template, request, redirect, url_for, flash, session, make_response, jsonify, g
+from werkzeug.serving import is_running_from_reloader
+import asyncio
+import time
 from datetime import datetime
-from question_filtering import fetch_contests, fetch_problems, display_results
+from question_filtering import fetch_contests, fetch_problems_async, index_missing_contests
+from problem_query import search_problems, unindexed_contests
 from user_analytics import (
-    fetch_user_info, fetch_user_submissions, fetch_user_rating_history,
-    analyze_submissions, display_user_info, display_submission_stats
+    get_solved_set, fetch_user_analytics_async, analytics_data_version, fetch_user_info_async,
+    get_stats_and_solved_set
 )
+from recommender import recommendations_for
+from contest_standings import cached_standings, queue_ingestion
+from contest_cache import get_contest_list
+from team_analytics import TEAM_COLUMNS, fetch_team_analytics_async, parse_handles, sort_rows
+from config import ANALYTICS_CACHE_TTL, ANALYTICS_CACHE_MAX_BYTES, PREFETCH_ENABLED, TIMING_HEADER, TEAM_MAX_HANDLES
+import metrics
+from prefetch import prefetcher
+from response_cache import LRUCache
 
-app = Flask(__name__)
+class TutorFlask(Flask):
+    def async_to_sync(self, func):
+        """Run async views through asgiref when installed (flask[async]), else with asyncio.run.
+
+        Either way the WSGI worker waits for the view to finish; only the
+        view's own API calls run concurrently.
+        """
+        try:
+            return super().async_to_sync(func)
+        except RuntimeError:
+            return lambda *args, **kwargs: asyncio.run(func(*args, **kwargs))
+
+app = TutorFlask(__name__)
 app.secret_key = 'your-secret-key-here'  # Change this to a secure secret key
 
+# Seconds a client should wait before polling for queued standings again
+STANDINGS_RETRY_AFTER = 5
+
+# Rendered /user_analytics pages per handle
+analytics_cache = LRUCache(ANALYTICS_CACHE_MAX_BYTES)
+
+# Warm caches in the background; with the debug reloader only the serving child does it
+if PREFETCH_ENABLED and (__name__ != '__main__' or is_running_from_reloader()):
+    prefetcher.start()
+
+@app.before_request
+def note_active_user():
+    """Let the prefetcher keep the submissions of active users synced"""
+    if 'username' in session:
+        prefetcher.note_handle(session['username'])
+
+@app.before_request
+def start_timing():
+    g.request_start = time.perf_counter()
+    g.timings = metrics.start_request()
+
+@app.after_request
+def report_timing(response):
+    """Record the route's phase timings, and send them as Server-Timing when enabled"""
+    if 'timings' in g:
+        total = time.perf_counter() - g.request_start
+        metrics.finish_request(request.endpoint or 'unknown', g.timings, total)
+        if TIMING_HEADER or app.debug:
+            response.headers['Server-Timing'] = metrics.server_timing(g.timings, total)
+    return response
+
+@app.route('/metrics')
+def metrics_page():
+    """Prometheus metrics"""
+    return app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 # Custom template filter for timestamp conversion
 @app.template_filter('timestamp_to_date')
 def timestamp_to_date(timestamp):
@@ -46,8 +104,37 @@ def set_username():
 
     return render_template('set_username.html')
 
+def _int_value(values, name, default):
+    """Integer form/query value; blank means the default"""
+    value = values.get(name, '').strip()
+    return int(value) if value else default
+
+def parse_filters(values):
+    """Build the filters dictionary from the filter form (or matching query args)"""
+    # Contest types
+    contest_types = values.getlist('contest_types')
+    if not contest_types:
+        contest_types = ["Div. 1 + Div. 2", "Div. 1", "Div. 2", "Div. 3", "Div. 4"]
+
+    return {
+        'rating_lower': _int_value(values, 'rating_lower', 800),
+        'rating_upper': _int_value(values, 'rating_upper', 3500),
+        'contest_type': contest_types,
+        'question_start': _int_value(values, 'question_start', 1),
+        'question_end': _int_value(values, 'question_end', 10),
+        'contest_count': _int_value(values, 'contest_count', 50),
+        'max_questions': _int_value(values, 'max_questions', 10),
+        'exclude_solved': 'exclude_solved' in values
+    }
+
+def _solved_set_for(filters, username):
+    """Return (SolvedSet to exclude or None, error) for the filters"""
+    if not filters['exclude_solved'] or not username:
+        return None, None
+    return get_solved_set(username)
+
 @app.route('/question_filtering', methods=['GET', 'POST'])
-def question_filtering():
+async def question_filtering():
     """Question filtering page"""
     if 'username' not in session:
         flash('Please set your username first', 'error')
@@ -56,38 +143,26 @@ def question_filtering():
     if request.method == 'POST':
         try:
             # Get form data
-            rating_lower = int(request.form.get('rating_lower', 800))
-            rating_upper = int(request.form.get('rating_upper', 3500))
-
-            # Contest types
-            contest_types = request.form.getlist('contest_types')
-            if not contest_types:
-                contest_types = ["Div. 1 + Div. 2", "Div. 1", "Div. 2", "Div. 3", "Div. 4"]
-
-            question_start = int(request.form.get('question_start', 1))
-            question_end = int(request.form.get('question_end', 10))
-            contest_count = int(request.form.get('contest_count', 50))
-            max_questions = int(request.form.get('max_questions', 10))
-
-            # Create filters dictionary
-            filters = {
-                'rating_lower': rating_lower,
-                'rating_upper': rating_upper,
-                'contest_type': contest_types,
-                'question_start': question_start,
-                'question_end': question_end,
-                'contest_count': contest_count,
-                'max_questions': max_questions
-            }
+            filters = parse_filters(request.form)
+
+            # Solved problems and the contest selection are independent; both may hit the API
+            with metrics.timed_phase('fetch'):
+                (solved, error), contests_data = await asyncio.gather(
+                    asyncio.to_thread(_solved_set_for, filters, session['username']),
+                    asyncio.to_thread(fetch_contests, filters['contest_type'], filters['contest_count']))
+            if error:
+                flash(f'Could not load your solved problems, showing all: {error}', 'error')
+                filters['exclude_solved'] = False
 
             # Fetch and filter problems
-            contests_data = fetch_contests(contest_types, contest_count)
             if contests_data:
-                problems = fetch_problems(contests_data, filters)
-                return render_template('question_results.html',
-                                     problems=problems,
-                                     filters=filters,
-                                     username=session['username'])
+                with metrics.timed_phase('filter'):
+                    problems = await fetch_problems_async(contests_data, filters, exclude=solved)
+                with metrics.timed_phase('render'):
+                    return render_template('question_results.html',
+                                         problems=problems,
+                                         filters=filters,
+                                         username=session['username'])
             else:
                 flash('No contests found matching your criteria', 'error')
 
@@ -96,8 +171,90 @@ def question_filtering():
 
     return render_template('question_filtering.html', username=session.get('username'))
 
+@app.route('/api/problems')
+def api_problems():
+    """JSON problem search over the query index (used for live filtering)"""
+    try:
+        filters = parse_filters(request.args)
+    except ValueError:
+        return jsonify({'error': 'Filter values must be integers'}), 400
+    tags = [tag for tag in request.args.getlist('tags') if tag]
+
+    start = time.perf_counter()
+    with metrics.timed_phase('fetch'):
+        solved, error = _solved_set_for(filters, session.get('username'))
+        if error:
+            return jsonify({'error': f'Could not load solved problems: {error}'}), 503
+        # like /question_filtering: contests not in the problem index yet are fetched first
+        contests, error = unindexed_contests(filters)
+        if error:
+            return jsonify({'error': error}), 503
+        missing_contests = index_missing_contests(contests) if contests else []
+    with metrics.timed_phase('filter'):
+        problems, total, error = search_problems(filters, tags, exclude=solved)
+    if error:
+        return jsonify({'error': error}), 503
+
+    return jsonify({
+        'total': total,
+        'problems': [dict(problem.to_dict(),
+                          url=f"https://codeforces.com/contest/{problem.contestId}/problem/{problem.index}")
+                     for problem in problems],
+        'missing_contests': missing_contests,
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 3),
+    })
+
+@app.route('/api/contest_standings/<int:contest_id>')
+def api_contest_standings(contest_id):
+    """Per-problem solve rates of a finished contest and the placement of `handle` (default: the session's user).
+
+    Standings not ingested yet are queued for a background ingestion and
+    answered with 202; poll again after Retry-After seconds.
+    """
+    columns = cached_standings(contest_id)
+    if columns is None:
+        with metrics.timed_phase('fetch'):
+            contest_list, error = get_contest_list()
+        if error:
+            return jsonify({'error': error}), 503
+        contest = contest_list.by_id.get(contest_id)
+        if contest is None or contest.phase != 'FINISHED':
+            return jsonify({'error': f"Contest {contest_id} is not a finished public contest"}), 404
+        position, error = queue_ingestion(contest_id, final=True)
+        if error:
+            return jsonify({'error': error}), 503
+        response = jsonify({'contest_id': contest_id, 'status': 'ingesting' if position == 0 else 'queued',
+                            'queue_position': position})
+        response.headers['Retry-After'] = str(STANDINGS_RETRY_AFTER)
+        return response, 202
+    handle = request.args.get('handle') or session.get('username')
+    row = columns.row_of(handle) if handle else None
+    return jsonify({
+        'contest': columns.contest,
+        'participants': len(columns),
+        'problems': columns.solve_rates(),
+        'handle': handle,
+        'rank': columns.ranks[row] if row is not None else None,
+        'percentile': columns.percentile(handle) if handle else None,
+    })
+
+def _estimated_size(html, bundle):
+    """Rough memory footprint of a cached analytics page in bytes"""
+    stats = bundle['stats'] or {}
+    items = sum(len(stats.get(name, ())) for name in
+                ('solved_problems', 'attempted_problems', 'contest_participation', 'languages', 'tags'))
+    items += 7 * len(stats.get('activity', {}).get('heatmap', ()))
+    return len(html) * 2 + items * 100 + len(bundle['rating_history'] or ()) * 500
+
+def _analytics_page(entry):
+    """Serve a cached analytics page, or 304 if the client already has it"""
+    response = make_response(entry.value['html'])
+    response.set_etag(entry.version)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
 @app.route('/user_analytics')
-def user_analytics():
+async def user_analytics():
     """User analytics page"""
     if 'username' not in session:
         flash('Please set your username first', 'error')
@@ -105,35 +262,110 @@ def user_analytics():
 
     username = session['username']
 
+    # Pending flash messages end up in the rendered page, so skip the cache then
+    cacheable = '_flashes' not in session
+    entry = analytics_cache.get(username) if cacheable else None
+    if entry is not None and entry.age() < ANALYTICS_CACHE_TTL:
+        metrics.CACHE_LOOKUPS.inc(cache='analytics_page', result='hit')
+        return _analytics_page(entry)
+
     try:
-        # Fetch user information
-        user_info, error = fetch_user_info(username)
-        if error:
-            flash(f'Error fetching user info: {error}', 'error')
-            return redirect(url_for('index'))
+        # Fetch user information, submission stats and rating history concurrently
+        with metrics.timed_phase('fetch'):
+            bundle = await fetch_user_analytics_async(username)
+        errors = bundle['errors']
+        app.logger.info('user_analytics %s fetch timings: %s', username,
+                        ', '.join(f'{name}={seconds * 1000:.0f}ms' for name, seconds in bundle['timings'].items()))
 
-        # Fetch submissions
-        submissions, error = fetch_user_submissions(username, 1000)
-        if error:
-            flash(f'Error fetching submissions: {error}', 'error')
+        if 'user_info' in errors:
+            flash(f"Error fetching user info: {errors['user_info']}", 'error')
             return redirect(url_for('index'))
 
-        # Analyze submissions
-        stats = analyze_submissions(submissions) if submissions else {}
+        # Unchanged data: reuse the rendered page
+        version = analytics_data_version(bundle)
+        if entry is not None and entry.version == version:
+            metrics.CACHE_LOOKUPS.inc(cache='analytics_page', result='revalidated')
+            entry.touch()
+            return _analytics_page(entry)
+        metrics.CACHE_LOOKUPS.inc(cache='analytics_page', result='miss')
+
+        # The page is still useful without submissions or rating history
+        if 'stats' in errors:
+            flash(f"Error fetching submissions: {errors['stats']}", 'error')
+        if 'rating_history' in errors:
+            flash(f"Could not fetch rating history: {errors['rating_history']}", 'error')
 
-        # Fetch rating history
-        rating_history, _ = fetch_user_rating_history(username)
+        with metrics.timed_phase('render'):
+            html = render_template('user_analytics.html',
+                                   user_info=bundle['user_info'],
+                                   stats=bundle['stats'] or {},
+                                   rating_history=bundle['rating_history'],
+                                   rating_activity=bundle['rating_activity'],
+                                   username=username)
+        if not cacheable or errors:
+            return html
 
-        return render_template('user_analytics.html',
-                             user_info=user_info,
-                             stats=stats,
-                             rating_history=rating_history,
-                             username=username)
+        entry = analytics_cache.put(username, {'html': html, 'bundle': bundle},
+                                    _estimated_size(html, bundle), version)
+        return _analytics_page(entry)
 
     except Exception as e:
         flash(f'Error processing analytics: {str(e)}', 'error')
         return redirect(url_for('index'))
 
+@app.route('/recommendations')
+async def recommendations():
+    """Problems picked for the user's weak tags around their rating"""
+    if 'username' not in session:
+        flash('Please set your username first', 'error')
+        return redirect(url_for('set_username'))
+
+    username = session['username']
+    try:
+        count = min(max(_int_value(request.args, 'count', 20), 1), 100)
+    except ValueError:
+        count = 20
+
+    with metrics.timed_phase('fetch'):
+        (user_info, error), (stats, solved, stats_error) = await asyncio.gather(
+            fetch_user_info_async(username), asyncio.to_thread(get_stats_and_solved_set, username))
+    error = error or stats_error
+    if not error:
+        with metrics.timed_phase('recommend'):
+            # the first call may have to download the problem index
+            result, error = await asyncio.to_thread(recommendations_for, stats, user_info, solved, count)
+    if error:
+        flash(f'Could not compute recommendations: {error}', 'error')
+        return redirect(url_for('index'))
+
+    with metrics.timed_phase('render'):
+        return render_template('recommendations.html', username=username, count=count, **result)
+
+@app.route('/team_analytics')
+async def team_analytics():
+    """Side-by-side comparison of several handles"""
+    handles = parse_handles(request.args.get('handles', ''))
+    sort = request.args.get('sort', 'rating')
+    if not handles:
+        return render_template('team_analytics.html', handles=session.get('team_handles', []),
+                               rows=None, columns=TEAM_COLUMNS, sort=sort, max_handles=TEAM_MAX_HANDLES)
+
+    with metrics.timed_phase('fetch'):
+        rows, not_found, error = await fetch_team_analytics_async(handles)
+    if error:
+        flash(f'Error fetching team: {error}', 'error')
+        rows = None
+    else:
+        # remembered for the next visit
+        session['team_handles'] = handles
+    if not_found:
+        flash(f"Handles not found: {', '.join(not_found)}", 'error')
+
+    with metrics.timed_phase('render'):
+        return render_template('team_analytics.html', handles=handles,
+                               rows=sort_rows(rows, sort) if rows else rows,
+                               columns=TEAM_COLUMNS, sort=sort, max_handles=TEAM_MAX_HANDLES)
+
 if __name__ == '__main__':
     # app.run(debug=True, host='0.0.0.0', port=5000)
     app.run(debug=True, host='127.0.0.1', port=80)
@@ -0,0 +1,250 @@
+"""
+Codeforces Tutor - Batch analytics
+Headless analytics over a roster of handles, e.g. for nightly reports:
+
+    python batch_analytics.py HANDLES.txt -o report.jsonl [--resume]
+
+Profiles come from batched user.info calls. Each handle's submissions are
+then synced into the submission store and its rating history fetched,
+BATCH_FETCH_WORKERS handles at a time (every call passes the shared API rate
+limiter). The CPU-bound part - loading the stored history, analyze_submissions
+and the activity windows - runs on a process pool; workers read the
+submissions from the store, so only handles and small results cross process
+boundaries. One JSON line per handle is appended to the output as soon as it
+is ready, so an interrupted run can be resumed with --resume.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from datetime import date
+from typing import Dict, List, Optional, Set
+
+from activity_timeline import RatingTimeline, SubmissionTimeline, rating_activity, submission_activity
+from concurrent_fetch import fetch_in_order
+from config import BATCH_FETCH_WORKERS, BATCH_PROCESSES
+from submission_store import load_submissions, sync_submissions
+from team_analytics import fetch_team_info, parse_handles
+from user_analytics import DISPLAYED_USER_FIELDS, VERDICT_STATS, analyze_submissions, fetch_user_rating_history
+
+# Handles per user.info call
+USER_INFO_BATCH = 100
+# Seconds between progress lines
+PROGRESS_INTERVAL = 5.0
+
+SUMMARY_COUNTS = (['total_submissions'] + list(VERDICT_STATS.values()) +
+                  ['other_verdicts', 'unsolved_attempts', 'unique_problems_solved', 'unique_problems_attempted'])
+
+
+def read_handles(path: str) -> List[str]:
+    """Handles from a file ('-' for stdin): separated by whitespace, commas or semicolons; '#' starts a comment"""
+    stream = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    try:
+        return parse_handles(' '.join(line.split('#', 1)[0] for line in stream))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def completed_handles(path: str, retry_errors: bool = False) -> Set[str]:
+    """Lowercased handles that already have a line in the output file.
+
+    A partly written last line (an interrupted run) is cut off. With
+    retry_errors, handles whose latest line has errors are not counted.
+    """
+    if not os.path.exists(path):
+        return set()
+    done, complete_size = set(), 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            complete_size += len(line)
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            handle = row['handle'].lower()
+            if retry_errors and (row.get('error') or row.get('errors')):
+                done.discard(handle)
+            else:
+                done.add(handle)
+    if complete_size < os.path.getsize(path):
+        with open(path, 'r+b') as f:
+            f.truncate(complete_size)
+    return done
+
+
+def stats_summary(stats: Dict) -> Dict:
+    """The JSON-serializable part of analyze_submissions' result (counts instead of problem sets)"""
+    if not stats:
+        return {}
+    summary = {name: stats[name] for name in SUMMARY_COUNTS}
+    summary['contests_participated'] = len(stats['contest_participation'])
+    summary['languages'] = dict(stats['languages'].most_common())
+    summary['tags'] = dict(stats['tags'].most_common())
+    summary['rating_distribution'] = {str(rating): count for rating, count in sorted(stats['rating_distribution'].items())}
+    summary['last_submission'] = stats['recent_activity'][0]['timestamp'] if stats['recent_activity'] else None
+    return summary
+
+
+def analyze_handle(handle: str, today: str) -> Dict:
+    """Process pool task: statistics and activity windows of a handle's stored submissions"""
+    submissions = load_submissions(handle)
+    if not submissions:
+        return {'stats': {}, 'activity': None}
+    activity = submission_activity(SubmissionTimeline(submissions), date.fromisoformat(today))
+    del activity['heatmap']
+    return {'stats': stats_summary(analyze_submissions(submissions)), 'activity': activity}
+
+
+def contest_summary(rating_history: Optional[List[Dict]], today: date) -> Optional[Dict]:
+    if rating_history is None:
+        return None
+    return {
+        'contests': len(rating_history),
+        'best_rank': min((change.get('rank', 0) for change in rating_history), default=None),
+        'windows': rating_activity(RatingTimeline(rating_history), today),
+    }
+
+
+def _fetch_handle(handle: str):
+    """Sync a handle's submissions and fetch its rating history; returns (rating history, errors)"""
+    errors = {}
+    try:
+        _, sync_error = sync_submissions(handle)
+        rating_history, rating_error = fetch_user_rating_history(handle)
+    except Exception as e:
+        return None, {'fetch': f"Unexpected error: {e}"}
+    if sync_error:
+        errors['submissions'] = sync_error
+    if rating_error:
+        errors['rating_history'] = rating_error
+    return rating_history, errors
+
+
+class Progress:
+    """Handles done, errors and throughput, printed every PROGRESS_INTERVAL seconds"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.errors = 0
+        self.start = time.perf_counter()
+        self._last_report = self.start
+
+    def add(self, row: Dict):
+        self.done += 1
+        if row.get('error') or row.get('errors'):
+            self.errors += 1
+        now = time.perf_counter()
+        if now - self._last_report >= PROGRESS_INTERVAL:
+            self._last_report = now
+            print(self.line(now))
+
+    def rate(self, now: float = None) -> float:
+        elapsed = (now or time.perf_counter()) - self.start
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def line(self, now: float = None) -> str:
+        rate = self.rate(now)
+        eta = f", ETA {(self.total - self.done) / rate:.0f}s" if rate and self.done < self.total else ""
+        return f"[{self.done}/{self.total}] {rate:.2f} handles/s, {self.errors} with errors{eta}"
+
+
+def _user_fields(user: Dict) -> Dict:
+    return {field: user[field] for field in DISPLAYED_USER_FIELDS if field in user}
+
+
+def _fetch_profiles(handles: List[str]):
+    """user.info for all handles in USER_INFO_BATCH chunks; returns (profiles, {handle: error})"""
+    users, failed = [], {}
+    for start in range(0, len(handles), USER_INFO_BATCH):
+        chunk = handles[start:start + USER_INFO_BATCH]
+        found, not_found, error = fetch_team_info(chunk)
+        for handle in not_found:
+            failed[handle] = f"User with handle {handle} not found"
+        if error:
+            failed.update((handle, error) for handle in chunk if handle not in not_found)
+        else:
+            users.extend(found.values())
+    return users, failed
+
+
+def run_batch(handles: List[str], output: str, resume: bool = False, retry_errors: bool = False,
+              fetch_workers: int = BATCH_FETCH_WORKERS, processes: int = BATCH_PROCESSES) -> Progress:
+    """Analyze the handles and append one JSON line per handle to `output`; returns the final Progress"""
+    if resume:
+        done = completed_handles(output, retry_errors)
+        skipped = [handle for handle in handles if handle.lower() in done]
+        handles = [handle for handle in handles if handle.lower() not in done]
+        if skipped:
+            print(f"Resuming: {len(skipped)} handles already in {output}")
+    today = date.today()
+    progress = Progress(len(handles))
+    print(f"Analyzing {len(handles)} handles...")
+
+    with open(output, 'a' if resume else 'w', encoding='utf-8') as out:
+        def write(row: Dict):
+            out.write(json.dumps(row, separators=(',', ':')) + '\n')
+            out.flush()
+            progress.add(row)
+
+        users, failed = _fetch_profiles(handles)
+        for handle, error in failed.items():
+            write({'handle': handle, 'date': today.isoformat(), 'error': error})
+
+        # 'spawn': forking a process that runs fetch threads could copy held locks
+        with ProcessPoolExecutor(max_workers=processes or None,
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            analyses: Dict[Future, Dict] = {}
+
+            def write_finished(timeout: Optional[float]):
+                finished, _ = wait(analyses, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    row = analyses.pop(future)
+                    try:
+                        row.update(future.result())
+                    except Exception as e:
+                        row['errors']['analysis'] = f"Unexpected error: {e}"
+                    write(row)
+
+            fetches = fetch_in_order(users, lambda user: _fetch_handle(user['handle']), max_workers=fetch_workers)
+            try:
+                for user, (rating_history, errors) in fetches:
+                    row = {'handle': user['handle'], 'date': today.isoformat(), 'user': _user_fields(user),
+                           'contests': contest_summary(rating_history, today), 'errors': errors}
+                    analyses[pool.submit(analyze_handle, user['handle'], today.isoformat())] = row
+                    write_finished(timeout=0)
+            finally:
+                fetches.close()
+            while analyses:
+                write_finished(timeout=None)
+    return progress
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze many Codeforces handles into a JSON lines file')
+    parser.add_argument('handles', help="file with the handles ('-' for stdin)")
+    parser.add_argument('-o', '--output', required=True, help='JSON lines output file')
+    parser.add_argument('--resume', action='store_true', help='skip handles already in the output and append')
+    parser.add_argument('--retry-errors', action='store_true', help='with --resume, redo handles that had errors')
+    parser.add_argument('--fetch-workers', type=int, default=BATCH_FETCH_WORKERS, help='handles fetched at a time')
+    parser.add_argument('--processes', type=int, default=BATCH_PROCESSES, help='analysis processes (0: one per CPU)')
+    args = parser.parse_args()
+
+    handles = read_handles(args.handles)
+    if not handles:
+        sys.exit("No handles given")
+    progress = run_batch(handles, args.output, args.resume, args.retry_errors, args.fetch_workers, args.processes)
+    elapsed = time.perf_counter() - progress.start
+    print(f"Done: {progress.done} handles in {elapsed:.1f}s ({progress.rate():.2f} handles/s), "
+          f"{progress.errors} with errors")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark: pure Python vs columnar (NumPy) submission analysis
+Usage: python benchmarks/bench_analytics.py [sizes...]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analytics_columnar
+from records import as_submissions
+from user_analytics import SubmissionAggregate
+
+VERDICTS = ['OK'] * 5 + ['WRONG_ANSWER'] * 3 + ['TIME_LIMIT_EXCEEDED', 'RUNTIME_ERROR',
+                                                'COMPILATION_ERROR', 'MEMORY_LIMIT_EXCEEDED']
+LANGUAGES = ['GNU C++17', 'GNU C++20 (64)', 'Python 3', 'PyPy 3-64', 'Java 21', 'Rust 2021']
+TAGS = ['implementation', 'math', 'greedy', 'dp', 'data structures', 'brute force',
+        'constructive algorithms', 'graphs', 'sortings', 'binary search', 'strings', 'trees']
+
+
+def make_submissions(count: int, seed: int = 0):
+    """Synthetic user.status result, newest first"""
+    rng = random.Random(seed)
+    submissions = []
+    now = 1_700_000_000
+    for i in range(count):
+        contest_id = rng.randint(1, 2000)
+        problem = {
+            'contestId': contest_id,
+            'index': rng.choice('ABCDEFG'),
+            'name': f'Problem {i}',
+            'type': 'PROGRAMMING',
+            'tags': rng.sample(TAGS, rng.randint(0, 4)),
+        }
+        if rng.random() < 0.85:
+            problem['rating'] = rng.randrange(800, 3600, 100)
+        submissions.append({
+            'id': 300_000_000 - i,
+            'contestId': contest_id,
+            'creationTimeSeconds': now - i * 600,
+            'relativeTimeSeconds': 2147483647,
+            'problem': problem,
+            'author': {'contestId': contest_id, 'members': [{'handle': 'bench'}],
+                       'participantType': 'PRACTICE', 'ghost': False, 'startTimeSeconds': now},
+            'programmingLanguage': rng.choice(LANGUAGES),
+            'verdict': rng.choice(VERDICTS),
+            'testset': 'TESTS',
+            'passedTestCount': rng.randint(0, 50),
+            'timeConsumedMillis': rng.randint(15, 2000),
+            'memoryConsumedBytes': rng.randint(0, 256) * 1024 * 1024,
+        })
+    return submissions
+
+
+def best_of(repeat: int, func, *args):
+    """Fastest of `repeat` runs, in milliseconds, and the last result"""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def python_engine(submissions):
+    return SubmissionAggregate(submissions).to_stats()
+
+
+def columnar_engine(submissions):
+    columns = analytics_columnar.SubmissionColumns(submissions)
+    aggregate = SubmissionAggregate()
+    vars(aggregate).update(analytics_columnar.aggregate_state(columns))
+    return aggregate.to_stats()
+
+
+def columnar_analyze_only(columns):
+    return analytics_columnar.aggregate_state(columns)
+
+
+def same_stats(actual, expected):
+    """Equal stats, including the tie order seen through most_common()"""
+    if actual != expected:
+        return False
+    return all(actual[name].most_common() == expected[name].most_common()
+               for name in ('languages', 'tags', 'rating_distribution'))
+
+
+def main():
+    if not analytics_columnar.available():
+        print("NumPy is not installed; nothing to compare.")
+        return
+
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000]
+    print(f"{'submissions':>12} {'python ms':>10} {'columnar ms':>12} {'analyze ms':>11} {'speedup':>8}")
+    for size in sizes:
+        submissions = as_submissions(make_submissions(size))
+        python_ms, expected = best_of(5, python_engine, submissions)
+        columnar_ms, actual = best_of(5, columnar_engine, submissions)
+        columns = analytics_columnar.SubmissionColumns(submissions)
+        analyze_ms, _ = best_of(5, columnar_analyze_only, columns)
+
+        if not same_stats(actual, expected):
+            print(f"MISMATCH for {size} submissions")
+            sys.exit(1)
+
+        print(f"{size:>12} {python_ms:>10.1f} {columnar_ms:>12.1f} {analyze_ms:>11.1f} "
+              f"{python_ms / columnar_ms:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark suite: the app's hot paths against recorded Codeforces fixtures
+Usage: python benchmarks/bench_suite.py [--repeat N] [--latency MS] [--only TEXT]
+                                        [--baseline FILE] [--threshold PCT] [--no-save] [--check]
+
+The API is a local stub serving the fixtures (see fixtures.py), so runs need
+no network access and are comparable. Measured: fetch_contests,
+fetch_problems (cold caches and warm), analyze_submissions for 1k/10k/50k
+submission histories, activity timelines, recommender scoring, full standings
+of a 30k-party contest, and Flask route latency and throughput.
+
+Every run is saved to benchmarks/results/<time>.json and compared with the
+previous one (or --baseline); medians that got slower by more than the
+threshold are reported as regressions, and --check exits non-zero on them.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+from datetime import date, datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+# Settings for the app modules, before they are imported: private caches,
+# no background work, no response store (cold runs must reach the stub) and
+# a rate limit the stub does not need
+BENCH_CACHE_DIR = tempfile.mkdtemp(prefix='cf_tutor_bench_')
+os.environ.update({
+    'CF_TUTOR_CACHE_DIR': BENCH_CACHE_DIR,
+    'CF_TUTOR_PREFETCH': '0',
+    'CF_TUTOR_RESPONSE_STORE': '0',
+    'CF_TUTOR_OFFLINE': '0',
+    'CF_TUTOR_API_REQUESTS_PER_SECOND': '100000',
+    'CF_TUTOR_API_BURST': '1000',
+})
+
+import analytics_columnar
+from activity_timeline import SubmissionTimeline, submission_activity
+import app as web_app
+import cf_api
+import contest_cache
+import contest_standings
+import problem_index
+import problem_query
+import user_analytics
+from config import ANALYTICS_CACHE_MAX_BYTES, STANDINGS_PAGE_SIZE
+from contest_cache import CONTEST_TYPES
+from question_filtering import fetch_contests, fetch_problems, fetch_problems_async
+from recommender import get_catalog, recommendations_for
+from response_store import response_store
+from records import as_submissions
+from response_cache import LRUCache
+from solved_set import SolvedSet
+from user_analytics import analyze_submissions
+
+from fixtures import FIXTURE_DIR, LARGE_STANDINGS, load_fixture
+from stub_server import start_stub_server
+
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+CONTEST_COUNT = 500
+# Goes through all selected contests instead of stopping at the first matches
+ALL_PROBLEMS = {'rating_lower': 800, 'rating_upper': 3500, 'contest_type': CONTEST_TYPES,
+                'question_start': 1, 'question_end': 10, 'contest_count': CONTEST_COUNT,
+                'max_questions': 100000, 'exclude_solved': False}
+FILTER_FORM = {'rating_lower': '1400', 'rating_upper': '2000', 'question_start': '2', 'question_end': '4',
+               'contest_count': str(CONTEST_COUNT), 'max_questions': '50', 'contest_types': CONTEST_TYPES}
+API_PROBLEMS_URL = ('/api/problems?rating_lower=1400&rating_upper=2000&question_start=2&question_end=4'
+                    f'&contest_count={CONTEST_COUNT}&max_questions=50&tags=dp')
+
+# Latency changes smaller than this are timer noise, whatever the percentage
+MIN_CHANGE_MS = 1.0
+
+THROUGHPUT_CLIENTS = 8
+THROUGHPUT_REQUESTS = 25  # per client
+# Polls of a standings route after it first answered 200, and how long (seconds)
+# it may answer 202 before that
+STANDINGS_POLLS = 3
+STANDINGS_POLL_TIMEOUT = 30
+
+
+def wait_for_background_refresh():
+    """Let a contest list download started by a cold select_contests finish"""
+    while True:
+        with contest_cache._lock:
+            if not contest_cache._refreshing:
+                return
+        time.sleep(0.005)
+
+
+def reset_caches():
+    """Forget every cache, as after a restart with an empty cache directory"""
+    wait_for_background_refresh()
+    with contest_cache._lock:
+        contest_cache._cached = None
+    with problem_index._index_lock:
+        problem_index._index = None
+    with problem_query._query_lock:
+        problem_query._query_index = None
+    with user_analytics._user_aggregates_lock:
+        user_analytics._user_aggregates.clear()
+        user_analytics._solved_sets.clear()
+    web_app.analytics_cache = LRUCache(ANALYTICS_CACHE_MAX_BYTES)
+    shutil.rmtree(BENCH_CACHE_DIR, ignore_errors=True)
+    os.makedirs(BENCH_CACHE_DIR, exist_ok=True)
+
+
+class Suite:
+    def __init__(self, stub, repeat: int, only: str = None):
+        self.stub = stub
+        self.repeat = repeat
+        self.only = only
+        self.results = {}
+
+    def wanted(self, name: str) -> bool:
+        return self.only is None or self.only in name
+
+    def latency(self, name: str, func, setup=None, repeat: int = None):
+        """Time `func` `repeat` times, in milliseconds.
+
+        With a `setup` (e.g. reset_caches for cold runs) it runs untimed
+        before every run; without one a first untimed run warms up.
+        """
+        if not self.wanted(name):
+            return
+        if setup is None:
+            with redirect_stdout(io.StringIO()):
+                func()
+        times, calls = [], 0
+        for _ in range(repeat or self.repeat):
+            with redirect_stdout(io.StringIO()):
+                if setup is not None:
+                    setup()
+                wait_for_background_refresh()
+            before = sum(self.stub.calls.values())
+            start = time.perf_counter()
+            with redirect_stdout(io.StringIO()):
+                result = func()
+            times.append((time.perf_counter() - start) * 1000)
+            calls = sum(self.stub.calls.values()) - before
+            if result is None:
+                sys.exit(f"{name} failed")
+        times.sort()
+        self.results[name] = {
+            'kind': 'latency', 'unit': 'ms', 'runs': len(times),
+            'min': times[0], 'median': statistics.median(times),
+            'p95': times[min(len(times) - 1, round(0.95 * (len(times) - 1)))],
+            'api_calls': calls,
+        }
+        self._report(name)
+
+    def throughput(self, name: str, path: str, username: str, setup=None):
+        """Requests per second of THROUGHPUT_CLIENTS concurrent clients on a route"""
+        if not self.wanted(name):
+            return
+        if setup is not None:
+            with redirect_stdout(io.StringIO()):
+                setup()
+        failures = []
+
+        def client_loop():
+            client = route_client(username)
+            for _ in range(THROUGHPUT_REQUESTS):
+                status = client.get(path).status_code
+                if status != 200:
+                    failures.append(status)
+
+        threads = [threading.Thread(target=client_loop) for _ in range(THROUGHPUT_CLIENTS)]
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        elapsed = time.perf_counter() - start
+        if failures:
+            sys.exit(f"{name}: {len(failures)} requests failed (HTTP {failures[0]})")
+        requests_made = THROUGHPUT_CLIENTS * THROUGHPUT_REQUESTS
+        self.results[name] = {'kind': 'throughput', 'unit': 'req/s', 'value': requests_made / elapsed,
+                              'requests': requests_made, 'clients': THROUGHPUT_CLIENTS}
+        self._report(name)
+
+    def _report(self, name: str):
+        result = self.results[name]
+        if result['kind'] == 'latency':
+            print(f"{name:<40} {result['median']:>10.2f} ms  (min {result['min']:.2f}, p95 {result['p95']:.2f}, "
+                  f"{result['api_calls']} API calls)")
+        else:
+            print(f"{name:<40} {result['value']:>10.1f} req/s ({result['clients']} clients)")
+
+
+def route_client(username: str):
+    client = web_app.app.test_client()
+    with client.session_transaction() as session:
+        session['username'] = username
+    return client
+
+
+def expect_ok(response):
+    """The response, or None (a failed run) if it is not a 200"""
+    return response if response.status_code == 200 else None
+
+
+def warm_contests_and_index():
+    reset_caches()
+    fetch_problems(fetch_contests(CONTEST_TYPES, CONTEST_COUNT), ALL_PROBLEMS)
+
+
+def bench_fetching(suite: Suite):
+    contests = lambda: fetch_contests(CONTEST_TYPES, CONTEST_COUNT)
+    suite.latency('fetch_contests/cold', contests, setup=reset_caches)
+    suite.latency('fetch_contests/warm', contests)
+
+    def cold_index():
+        reset_caches()
+        fetch_contests(CONTEST_TYPES, CONTEST_COUNT)
+
+    with redirect_stdout(io.StringIO()):
+        selected = fetch_contests(CONTEST_TYPES, CONTEST_COUNT)
+    suite.latency('fetch_problems/cold', lambda: fetch_problems(selected, ALL_PROBLEMS), setup=cold_index)
+    suite.latency('fetch_problems/warm', lambda: fetch_problems(selected, ALL_PROBLEMS))
+    suite.latency('fetch_problems_async/cold', lambda: asyncio.run(fetch_problems_async(selected, ALL_PROBLEMS)),
+                  setup=cold_index)
+
+
+def bench_analysis(suite: Suite, histories):
+    for handle, submissions in histories.items():
+        suite.latency(f'analyze_submissions/{len(submissions)}', lambda: analyze_submissions(submissions))
+
+
+def bench_activity(suite: Suite, histories):
+    """Building a timeline, and the windows, heatmap and streaks queried from it"""
+    for handle, submissions in histories.items():
+        suite.latency(f'activity_timeline/build/{len(submissions)}', lambda: SubmissionTimeline(submissions))
+        timeline = SubmissionTimeline(submissions)
+        last_day = date.fromtimestamp(timeline.times[-1])
+        suite.latency(f'activity_timeline/query/{len(submissions)}', lambda: submission_activity(timeline, last_day))
+
+
+def bench_recommender(suite: Suite, histories):
+    """Scoring the whole catalog for the largest history (catalog built beforehand)"""
+    with redirect_stdout(io.StringIO()):
+        warm_contests_and_index()
+        catalog, _ = get_catalog()
+    stats = analyze_submissions(list(histories.values())[-1])
+    solved = SolvedSet(stats['solved_problems'])
+    suite.latency(f'recommend/{len(catalog)}_problems',
+                  lambda: recommendations_for(stats, {'rating': 1900}, solved, 20)[0])
+
+
+def bench_standings(suite: Suite):
+    """Full standings of the large fixture contest: ingestion, loading the stored columns, a percentile"""
+    contest_id = next(contest['id'] for contest in load_fixture(FIXTURE_DIR, 'contest.list')
+                      if contest['phase'] == 'FINISHED')
+
+    def forget_standings(remove_stored: bool):
+        contest_standings._standings_cache = LRUCache(contest_standings._standings_cache.max_bytes)
+        if remove_stored:
+            shutil.rmtree(contest_standings.STANDINGS_DIR, ignore_errors=True)
+
+    names = [f'standings/ingest/{LARGE_STANDINGS}', f'standings/load/{LARGE_STANDINGS}', 'standings/percentile',
+             f'standings/route_polls/{LARGE_STANDINGS}']
+    if not any(suite.wanted(name) for name in names):
+        return
+    # the stub generates the pages on the first request
+    with redirect_stdout(io.StringIO()):
+        contest_standings.ingest_standings(contest_id)
+    get = lambda: contest_standings.get_standings(contest_id)[0]
+    suite.latency(names[0], get, setup=lambda: forget_standings(True))
+    suite.latency(names[1], get, setup=lambda: forget_standings(False))
+    suite.latency(names[2], lambda: get().percentile('bench10k'))
+
+    # A head stored while the contest was running must not make the finished
+    # contest look unfinished: polling the route ingests it exactly once. The
+    # response store is off in the suite, so it is turned on for this run.
+    head_params = {'contestId': contest_id, 'from': 1, 'count': 1}
+
+    def stale_head():
+        forget_standings(True)
+        cf_api.RESPONSE_STORE_ENABLED = True
+        head, _ = cf_api.call_api('contest.standings', head_params, store=False)
+        body = {'status': 'OK', 'result': dict(head, contest=dict(head['contest'], phase='CODING'))}
+        response_store.put_body('body', 'contest.standings', head_params, json.dumps(body).encode('utf-8'))
+
+    def poll_until_ingested():
+        client = route_client('bench10k')
+        before = suite.stub.calls['contest.standings']
+        url = f'/api/contest_standings/{contest_id}'
+        deadline = time.perf_counter() + STANDINGS_POLL_TIMEOUT
+        try:
+            while client.get(url).status_code == 202:
+                if time.perf_counter() > deadline:
+                    return None
+                time.sleep(0.01)
+            polls = [client.get(url).status_code for _ in range(STANDINGS_POLLS)]
+        finally:
+            cf_api.RESPONSE_STORE_ENABLED = False
+        ingestions = suite.stub.calls['contest.standings'] - before
+        pages = LARGE_STANDINGS // STANDINGS_PAGE_SIZE + 2
+        return polls if polls == [200] * STANDINGS_POLLS and ingestions <= pages else None
+
+    suite.latency(names[3], poll_until_ingested, setup=stale_head)
+
+
+def bench_routes(suite: Suite, handle: str):
+    client = route_client(handle)
+    filter_page = lambda: expect_ok(client.post('/question_filtering', data=FILTER_FORM))
+    api_problems = lambda: expect_ok(client.get(API_PROBLEMS_URL))
+    suite.latency('route/question_filtering/cold', filter_page, setup=reset_caches)
+    with redirect_stdout(io.StringIO()):
+        warm_contests_and_index()
+    suite.latency('route/question_filtering/warm', filter_page)
+    suite.latency('route/api_problems/warm', api_problems)
+
+    analytics_page = lambda: expect_ok(client.get('/user_analytics'))
+    suite.latency('route/user_analytics/cold', analytics_page, setup=reset_caches)
+    suite.latency('route/user_analytics/cached', analytics_page)
+
+    suite.throughput('throughput/api_problems', API_PROBLEMS_URL, handle, setup=warm_contests_and_index)
+    suite.throughput('throughput/user_analytics', '/user_analytics', handle, setup=analytics_page)
+
+
+def load_histories():
+    """Submission records of the fixture handles, smallest history first"""
+    histories = load_fixture(FIXTURE_DIR, 'user.status')
+    return {handle: as_submissions(submissions)
+            for handle, submissions in sorted(histories.items(), key=lambda item: len(item[1]))}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def previous_results(baseline: str = None):
+    """Results to compare with: {name: (result, commit)} from --baseline, else
+    from the newest saved run that has each benchmark (runs may use --only)"""
+    if baseline:
+        paths = [baseline]
+    else:
+        try:
+            paths = sorted(os.path.join(RESULTS_DIR, name) for name in os.listdir(RESULTS_DIR)
+                           if name.endswith('.json'))
+        except OSError:
+            return {}
+    previous = {}
+    for path in paths:
+        with open(path) as f:
+            run = json.load(f)
+        for name, result in run['results'].items():
+            previous[name] = (result, run.get('commit'))
+    return previous
+
+
+def compare(results, previous, threshold: float):
+    """Print the change against previous runs; return the names that regressed"""
+    regressions = []
+    print(f"\n{'benchmark':<40} {'before':>10} {'now':>10} {'change':>8}  commit")
+    for name, result in results.items():
+        old, commit = previous.get(name, (None, None))
+        if old is None or old['kind'] != result['kind']:
+            continue
+        key = 'median' if result['kind'] == 'latency' else 'value'
+        change = (result[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+        # slower latency or lower throughput
+        if result['kind'] == 'latency':
+            worse = change if result[key] - old[key] >= MIN_CHANGE_MS else 0.0
+        else:
+            worse = -change
+        flag = '  REGRESSION' if worse > threshold else ''
+        if flag:
+            regressions.append(name)
+        print(f"{name:<40} {old[key]:>10.2f} {result[key]:>10.2f} {change:>+7.1f}%  {commit}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the app against recorded Codeforces fixtures')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per latency benchmark')
+    parser.add_argument('--latency', type=float, default=0.0, help='stub API latency per call (ms)')
+    parser.add_argument('--only', help='run only benchmarks whose name contains this text')
+    parser.add_argument('--baseline', help='results file to compare with (default: the previous run)')
+    parser.add_argument('--threshold', type=float, default=25.0, help='regression threshold (percent)')
+    parser.add_argument('--no-save', action='store_true', help='do not save the results')
+    parser.add_argument('--check', action='store_true', help='exit with status 1 on regressions')
+    args = parser.parse_args()
+
+    stub = start_stub_server(latency=args.latency / 1000)
+    cf_api.API_BASE_URL = stub.base_url
+    with open(os.path.join(FIXTURE_DIR, 'VERSION')) as f:
+        fixtures = f.read().strip()
+    print(f"Fixtures: {fixtures}; stub API latency {args.latency:g} ms\n")
+
+    histories = load_histories()
+    suite = Suite(stub, args.repeat, args.only)
+    try:
+        bench_fetching(suite)
+        bench_analysis(suite, histories)
+        bench_activity(suite, histories)
+        bench_recommender(suite, histories)
+        bench_standings(suite)
+        # the routes use a mid-sized history, so cold syncs stay quick
+        bench_routes(suite, list(histories)[len(histories) // 2])
+    finally:
+        stub.shutdown()
+        shutil.rmtree(BENCH_CACHE_DIR, ignore_errors=True)
+
+    run = {
+        'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': analytics_columnar.available(),
+        'fixtures': fixtures,
+        'stub_latency_ms': args.latency,
+        'results': suite.results,
+    }
+
+    previous = previous_results(args.baseline)
+    regressions = compare(suite.results, previous, args.threshold) if previous else []
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S') + '.json')
+        with open(path, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"\nSaved results to {os.path.relpath(path)}")
+
+    if regressions:
+        print(f"\n{len(regressions)} benchmarks regressed by more than {args.threshold:g}%")
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
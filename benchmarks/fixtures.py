@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark fixtures: Codeforces API results served by the stub server
+Usage: python benchmarks/fixtures.py                 (synthetic, deterministic)
+       python benchmarks/fixtures.py --record HANDLE...  (from the live API)
+
+A fixture directory holds one gzip JSON file per API method with the
+`result` the API returned:
+  contest.list.json.gz         contest list, newest first
+  problemset.problems.json.gz  {"problems": [...], "problemStatistics": [...]}
+  contest.standings.json.gz    {contestId: standings result}
+  user.info.json.gz            {handle: user}
+  user.rating.json.gz          {handle: rating changes}
+  user.status.json.gz          {handle: submissions, newest first}
+
+Synthetic fixtures have a large contest list, problemset.problems leaving
+out the newest STANDINGS_ONLY contests (so fetch_problems has to call
+contest.standings for them, as it does for contests the problemset has not
+caught up with), and handles with 1k, 10k and 50k submissions. The newest
+finished contest has LARGE_STANDINGS parties; their rows are generated when
+the stub serves a page (standings_rows), so they are not kept in memory.
+"""
+
+import gzip
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_analytics import LANGUAGES, TAGS, VERDICTS
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# Bump when the synthetic fixtures change, so stale generated ones are rebuilt
+FIXTURE_VERSION = 2
+
+CONTEST_COUNT = 2000
+STANDINGS_ONLY = 300
+HISTORY_SIZES = {'bench1k': 1000, 'bench10k': 10000, 'bench50k': 50000}
+LARGE_STANDINGS = 30000
+# Rank of bench10k in the large standings; the other parties are userN
+LARGE_STANDINGS_USER_RANK = 1234
+
+ROUND_NAMES = [
+    'Codeforces Round {n} (Div. 2)',
+    'Codeforces Round {n} (Div. 1)',
+    'Educational Codeforces Round {n} (Rated for Div. 2)',
+    'Codeforces Round {n} (Div. 3)',
+    'Codeforces Round {n} (Div. 1 + Div. 2)',
+    'Codeforces Round {n} (Div. 4)',
+    'Kotlin Heroes: Episode {n}',
+]
+START_TIME = 1_700_000_000
+PROBLEM_INDEXES = 'ABCDEFGH'
+
+
+def fixture_path(directory: str, method: str) -> str:
+    return os.path.join(directory, f'{method}.json.gz')
+
+
+def load_fixture(directory: str, method: str):
+    with gzip.open(fixture_path(directory, method), 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_fixture(directory: str, method: str, result):
+    os.makedirs(directory, exist_ok=True)
+    path = fixture_path(directory, method)
+    with gzip.open(f'{path}.tmp', 'wt', encoding='utf-8', compresslevel=5) as f:
+        json.dump(result, f, separators=(',', ':'))
+    os.replace(f'{path}.tmp', path)
+
+
+def make_contests(rng: random.Random):
+    """contest.list result: a few upcoming contests, then finished ones, newest first"""
+    contests = []
+    for i in range(CONTEST_COUNT):
+        contest_id = 2100 - i
+        contests.append({
+            'id': contest_id,
+            'name': rng.choice(ROUND_NAMES).format(n=contest_id - 1000),
+            'type': 'CF' if i % 3 else 'ICPC',
+            'phase': 'BEFORE' if i < 3 else 'FINISHED',
+            'frozen': False,
+            'durationSeconds': 7200,
+            'startTimeSeconds': START_TIME - (i - 3) * 3 * 24 * 60 * 60,
+            'relativeTimeSeconds': (i - 3) * 3 * 24 * 60 * 60,
+        })
+    return contests
+
+
+def make_problems(rng: random.Random, contest_id: int):
+    problems = []
+    for position in range(rng.randint(5, len(PROBLEM_INDEXES))):
+        problem = {
+            'contestId': contest_id,
+            'index': PROBLEM_INDEXES[position],
+            'name': f'Problem {contest_id}{PROBLEM_INDEXES[position]}',
+            'type': 'PROGRAMMING',
+            'tags': rng.sample(TAGS, rng.randint(0, 4)),
+        }
+        if rng.random() < 0.9:
+            problem['rating'] = min(800 + position * 300 + rng.randrange(0, 500, 100), 3500)
+        problems.append(problem)
+    return problems
+
+
+def make_standings(contest, problems, parties: int = 0):
+    """contest.standings result; with `parties`, rows are generated by standings_rows instead of stored"""
+    standings = {'contest': contest, 'problems': problems, 'rows': []}
+    if parties:
+        standings['generatedRows'] = parties
+    return standings
+
+
+def _standings_row(contest, problems, rank: int, parties: int):
+    """Row `rank` of generated standings: stronger parties solve more and earlier"""
+    rng = random.Random(contest['id'] * 1_000_003 + rank)
+    strength = 1 - (rank - 1) / parties
+    handle = 'bench10k' if rank == LARGE_STANDINGS_USER_RANK else f'user{rank}'
+    results = []
+    for position, _ in enumerate(problems):
+        if rng.random() < strength * (1.5 - 0.2 * position):
+            results.append({'points': 500.0 * (position + 1), 'rejectedAttemptCount': rng.randint(0, 3),
+                            'type': 'FINAL', 'bestSubmissionTimeSeconds': rng.randint(300, contest['durationSeconds'])})
+        else:
+            results.append({'points': 0.0, 'rejectedAttemptCount': rng.randint(0, 2), 'type': 'FINAL'})
+    return {'party': {'contestId': contest['id'], 'members': [{'handle': handle}], 'participantType': 'CONTESTANT',
+                      'ghost': False, 'startTimeSeconds': contest['startTimeSeconds']},
+            'rank': rank, 'points': round(strength * 10000), 'penalty': 0,
+            'successfulHackCount': 0, 'unsuccessfulHackCount': 0, 'problemResults': results}
+
+
+def standings_rows(standings, start: int, count: int = None):
+    """Rows start..start+count-1 (1-based) of a standings fixture, stored or generated"""
+    parties = standings.get('generatedRows')
+    if parties is None:
+        rows = standings['rows']
+        return rows[start - 1:] if count is None else rows[start - 1:start - 1 + count]
+    end = parties if count is None else min(parties, start - 1 + count)
+    return [_standings_row(standings['contest'], standings['problems'], rank, parties)
+            for rank in range(start, end + 1)]
+
+
+def make_history(rng: random.Random, handle: str, size: int, problems):
+    """user.status result of `size` submissions on fixture problems, newest first"""
+    submissions = []
+    for i in range(size):
+        problem = rng.choice(problems)
+        submissions.append({
+            'id': 300_000_000 - i,
+            'contestId': problem['contestId'],
+            'creationTimeSeconds': START_TIME - i * 600,
+            'relativeTimeSeconds': 2147483647,
+            'problem': problem,
+            'author': {'contestId': problem['contestId'], 'members': [{'handle': handle}],
+                       'participantType': 'PRACTICE', 'ghost': False, 'startTimeSeconds': START_TIME},
+            'programmingLanguage': rng.choice(LANGUAGES),
+            'verdict': rng.choice(VERDICTS),
+            'testset': 'TESTS',
+            'passedTestCount': rng.randint(0, 50),
+            'timeConsumedMillis': rng.randint(15, 2000),
+            'memoryConsumedBytes': rng.randint(0, 256) * 1024 * 1024,
+        })
+    return submissions
+
+
+def make_rating_history(rng: random.Random, handle: str, contests):
+    rating, changes = 1500, []
+    for contest in reversed(contests[:150]):
+        new_rating = max(rating + rng.randint(-80, 100), 0)
+        changes.append({'contestId': contest['id'], 'contestName': contest['name'], 'handle': handle,
+                        'rank': rng.randint(1, 20000), 'ratingUpdateTimeSeconds': contest['startTimeSeconds'] + 9000,
+                        'oldRating': rating, 'newRating': new_rating})
+        rating = new_rating
+    return changes
+
+
+def build_fixtures(directory: str = FIXTURE_DIR, seed: int = 0):
+    """Write the synthetic fixtures"""
+    rng = random.Random(seed)
+    contests = make_contests(rng)
+    finished = [c for c in contests if c['phase'] == 'FINISHED']
+    problems_of = {c['id']: make_problems(rng, c['id']) for c in finished}
+
+    standings = {c['id']: make_standings(c, problems_of[c['id']]) for c in finished}
+    standings[finished[0]['id']] = make_standings(finished[0], problems_of[finished[0]['id']], LARGE_STANDINGS)
+    problemset = [p for c in finished[STANDINGS_ONLY:] for p in problems_of[c['id']]]
+    all_problems = [p for c in finished for p in problems_of[c['id']]]
+
+    users, ratings, histories = {}, {}, {}
+    for handle, size in HISTORY_SIZES.items():
+        changes = make_rating_history(rng, handle, finished)
+        users[handle] = {'handle': handle, 'rating': changes[-1]['newRating'], 'maxRating': 2400,
+                         'rank': 'expert', 'maxRank': 'international master', 'country': 'Benchland',
+                         'contribution': 0, 'friendOfCount': 10, 'registrationTimeSeconds': START_TIME - 10 ** 8}
+        ratings[handle] = changes
+        histories[handle] = make_history(rng, handle, size, all_problems)
+
+    save_fixture(directory, 'contest.list', contests)
+    save_fixture(directory, 'problemset.problems', {'problems': problemset, 'problemStatistics': []})
+    save_fixture(directory, 'contest.standings', standings)
+    save_fixture(directory, 'user.info', users)
+    save_fixture(directory, 'user.rating', ratings)
+    save_fixture(directory, 'user.status', histories)
+    with open(os.path.join(directory, 'VERSION'), 'w') as f:
+        f.write(f'synthetic {FIXTURE_VERSION} {seed}\n')
+    print(f"Wrote synthetic fixtures to {directory}")
+
+
+def ensure_fixtures(directory: str = FIXTURE_DIR):
+    """Build the synthetic fixtures unless the directory has current (or recorded) ones"""
+    try:
+        with open(os.path.join(directory, 'VERSION')) as f:
+            kind, version = f.read().split()[:2]
+        if kind == 'recorded' or int(version) == FIXTURE_VERSION:
+            return
+    except (OSError, ValueError):
+        pass
+    build_fixtures(directory)
+
+
+def record_fixtures(handles, directory: str = FIXTURE_DIR, standings_count: int = STANDINGS_ONLY):
+    """Record fixtures from the live API: contest list, problemset, recent standings and the handles' data"""
+    from cf_api import call_api
+
+    def fetch(method, params=None):
+        result, error = call_api(method, params)
+        if error:
+            sys.exit(f"Could not record {method} {params or ''}: {error}")
+        return result
+
+    contests = fetch('contest.list')
+    finished = [c for c in contests if c.get('phase') == 'FINISHED']
+    standings = {}
+    for contest in finished[:standings_count]:
+        print(f"Recording standings of contest {contest['id']}...")
+        standings[contest['id']] = fetch('contest.standings', {'contestId': contest['id'], 'from': 1, 'count': 1})
+
+    users = {u['handle']: u for u in fetch('user.info', {'handles': ';'.join(handles)})}
+    save_fixture(directory, 'contest.list', contests)
+    save_fixture(directory, 'problemset.problems', fetch('problemset.problems'))
+    save_fixture(directory, 'contest.standings', standings)
+    save_fixture(directory, 'user.info', users)
+    save_fixture(directory, 'user.rating', {h: fetch('user.rating', {'handle': h}) for h in users})
+    save_fixture(directory, 'user.status', {h: fetch('user.status', {'handle': h}) for h in users})
+    with open(os.path.join(directory, 'VERSION'), 'w') as f:
+        f.write(f'recorded {FIXTURE_VERSION} {" ".join(users)}\n')
+    print(f"Recorded fixtures for {', '.join(users)} to {directory}")
+
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ['--record']:
+        if len(args) < 2:
+            sys.exit("Usage: python benchmarks/fixtures.py --record HANDLE...")
+        record_fixtures(args[1:])
+    else:
+        build_fixtures()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+"""
+Stub Codeforces API serving benchmark fixtures
+Usage: python benchmarks/stub_server.py [port]
+
+Answers contest.list, problemset.problems, contest.standings, user.info,
+user.rating and user.status (the last two lists with from/count paging)
+from a fixture directory, optionally after a fixed latency to mimic the network. Point the
+app at it with cf_api.API_BASE_URL = server.base_url.
+"""
+
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from fixtures import FIXTURE_DIR, ensure_fixtures, load_fixture, standings_rows
+
+METHODS = ('contest.list', 'problemset.problems', 'contest.standings', 'user.info', 'user.rating', 'user.status')
+
+
+def _paged(items, params):
+    start = int(params.get('from', 1))
+    count = params.get('count')
+    return items[start - 1:] if count is None else items[start - 1:start - 1 + int(count)]
+
+
+class FixtureAPI:
+    """API responses built from the fixtures: (HTTP status, body) per call"""
+
+    def __init__(self, directory: str = FIXTURE_DIR):
+        self.data = {method: load_fixture(directory, method) for method in METHODS}
+        # JSON object keys are strings; handles are case-insensitive
+        for method in ('user.info', 'user.rating', 'user.status'):
+            self.data[method] = {handle.lower(): value for handle, value in self.data[method].items()}
+        # encoded once: these are the large responses
+        self.bodies = {method: self._encode(self.data[method]) for method in ('contest.list', 'problemset.problems')}
+        # generated standings pages, by (contestId, from, count)
+        self.standings_pages = {}
+
+    @staticmethod
+    def _encode(result) -> bytes:
+        return json.dumps({'status': 'OK', 'result': result}, separators=(',', ':')).encode('utf-8')
+
+    def _ok(self, result):
+        return 200, self._encode(result)
+
+    @staticmethod
+    def _failed(comment: str):
+        # like the API: failed calls are HTTP 400 with a comment
+        return 400, json.dumps({'status': 'FAILED', 'comment': comment}).encode('utf-8')
+
+    def response(self, method: str, params):
+        if method in self.bodies:
+            return 200, self.bodies[method]
+        if method == 'contest.standings':
+            standings = self.data[method].get(params.get('contestId', ''))
+            if standings is None:
+                return self._failed(f"contestId: Contest with id {params.get('contestId')} not found")
+            start, count = int(params.get('from', 1)), params.get('count')
+            key = (params.get('contestId'), start, count)
+            if key not in self.standings_pages:
+                page = dict(standings, rows=standings_rows(standings, start, int(count) if count is not None else None))
+                page.pop('generatedRows', None)
+                self.standings_pages[key] = self._ok(page)
+            return self.standings_pages[key]
+        if method == 'user.info':
+            handles = params.get('handles', '').split(';')
+            users = [self.data[method].get(handle.lower()) for handle in handles]
+            if None in users:
+                return self._failed(f"handles: User with handle {handles[users.index(None)]} not found")
+            return self._ok(users)
+        if method in ('user.rating', 'user.status'):
+            result = self.data[method].get(params.get('handle', '').lower())
+            if result is None:
+                return self._failed(f"handle: User with handle {params.get('handle')} not found")
+            return self._ok(_paged(result, params) if method == 'user.status' else result)
+        return self._failed(f"Unknown method {method}")
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, api: FixtureAPI, port: int = 0, latency: float = 0.0):
+        super().__init__(('127.0.0.1', port), StubHandler)
+        self.api = api
+        self.latency = latency
+        self.calls = Counter()
+        self._calls_lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self.server_port}/'
+
+    def handle_error(self, request, client_address):
+        # clients closing idle keep-alive connections are not errors
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def count(self, method: str):
+        with self._calls_lock:
+            self.calls[method] += 1
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body are separate writes; with Nagle's algorithm on, each
+    # small response would wait for the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        method = url.path.rsplit('/', 1)[-1]
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        self.server.count(method)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        status, body = self.server.api.response(method, params)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json;charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_stub_server(directory: str = FIXTURE_DIR, port: int = 0, latency: float = 0.0) -> StubServer:
+    """Serve the fixtures from a background thread"""
+    ensure_fixtures(directory)
+    server = StubServer(FixtureAPI(directory), port, latency)
+    threading.Thread(target=server.serve_forever, name='stub-api', daemon=True).start()
+    return server
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8123
+    server = start_stub_server(port=port)
+    print(f"Serving fixtures from {FIXTURE_DIR} at {server.base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
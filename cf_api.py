@@ -0,0 +1,386 @@
+"""
+Codeforces Tutor - Codeforces API client
+One pooled keep-alive session for every API call, with retries on
+rate limiting and a single place that decodes API responses.
+call_api_async() is the same call for coroutines, made on the same session
+in a worker thread.
+Successful responses are kept in the on-disk response store, which also
+answers when the API is unreachable or in offline mode. Signed calls
+(utils.generate_url, with the configured API key) are never stored.
+"""
+
+import asyncio
+import codecs
+import json
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from concurrent_fetch import SingleFlight
+from config import OFFLINE_MODE, RESPONSE_STORE_ENABLED
+from rate_limit import RateBudgetExceeded, api_limiter
+from response_store import StoredResponse, response_store
+from utils import generate_url
+
+API_BASE_URL = "https://codeforces.com/api/"
+
+# Read timeout per API method (seconds); big payloads get more time
+METHOD_TIMEOUTS = {
+    'contest.list': 20,
+    'contest.standings': 10,
+    'problemset.problems': 30,
+    'user.info': 10,
+    'user.rating': 10,
+    'user.status': 30,
+}
+DEFAULT_TIMEOUT = 10
+CONNECT_TIMEOUT = 5
+
+# Retry policy for rate limiting / temporary unavailability
+RETRY_STATUSES = {429, 502, 503, 504}
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5  # seconds, doubled on every retry
+BACKOFF_MAX = 8
+
+POOL_SIZE = 16
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Return the shared session, creating it on first use"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers['User-Agent'] = 'cf-tutor'
+            _session = session
+        return _session
+
+
+def _backoff_delay(attempt: int, response: requests.Response = None) -> float:
+    """Delay before retry number `attempt` (0-based), honouring Retry-After"""
+    if response is not None:
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return min(float(retry_after), BACKOFF_MAX)
+    return min(BACKOFF_BASE * (2 ** attempt), BACKOFF_MAX)
+
+
+def _is_call_limit(response: requests.Response) -> bool:
+    """Codeforces reports rate limiting as a FAILED status with this comment"""
+    try:
+        return 'Call limit exceeded' in response.json().get('comment', '')
+    except ValueError:
+        return False
+
+
+def _unavailable(response: requests.Response) -> bool:
+    """The API is rate limiting us or briefly down (worth a retry)"""
+    return response.status_code in RETRY_STATUSES or (
+        response.status_code != 200 and _is_call_limit(response))
+
+
+def decode_response(response: requests.Response) -> Tuple[Any, Optional[str]]:
+    """Turn an API response into (result, error)"""
+    try:
+        data = response.json()
+    except ValueError:
+        return None, f"HTTP Error {response.status_code}"
+
+    if data.get('status') != 'OK':
+        # failed calls (e.g. unknown handle) come with HTTP 400 and a comment
+        return None, data.get('comment') or f"HTTP Error {response.status_code}"
+
+    if response.status_code != 200:
+        return None, f"HTTP Error {response.status_code}"
+
+    return data['result'], None
+
+
+def _observe(method: str, start: float, response=None):
+    """Record the latency and outcome of one HTTP attempt"""
+    elapsed = time.perf_counter() - start
+    metrics.API_REQUEST_SECONDS.observe(elapsed, method=method)
+    metrics.API_REQUESTS.inc(method=method, status=response.status_code if response is not None else 'error')
+    metrics.record(f'api.{method}', elapsed)
+
+
+def _request(method: str, params: Dict = None, timeout: float = None,
+             stream: bool = False, signed: bool = False) -> requests.Response:
+    """GET an API method, retrying with exponential backoff when the API is
+    rate limiting us (HTTP 429/503 or "Call limit exceeded") or briefly
+    unavailable. Every attempt waits on the API token bucket (and a signed
+    call is signed again, as signatures expire). Network errors and
+    RateBudgetExceeded are raised.
+    """
+    url = API_BASE_URL + method
+    read_timeout = timeout or METHOD_TIMEOUTS.get(method, DEFAULT_TIMEOUT)
+    session = get_session()
+
+    for attempt in range(MAX_RETRIES + 1):
+        api_limiter.acquire()
+        start = time.perf_counter()
+        response = None
+        try:
+            if signed:
+                response = session.get(generate_url(method, params, API_BASE_URL),
+                                       timeout=(CONNECT_TIMEOUT, read_timeout), stream=stream)
+            else:
+                response = session.get(url, params=params, timeout=(CONNECT_TIMEOUT, read_timeout), stream=stream)
+        finally:
+            _observe(method, start, response)
+        if not _unavailable(response) or attempt == MAX_RETRIES:
+            return response
+        response.close()
+        time.sleep(_backoff_delay(attempt, response))
+
+
+def describe_error(e: Exception) -> str:
+    """Error message for an exception raised while talking to the API"""
+    if isinstance(e, RateBudgetExceeded):
+        return "Too many Codeforces API calls queued, try again shortly"
+    if isinstance(e, requests.exceptions.Timeout):
+        return "Request timeout"
+    if isinstance(e, requests.exceptions.RequestException):
+        return f"Network error: {e}"
+    return f"Unexpected error: {e}"
+
+
+# Identical calls (method and parameters) in flight at the same time share one request
+api_flights = SingleFlight('api')
+
+
+def _flight_key(method: str, params: Dict = None, signed: bool = False, store: bool = True) -> Tuple:
+    return (method, signed, store) + tuple(sorted((name, str(value)) for name, value in (params or {}).items()))
+
+
+def _stored(kind: str, method: str, params: Dict = None, store: bool = True):
+    """(stored entry or None, error if the API must not be called)
+
+    The entry is returned when it should be served as is: it is fresh, or
+    we are offline. Otherwise it comes back only as a fallback for errors.
+    Calls made with store=False (e.g. signed ones, which may return private
+    data) are neither looked up nor stored.
+    """
+    if not store and OFFLINE_MODE:
+        return None, f"Offline: {method} responses of this call are not stored"
+    if not store or not RESPONSE_STORE_ENABLED:
+        return None, None
+    entry = response_store.lookup(kind, method, params)
+    metrics.CACHE_LOOKUPS.inc(cache='response_store', result='miss' if entry is None else
+                              'hit' if OFFLINE_MODE or entry.fresh else 'expired')
+    if OFFLINE_MODE and entry is None:
+        return None, f"Offline: no stored {method} response"
+    return entry, None
+
+
+def _serve_now(entry: Optional[StoredResponse]) -> bool:
+    return entry is not None and (OFFLINE_MODE or entry.fresh)
+
+
+def _stored_result(entry: StoredResponse, method: str) -> Tuple[Any, Optional[str]]:
+    body = response_store.read_body(entry)
+    if body is None:
+        return None, f"Stored {method} response disappeared"
+    return json.loads(body)['result'], None
+
+
+def _decoded_call(method: str, params: Dict, entry: Optional[StoredResponse],
+                  response=None, exception: Exception = None, store: bool = True) -> Tuple[Any, Optional[str]]:
+    """(result, error) for a finished call: successes are stored, and a stale
+    stored response is served when the API could not be reached
+    """
+    if exception is not None or _unavailable(response):
+        if entry is not None:
+            print(f"Codeforces API unavailable, using stored {method} response")
+            metrics.CACHE_LOOKUPS.inc(cache='response_store', result='stale_fallback')
+            return _stored_result(entry, method)
+        if exception is not None:
+            return None, describe_error(exception)
+    result, error = decode_response(response)
+    if error is None and store and RESPONSE_STORE_ENABLED:
+        response_store.put_body('body', method, params, response.content)
+    return result, error
+
+
+def _call_api(method: str, params: Dict = None, timeout: float = None,
+              signed: bool = False, store: bool = True) -> Tuple[Any, Optional[str]]:
+    store = store and not signed
+    entry, error = _stored('body', method, params, store)
+    if error:
+        return None, error
+    if _serve_now(entry):
+        return _stored_result(entry, method)
+    try:
+        response = _request(method, params, timeout, signed=signed)
+    except Exception as e:
+        return _decoded_call(method, params, entry, exception=e)
+    return _decoded_call(method, params, entry, response, store=store)
+
+
+def call_api(method: str, params: Dict = None, timeout: float = None,
+             signed: bool = False, store: bool = True) -> Tuple[Any, Optional[str]]:
+    """Call a Codeforces API method and return (result, error).
+
+    Callers asking for the same method and parameters while a call is in
+    flight get that call's result, so treat results as read-only. `signed`
+    calls are authenticated with the configured API key (utils.generate_url).
+    With store=False (always for signed calls) the response store is neither
+    read nor written, so the result is fresh from the API.
+    """
+    return api_flights.do(_flight_key(method, params, signed, store), _call_api, method, params, timeout, signed, store)
+
+
+async def call_api_async(method: str, params: Dict = None, timeout: float = None) -> Tuple[Any, Optional[str]]:
+    """call_api() for coroutines; returns (result, error).
+
+    The call runs on the pooled requests session in a worker thread, so the
+    event loop is never blocked and connections are shared with call_api().
+    Shares in-flight calls with call_api() and other loops.
+    """
+    key = _flight_key(method, params)
+    future, leader = api_flights.join(key)
+    if not leader:
+        return await asyncio.wrap_future(future)
+
+    result = None, "Request cancelled"
+    try:
+        result = await asyncio.to_thread(_call_api, method, params, timeout)
+    except Exception as e:
+        result = None, describe_error(e)
+    finally:
+        api_flights.finish(key, future, result)
+    return result
+
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE_AND_COMMAS = re.compile(r'[\s,]*')
+
+
+def _iter_list_items(response, buffer: str, chunks: Iterator[str], writer=None) -> Iterator[Any]:
+    """Decode the items of a JSON array one at a time.
+
+    `buffer` starts right after the opening bracket. Only the item being
+    decoded is held in memory; closing the generator closes the connection
+    (or file) without reading the rest of the body. The raw text of every
+    item goes to `writer` (a response_store.EntryWriter), which is committed
+    only if the whole list was read.
+    """
+    decoder = json.JSONDecoder()
+    pos = 0
+    try:
+        while True:
+            pos = _WHITESPACE_AND_COMMAS.match(buffer, pos).end()
+            if pos < len(buffer) and buffer[pos] == ']':
+                if writer is not None:
+                    writer.commit()
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                # item not complete yet: read on
+                chunk = next(chunks, None)
+                if chunk is None:
+                    raise ValueError("Truncated API response")
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            if writer is not None:
+                writer.write_item(buffer[pos:end])
+            yield item
+            pos = end
+    finally:
+        if writer is not None:
+            writer.discard()
+        response.close()
+
+
+def _replay_list(entry: StoredResponse) -> Optional[Iterator[Any]]:
+    """Items of a stored list, decoded from the file as they are read"""
+    f = response_store.open_items(entry)
+    if f is None:
+        return None
+    return _iter_list_items(f, '', iter(lambda: f.read(STREAM_CHUNK_SIZE), ''))
+
+
+def stream_api(method: str, params: Dict = None, timeout: float = None, list_key: str = 'result',
+               signed: bool = False, store: bool = True) -> Tuple[Optional[Iterator[Any]], Optional[str]]:
+    """Call an API method returning a list and return (items, error).
+
+    `items` is an iterator that decodes the list while it is downloaded, so
+    large responses never sit in memory as a whole and can be abandoned early.
+    `list_key` names the list when it is nested in the result (e.g. 'problems'
+    for problemset.problems). Network errors while iterating are raised as
+    requests exceptions. A list read to the end is kept in the response store
+    unless `store` is False or the call is `signed`.
+    """
+    kind = f'list-{list_key}'
+    store = store and not signed
+    entry, error = _stored(kind, method, params, store)
+    if error:
+        return None, error
+    if _serve_now(entry):
+        items = _replay_list(entry)
+        if items is not None or OFFLINE_MODE:
+            return items, None if items is not None else f"Offline: no stored {method} response"
+
+    list_start = re.compile(r'"%s"\s*:\s*\[' % re.escape(list_key))
+    try:
+        response = _request(method, params, timeout, stream=True, signed=signed)
+        if response.status_code != 200:
+            if entry is not None and _unavailable(response):
+                response.close()
+                return _stale_list(entry, method, decode_response(response))
+            return decode_response(response)
+
+        decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')()
+        chunks = (decoder.decode(chunk) for chunk in response.iter_content(STREAM_CHUNK_SIZE))
+        buffer = ''
+        for chunk in chunks:
+            buffer += chunk
+            match = list_start.search(buffer)
+            if match:
+                writer = response_store.writer(kind, method, params) if RESPONSE_STORE_ENABLED and store else None
+                return _iter_list_items(response, buffer[match.end():], chunks, writer), None
+            if '"FAILED"' in buffer:
+                break
+
+        # no result list: an error (or an empty/odd body); decode it whole
+        buffer += ''.join(chunks)
+        response.close()
+        try:
+            data = json.loads(buffer)
+        except ValueError:
+            return None, "Invalid API response"
+        if data.get('status') != 'OK':
+            return None, data.get('comment', 'Unknown API error')
+        result = data.get('result')
+        if list_key != 'result' and isinstance(result, dict):
+            result = result.get(list_key)
+        return (item for item in result or ()), None
+
+    except Exception as e:
+        if entry is not None:
+            return _stale_list(entry, method, (None, describe_error(e)))
+        return None, describe_error(e)
+
+
+def _stale_list(entry: StoredResponse, method: str, failure: Tuple[Any, Optional[str]]):
+    """The stored list when the API could not be reached, else the call's (None, error)"""
+    items = _replay_list(entry)
+    if items is None:
+        return failure
+    print(f"Codeforces API unavailable, using stored {method} response")
+    metrics.CACHE_LOOKUPS.inc(cache='response_store', result='stale_fallback')
+    return items, None
@@ -0,0 +1,169 @@
+"""
+Codeforces Tutor - Concurrent fetching
+Runs independent API calls on a small thread pool (the API call rate itself
+is limited in cf_api by rate_limit.api_limiter), and coalesces identical
+calls that are in flight at the same time.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, Iterable, Iterator, Tuple, Any
+
+import metrics
+from config import FETCH_MAX_WORKERS
+
+
+class RateLimiter:
+    """Spaces call start times so that at most `rate` calls start per second"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take the next free slot and return how long to wait for it"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        return slot - now
+
+    def wait(self):
+        """Block until the caller may start its call"""
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self):
+        """wait() for coroutines: sleeps without blocking the event loop"""
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls.
+
+    While a call for a key is in flight, other callers with the same key wait
+    for it and get its result (or exception) instead of making their own.
+    Works across threads and event loops: the shared result is a
+    concurrent.futures.Future, which coroutines await via asyncio.wrap_future.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def join(self, key: Hashable) -> Tuple[Future, bool]:
+        """Return (future of the call for `key`, True if the caller has to make the call)"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                metrics.COALESCED_CALLS.inc(flight=self.name)
+                return future, False
+            future = self._calls[key] = Future()
+            return future, True
+
+    def finish(self, key: Hashable, future: Future, result: Any = None, error: BaseException = None):
+        """Publish the outcome of the call made after join() returned True"""
+        with self._lock:
+            del self._calls[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: Hashable, func: Callable, *args) -> Any:
+        """Return func(*args), sharing one call between concurrent callers with the same key"""
+        future, leader = self.join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = func(*args)
+        except BaseException as e:
+            self.finish(key, future, error=e)
+            raise
+        self.finish(key, future, result)
+        return result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+def fetch_in_order(items: Iterable, fetch: Callable[[Any], Any],
+                   max_workers: int = FETCH_MAX_WORKERS,
+                   rate_limiter: RateLimiter = None) -> Iterator[Tuple[Any, Any]]:
+    """Yield (item, fetch(item)) in the order of `items`, running fetches in parallel.
+
+    At most 2 * max_workers calls are queued ahead of the consumer, so closing
+    the generator early (e.g. after a `break`) cancels the calls not started yet.
+    `rate_limiter` optionally spaces the fetches further than the API limit.
+    """
+    def limited_fetch(item):
+        if rate_limiter is not None:
+            rate_limiter.wait()
+        return fetch(item)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = deque()
+    remaining = iter(items)
+    try:
+        for item in remaining:
+            pending.append((item, executor.submit(limited_fetch, item)))
+            if len(pending) >= 2 * max_workers:
+                break
+
+        while pending:
+            item, future = pending.popleft()
+            result = future.result()
+            for next_item in remaining:
+                pending.append((next_item, executor.submit(limited_fetch, next_item)))
+                break
+            yield item, result
+    finally:
+        for _, future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+async def fetch_in_order_async(items: Iterable, fetch: Callable[[Any], Awaitable[Any]],
+                               max_workers: int = FETCH_MAX_WORKERS,
+                               rate_limiter: RateLimiter = None) -> AsyncIterator[Tuple[Any, Any]]:
+    """fetch_in_order for coroutines: yield (item, await fetch(item)) in the order of `items`.
+
+    Fetches run as tasks on the running loop, at most `max_workers` at a time
+    and 2 * max_workers ahead of the consumer; closing the generator (aclose)
+    cancels the tasks still pending.
+    """
+    slots = asyncio.Semaphore(max_workers)
+
+    async def limited_fetch(item):
+        async with slots:
+            if rate_limiter is not None:
+                await rate_limiter.wait_async()
+            return await fetch(item)
+
+    pending = deque()
+    remaining = iter(items)
+    try:
+        for item in remaining:
+            pending.append((item, asyncio.ensure_future(limited_fetch(item))))
+            if len(pending) >= 2 * max_workers:
+                break
+
+        while pending:
+            item, task = pending.popleft()
+            result = await task
+            for next_item in remaining:
+                pending.append((next_item, asyncio.ensure_future(limited_fetch(next_item))))
+                break
+            yield item, result
+    finally:
+        for _, task in pending:
+            task.cancel()
@@ -0,0 +1,97 @@
+"""
+Codeforces Tutor - Shared settings
+Values can be overridden with environment variables
+"""
+
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Directory for the on-disk caches (problem index, submissions, ...)
+CACHE_DIR = os.environ.get('CF_TUTOR_CACHE_DIR', os.path.join(BASE_DIR, 'cache'))
+
+# Rebuild the local problem index when it is older than this (seconds)
+PROBLEM_INDEX_MAX_AGE = int(os.environ.get('CF_TUTOR_PROBLEM_INDEX_MAX_AGE', 24 * 60 * 60))
+
+# contest.list cache: served as is for CONTEST_LIST_TTL seconds, then served
+# stale while a background refresh runs, refetched up front after MAX_STALE
+CONTEST_LIST_TTL = int(os.environ.get('CF_TUTOR_CONTEST_LIST_TTL', 60 * 60))
+CONTEST_LIST_MAX_STALE = int(os.environ.get('CF_TUTOR_CONTEST_LIST_MAX_STALE', 7 * 24 * 60 * 60))
+
+# user.status page size used when syncing new submissions of a known handle
+SUBMISSION_SYNC_PAGE_SIZE = int(os.environ.get('CF_TUTOR_SUBMISSION_SYNC_PAGE_SIZE', 50))
+
+# Histories with at least this many submissions are analyzed with the NumPy
+# engine (analytics_columnar.py) when NumPy is installed
+COLUMNAR_MIN_SUBMISSIONS = int(os.environ.get('CF_TUTOR_COLUMNAR_MIN_SUBMISSIONS', 20000))
+
+# /user_analytics page cache: pages younger than the TTL are served without
+# any API call; older ones are re-rendered only if the data changed
+ANALYTICS_CACHE_TTL = int(os.environ.get('CF_TUTOR_ANALYTICS_CACHE_TTL', 60))
+ANALYTICS_CACHE_MAX_BYTES = int(os.environ.get('CF_TUTOR_ANALYTICS_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+# On-disk API response store (response_store.py). In offline mode only stored
+# responses are used and the API is never called.
+RESPONSE_STORE_ENABLED = os.environ.get('CF_TUTOR_RESPONSE_STORE', '1') != '0'
+RESPONSE_STORE_DIR = os.environ.get('CF_TUTOR_RESPONSE_DIR', os.path.join(CACHE_DIR, 'responses'))
+RESPONSE_STORE_MAX_BYTES = int(os.environ.get('CF_TUTOR_RESPONSE_STORE_MAX_BYTES', 256 * 1024 * 1024))
+OFFLINE_MODE = os.environ.get('CF_TUTOR_OFFLINE', '0') == '1'
+
+# Add a Server-Timing header with the phase timings to every web response
+# (always on when Flask runs in debug mode)
+TIMING_HEADER = os.environ.get('CF_TUTOR_TIMING_HEADER', '0') == '1'
+
+# Live contest.standings fetches run on FETCH_MAX_WORKERS threads; all API
+# calls together stay under API_REQUESTS_PER_SECOND.
+# Codeforces answers "Call limit exceeded" above a few calls per second.
+FETCH_MAX_WORKERS = int(os.environ.get('CF_TUTOR_FETCH_MAX_WORKERS', 4))
+API_REQUESTS_PER_SECOND = float(os.environ.get('CF_TUTOR_API_REQUESTS_PER_SECOND', 4))
+
+# Team comparison (team_analytics.py): most handles per comparison, and how
+# many members are fetched at a time (each member's calls still pass the API limiter)
+TEAM_MAX_HANDLES = int(os.environ.get('CF_TUTOR_TEAM_MAX_HANDLES', 50))
+TEAM_FETCH_WORKERS = int(os.environ.get('CF_TUTOR_TEAM_FETCH_WORKERS', 8))
+
+# Batch analytics (batch_analytics.py): handles fetched at a time (each one's
+# calls still pass the API limiter) and analysis processes (0: one per CPU)
+BATCH_FETCH_WORKERS = int(os.environ.get('CF_TUTOR_BATCH_FETCH_WORKERS', 8))
+BATCH_PROCESSES = int(os.environ.get('CF_TUTOR_BATCH_PROCESSES', 0))
+
+# Codeforces API key (https://codeforces.com/settings/api). When both are set,
+# standings ingestion (contest_standings.py) makes signed calls, which can also
+# read the standings of private contests the key's owner can see
+API_KEY = os.environ.get('CF_TUTOR_API_KEY', '')
+API_SECRET = os.environ.get('CF_TUTOR_API_SECRET', '')
+
+# Full standings ingestion: rows per contest.standings page (rows are decoded
+# one at a time, so the page size does not change memory use), the memory
+# budget of the standings kept in memory, how long those of a running contest
+# are reused before being ingested again (seconds), and how many contests the
+# web app may have waiting for a background ingestion
+STANDINGS_PAGE_SIZE = int(os.environ.get('CF_TUTOR_STANDINGS_PAGE_SIZE', 10000))
+STANDINGS_CACHE_MAX_BYTES = int(os.environ.get('CF_TUTOR_STANDINGS_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+STANDINGS_RUNNING_TTL = int(os.environ.get('CF_TUTOR_STANDINGS_RUNNING_TTL', 60))
+STANDINGS_QUEUE_MAX = int(os.environ.get('CF_TUTOR_STANDINGS_QUEUE_MAX', 8))
+
+# Token bucket every API call passes through (rate_limit.py): burst size, the
+# longest a call may queue before it fails, and where the bucket lives:
+# 'memory' (per process) or 'sqlite' (shared by all processes using CACHE_DIR)
+API_BURST = int(os.environ.get('CF_TUTOR_API_BURST', 4))
+API_MAX_QUEUE_WAIT = float(os.environ.get('CF_TUTOR_API_MAX_QUEUE_WAIT', 30))
+RATE_LIMIT_BACKEND = os.environ.get('CF_TUTOR_RATE_LIMIT_BACKEND', 'memory')
+
+# Background prefetching in the web app (prefetch.py): how often it runs, the
+# share of API_REQUESTS_PER_SECOND it may use, how many recent contests it
+# keeps indexed and which recently seen handles it keeps synced
+PREFETCH_ENABLED = os.environ.get('CF_TUTOR_PREFETCH', '1') != '0'
+PREFETCH_INTERVAL = int(os.environ.get('CF_TUTOR_PREFETCH_INTERVAL', 5 * 60))
+PREFETCH_RATE_SHARE = float(os.environ.get('CF_TUTOR_PREFETCH_RATE_SHARE', 0.5))
+PREFETCH_CONTESTS = int(os.environ.get('CF_TUTOR_PREFETCH_CONTESTS', 500))
+PREFETCH_HANDLE_WINDOW = int(os.environ.get('CF_TUTOR_PREFETCH_HANDLE_WINDOW', 24 * 60 * 60))
+PREFETCH_MAX_HANDLES = int(os.environ.get('CF_TUTOR_PREFETCH_MAX_HANDLES', 50))
+
+
+def ensure_cache_dir():
+    """Create the cache directory if needed and return its path"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return CACHE_DIR
@@ -0,0 +1,174 @@
+"""
+Codeforces Tutor - Contest list cache
+Keeps the parsed contest.list result in memory with a TTL. Once the TTL
+expires the stale list keeps being served while a background thread
+downloads a fresh one.
+"""
+
+import itertools
+import threading
+import time
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+from cf_api import describe_error, stream_api
+import metrics
+from config import CONTEST_LIST_TTL, CONTEST_LIST_MAX_STALE
+from records import Contest
+
+# Process-wide, so a contest list's generation never repeats
+_generations = itertools.count(1)
+
+CONTEST_TYPES = ["Div. 1 + Div. 2", "Div. 1", "Div. 2", "Div. 3", "Div. 4"]
+
+
+def contest_divisions(name: str) -> FrozenSet[str]:
+    """Contest types whose label appears in the contest name.
+
+    "Div. 1 + Div. 2" rounds also contain the "Div. 1" and "Div. 2" labels,
+    so they match any of the three preferences.
+    """
+    return frozenset(t for t in CONTEST_TYPES if t in name)
+
+
+class ContestList:
+    """A parsed contest.list result with the division of every contest precomputed"""
+
+    def __init__(self, contests: Iterable[Contest], fetched_at: float = None):
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+        # caches built from the list key on it
+        self.generation = next(_generations)
+        self.contests: List[Contest] = []
+        self.by_id: Dict[int, Contest] = {}
+        self.divisions: Dict[int, FrozenSet[str]] = {}
+        # started contests with a known division, newest first (API order)
+        self.divisional: List[Contest] = []
+        for contest in contests:
+            self.contests.append(contest)
+            self.by_id[contest.id] = contest
+            divisions = contest_divisions(contest.name)
+            self.divisions[contest.id] = divisions
+            if divisions and contest.phase != "BEFORE":
+                self.divisional.append(contest)
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    def select(self, contest_types: List[str], max_count: int) -> List[Contest]:
+        """The `max_count` most recent started contests of the wanted types"""
+        wanted = frozenset(contest_types)
+        selected = []
+        for contest in self.divisional:
+            if self.divisions[contest.id] & wanted:
+                selected.append(contest)
+                if len(selected) == max_count:
+                    break
+        return selected
+
+
+_cached: Optional[ContestList] = None
+_lock = threading.Lock()
+_refreshing = False
+
+
+def download_contest_list():
+    """Download contest.list, decoding contests one by one as they arrive"""
+    items, error = stream_api('contest.list')
+    if error:
+        return None, error
+    try:
+        return ContestList(Contest.from_api(c) for c in items), None
+    except Exception as e:
+        return None, describe_error(e)
+
+
+def _refresh_in_background():
+    global _cached, _refreshing
+    try:
+        fresh, error = download_contest_list()
+        if fresh is not None:
+            with _lock:
+                _cached = fresh
+        else:
+            print(f"Background contest list refresh failed: {error}")
+    finally:
+        with _lock:
+            _refreshing = False
+
+
+def _start_background_refresh():
+    """Start a refresh thread unless one is already running; call with _lock held"""
+    global _refreshing
+    if not _refreshing:
+        _refreshing = True
+        threading.Thread(target=_refresh_in_background, daemon=True).start()
+
+
+def cached_contest_list() -> Optional[ContestList]:
+    """The cached list (possibly stale), None if nothing was downloaded yet"""
+    with _lock:
+        return _cached
+
+
+def get_contest_list(refresh: bool = False):
+    """Return (ContestList, error), downloading only when nothing usable is cached.
+
+    A list older than CONTEST_LIST_TTL is returned as is and refreshed on a
+    background thread; one older than CONTEST_LIST_MAX_STALE is refetched
+    before returning.
+    """
+    global _cached
+    with _lock:
+        cached = _cached
+        if cached is not None and not refresh:
+            if cached.age() < CONTEST_LIST_TTL:
+                metrics.CACHE_LOOKUPS.inc(cache='contest_list', result='hit')
+                return cached, None
+            if cached.age() < CONTEST_LIST_MAX_STALE:
+                metrics.CACHE_LOOKUPS.inc(cache='contest_list', result='stale')
+                _start_background_refresh()
+                return cached, None
+        metrics.CACHE_LOOKUPS.inc(cache='contest_list', result='miss')
+
+    fresh, error = download_contest_list()
+    if fresh is None:
+        # an old list is still better than none
+        return (cached, None) if cached is not None else (None, error)
+    with _lock:
+        _cached = fresh
+    return fresh, None
+
+
+def select_contests(contest_types: List[str], max_count: int):
+    """Return (contests, error): the `max_count` most recent started contests of the wanted types.
+
+    Uses the cached list when there is one. On a cold cache the full list is
+    downloaded in the background while this call streams contest.list and
+    stops reading as soon as enough contests are found.
+    """
+    with _lock:
+        cold = _cached is None
+        if cold:
+            _start_background_refresh()
+    if not cold:
+        contest_list, error = get_contest_list()
+        if error:
+            return None, error
+        return contest_list.select(contest_types, max_count), None
+
+    items, error = stream_api('contest.list')
+    if error:
+        return None, error
+    wanted = frozenset(contest_types)
+    selected = []
+    try:
+        for data in items:
+            contest = Contest.from_api(data)
+            if contest.phase != "BEFORE" and contest_divisions(contest.name) & wanted:
+                selected.append(contest)
+                if len(selected) == max_count:
+                    break
+    except Exception as e:
+        return None, describe_error(e)
+    finally:
+        items.close()
+    return selected, None
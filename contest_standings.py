@@ -0,0 +1,323 @@
+"""
+Codeforces Tutor - Contest standings
+Full contest standings in a compact columnar store: per row (party, in rank
+order) the rank, the members' handles, the points and, per problem, the
+solve time in seconds from the contest start.
+
+Ingestion pages through contest.standings with large pages and decodes the
+rows one at a time while they download (cf_api.stream_api), appending each
+to the typed arrays. Memory therefore grows only with the compact columns
+(~80 bytes per participant plus 4 per problem), never with the JSON, even
+for contests with tens of thousands of participants. Calls are signed with
+the configured API key when there is one (utils.generate_url).
+
+Standings of finished contests are final and kept on disk in CACHE_DIR;
+loaded ones stay in memory up to STANDINGS_CACHE_MAX_BYTES. Standings of
+running contests are kept in memory for STANDINGS_RUNNING_TTL seconds only. The web app never ingests while a
+request waits: queue_ingestion() runs ingestions one at a time on a
+background thread.
+"""
+
+import bisect
+import gzip
+import json
+import os
+import sys
+import threading
+from array import array
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from cf_api import call_api, describe_error, stream_api
+from concurrent_fetch import SingleFlight
+from config import (CACHE_DIR, STANDINGS_CACHE_MAX_BYTES, STANDINGS_PAGE_SIZE, STANDINGS_QUEUE_MAX,
+                    STANDINGS_RUNNING_TTL)
+from response_cache import LRUCache
+from utils import has_api_key
+
+STANDINGS_DIR = os.path.join(CACHE_DIR, 'standings')
+STORE_FORMAT = 1
+
+# Solve time of a problem the party did not solve
+UNSOLVED = -1
+
+
+class StandingsColumns:
+    """One contest's standings as parallel typed arrays, one row per party in rank order"""
+
+    def __init__(self, contest: Dict, problems: List[str]):
+        # contest: id, name, type and phase from contest.standings; problems: their indexes
+        self.contest = contest
+        self.problems = problems
+        self.ranks = array('I')
+        self.points = array('d')
+        # party members, ';'-joined
+        self.handles: List[str] = []
+        # per problem: seconds from the contest start to the accepted submission, or UNSOLVED
+        self.solve_times = [array('i') for _ in problems]
+        self.solved_counts = [0] * len(problems)
+        self._row_of: Optional[Dict[str, int]] = None
+
+    def __len__(self):
+        return len(self.ranks)
+
+    def append(self, row: Dict):
+        """Add a contest.standings row (rows must come in rank order)"""
+        party = row.get('party') or {}
+        self.handles.append(';'.join(member['handle'] for member in party.get('members', ())))
+        self.ranks.append(row.get('rank', 0))
+        self.points.append(float(row.get('points', 0)))
+        results = row.get('problemResults', ())
+        for column, times in enumerate(self.solve_times):
+            result = results[column] if column < len(results) else {}
+            solved_at = result.get('bestSubmissionTimeSeconds')
+            if result.get('points', 0) > 0 and solved_at is not None:
+                times.append(solved_at)
+                self.solved_counts[column] += 1
+            else:
+                times.append(UNSOLVED)
+        self._row_of = None
+
+    def nbytes(self) -> int:
+        """Approximate memory footprint"""
+        arrays = [self.ranks, self.points] + self.solve_times
+        return sum(column.itemsize * len(column) for column in arrays) + sum(len(h) + 56 for h in self.handles)
+
+    def row_of(self, handle: str) -> Optional[int]:
+        """Row of the party `handle` was a member of"""
+        if self._row_of is None:
+            self._row_of = {}
+            for row, members in enumerate(self.handles):
+                for member in members.split(';'):
+                    self._row_of.setdefault(member.lower(), row)
+        return self._row_of.get(handle.lower())
+
+    def percentile(self, handle: str) -> Optional[float]:
+        """Share of the participants (percent) ranked strictly below `handle`; None if absent"""
+        row = self.row_of(handle)
+        if row is None:
+            return None
+        below = len(self.ranks) - bisect.bisect_right(self.ranks, self.ranks[row])
+        return round(100.0 * below / len(self.ranks), 2)
+
+    def solve_rates(self) -> List[Dict]:
+        """Per problem: index, parties that solved it and their share of all parties"""
+        total = len(self.ranks)
+        return [{'index': index, 'solved': solved, 'rate': solved / total if total else 0.0}
+                for index, solved in zip(self.problems, self.solved_counts)]
+
+    def save(self, path: str):
+        """Write the columns to `path` (gzip: a JSON header line, the handles, then the raw arrays)"""
+        handles = '\n'.join(self.handles).encode('utf-8')
+        header = {'format': STORE_FORMAT, 'byteorder': sys.byteorder, 'contest': self.contest,
+                  'problems': self.problems, 'rows': len(self.ranks), 'handles_bytes': len(handles),
+                  'solved_counts': self.solved_counts}
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        with gzip.open(temp_path, 'wb', compresslevel=1) as f:
+            f.write(json.dumps(header).encode('utf-8') + b'\n')
+            f.write(handles)
+            for column in [self.ranks, self.points] + self.solve_times:
+                f.write(column.tobytes())
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['StandingsColumns']:
+        """Columns written by save(), or None if the file is missing or unreadable"""
+        try:
+            with gzip.open(path, 'rb') as f:
+                header = json.loads(f.readline())
+                if header.get('format') != STORE_FORMAT:
+                    return None
+                columns = cls(header['contest'], header['problems'])
+                columns.solved_counts = header['solved_counts']
+                handles = f.read(header['handles_bytes']).decode('utf-8')
+                columns.handles = handles.split('\n') if header['rows'] else []
+                for column in [columns.ranks, columns.points] + columns.solve_times:
+                    column.frombytes(f.read(column.itemsize * header['rows']))
+                    if header['byteorder'] != sys.byteorder:
+                        column.byteswap()
+        except (OSError, ValueError, KeyError, EOFError):
+            return None
+        return columns
+
+
+def _store_path(contest_id: int) -> str:
+    return os.path.join(STANDINGS_DIR, f'{contest_id}.cols.gz')
+
+
+def ingest_standings(contest_id: int, page_size: int = STANDINGS_PAGE_SIZE,
+                     final: bool = False) -> Tuple[Optional[StandingsColumns], Optional[str]]:
+    """Download the full official standings of a contest into columns; returns (columns, error).
+
+    `final` says the contest is known to be FINISHED (e.g. from the contest
+    list), whatever phase the standings report.
+    """
+    signed = has_api_key()
+    # the phase decides whether the standings are kept, so the head must be
+    # fresh: a stored one may be from while the contest was running
+    head, error = call_api('contest.standings', {'contestId': contest_id, 'from': 1, 'count': 1},
+                           signed=signed, store=False)
+    if error:
+        return None, error
+    contest = {field: head['contest'].get(field) for field in ('id', 'name', 'type', 'phase')}
+    if final:
+        contest['phase'] = 'FINISHED'
+    columns = StandingsColumns(contest, [problem['index'] for problem in head['problems']])
+
+    print(f"Ingesting standings of contest {contest_id}{' (signed)' if signed else ''}...")
+    start = 1
+    while True:
+        params = {'contestId': contest_id, 'from': start, 'count': page_size}
+        # the columns are the store: pages are not kept in the response store
+        rows, error = stream_api('contest.standings', params, list_key='rows', signed=signed, store=False)
+        if error:
+            return None, error
+        before = len(columns)
+        try:
+            for row in rows:
+                columns.append(row)
+        except Exception as e:
+            return None, describe_error(e)
+        finally:
+            rows.close()
+        if len(columns) - before < page_size:
+            return columns, None
+        start += page_size
+
+
+# Final (FINISHED) standings are kept in memory and on disk; those of running
+# contests only in memory, for STANDINGS_RUNNING_TTL seconds
+_standings_cache = LRUCache(STANDINGS_CACHE_MAX_BYTES)
+_standings_flights = SingleFlight('standings')
+
+
+def _is_final(columns: StandingsColumns) -> bool:
+    return columns.contest.get('phase') == 'FINISHED'
+
+
+def cached_standings(contest_id: int) -> Optional[StandingsColumns]:
+    """Standings from memory or the disk store, None if not ingested (recently) yet; never downloads"""
+    entry = _standings_cache.get(contest_id)
+    if entry is not None and (entry.version == 'FINISHED' or entry.age() < STANDINGS_RUNNING_TTL):
+        return entry.value
+    columns = StandingsColumns.load(_store_path(contest_id))
+    if columns is not None:
+        _standings_cache.put(contest_id, columns, columns.nbytes(), 'FINISHED')
+    return columns
+
+
+def _ingest_and_store(contest_id: int, final: bool):
+    columns, error = ingest_standings(contest_id, final=final)
+    if error:
+        return None, error
+    if _is_final(columns):
+        os.makedirs(STANDINGS_DIR, exist_ok=True)
+        columns.save(_store_path(contest_id))
+    # standings of running contests change: cached_standings drops them after STANDINGS_RUNNING_TTL
+    _standings_cache.put(contest_id, columns, columns.nbytes(), columns.contest.get('phase') or '')
+    return columns, None
+
+
+def get_standings(contest_id: int, final: bool = False) -> Tuple[Optional[StandingsColumns], Optional[str]]:
+    """Return (StandingsColumns, error) from memory, the disk store, or a fresh ingestion.
+
+    `final`: the contest is known to be FINISHED (see ingest_standings).
+    """
+    columns = cached_standings(contest_id)
+    if columns is not None:
+        return columns, None
+    return _standings_flights.do(contest_id, _ingest_and_store, contest_id, final)
+
+
+# Background ingestion for the web app: (contest id, final) waiting (the first
+# one is being ingested) and the errors of failed ingestions not reported yet
+_queue: deque = deque()
+_queue_errors: Dict[int, str] = {}
+_queue_lock = threading.Lock()
+_queue_running = False
+
+
+def _ingest_queued():
+    global _queue_running
+    while True:
+        with _queue_lock:
+            if not _queue:
+                _queue_running = False
+                return
+            contest_id, final = _queue[0]
+        try:
+            _, error = get_standings(contest_id, final)
+        except Exception as e:
+            error = describe_error(e)
+        with _queue_lock:
+            _queue.popleft()
+            if error:
+                _queue_errors[contest_id] = error
+
+
+def queue_ingestion(contest_id: int, final: bool = False) -> Tuple[Optional[int], Optional[str]]:
+    """Ingest a contest's standings on a background thread; returns (queue position, error).
+
+    Position 0 means the ingestion is running. A failed ingestion is
+    reported once, as the error; the next call queues the contest again.
+    `final`: the contest is known to be FINISHED (see ingest_standings).
+    """
+    global _queue_running
+    with _queue_lock:
+        if contest_id in _queue_errors:
+            return None, _queue_errors.pop(contest_id)
+        queued = [queued_id for queued_id, _ in _queue]
+        if contest_id in queued:
+            return queued.index(contest_id), None
+        if len(_queue) >= STANDINGS_QUEUE_MAX:
+            return None, "Too many standings downloads are queued, try again later"
+        _queue.append((contest_id, final))
+        if not _queue_running:
+            _queue_running = True
+            threading.Thread(target=_ingest_queued, name='standings-ingest', daemon=True).start()
+        return len(_queue) - 1, None
+
+
+def user_percentiles(handle: str, contest_ids: List[int]) -> List[Dict]:
+    """Per contest: rank, participants and percentile of `handle` (or the error)"""
+    results = []
+    for contest_id in contest_ids:
+        columns, error = get_standings(contest_id)
+        if error:
+            results.append({'contest_id': contest_id, 'error': error})
+            continue
+        row = columns.row_of(handle)
+        results.append({
+            'contest_id': contest_id,
+            'contest_name': columns.contest.get('name'),
+            'participants': len(columns),
+            'rank': columns.ranks[row] if row is not None else None,
+            'percentile': columns.percentile(handle),
+        })
+    return results
+
+
+def show_standings(contest_id: int, handle: str = None):
+    """Solve rates of a contest's problems (and a user's placement) for the terminal"""
+    columns, error = get_standings(contest_id)
+    if error:
+        print(f"Error: {error}")
+        return
+    print("\n" + "=" * 60)
+    print(f"{columns.contest.get('name')} - {len(columns)} participants")
+    print("=" * 60)
+    for problem in columns.solve_rates():
+        print(f"{problem['index']:>3}: solved by {problem['solved']:>6} ({problem['rate'] * 100:5.1f}%)")
+    if handle:
+        percentile = columns.percentile(handle)
+        if percentile is None:
+            print(f"\n{handle} is not in the official standings")
+        else:
+            print(f"\n{handle}: rank {columns.ranks[columns.row_of(handle)]}, "
+                  f"ahead of {percentile:.1f}% of the participants")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python contest_standings.py CONTEST_ID [HANDLE]")
+    show_standings(int(sys.argv[1]), sys.argv[2] if len(sys.argv) > 2 else None)
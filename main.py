@@ -1,7 +1,9 @@
 import sys
-import requests
+from cf_api import call_api
 from question_filtering import filter_questions
 from user_analytics import show_user_analytics
+from team_analytics import get_team_handles, show_team_analytics
+from recommender import show_recommendations
 
 def display_menu():
     """Display the main menu options"""
@@ -10,19 +12,21 @@ def display_menu():
     print("="*50)
     print("1. Question Filtering")
     print("2. User Analytics")
-    print("3. Fetch a New user")
-    print("4. Exit")
+    print("3. Recommended Problems")
+    print("4. Team Comparison")
+    print("5. Fetch a New user")
+    print("6. Exit")
     print("="*50)
 
 def get_user_input():
     """Get and validate user input"""
     while True:
         try:
-            choice = input("Enter your choice (1-4): ").strip()
-            if choice in ['1', '2', '3', '4']:
+            choice = input("Enter your choice (1-6): ").strip()
+            if choice in ['1', '2', '3', '4', '5', '6']:
                 return choice
             else:
-                print("Invalid choice. Please enter 1, 2, 3 or 4.")
+                print("Invalid choice. Please enter a number from 1 to 6.")
         except KeyboardInterrupt:
             print("\nExiting...")
             sys.exit(0)
@@ -35,9 +39,8 @@ def get_username():
         try:
             username = input("\nEnter your Codeforces username: ").strip()
             if username:
-                url = f"https://codeforces.com/api/user.info?handles={username}"
-                response = requests.get(url, timeout=10)
-                if response.status_code != 200:
+                _, error = call_api('user.info', {'handles': username})
+                if error:
                     print("Invalid Username. Please try again...")
                     continue
                 return username
@@ -68,8 +71,15 @@ def main():
             print(f"\nStarting User Analytics for user: {username}")
             show_user_analytics(username)
         elif choice == '3':
-            username = get_username()
+            print(f"\nStarting Recommendations for user: {username}")
+            show_recommendations(username)
         elif choice == '4':
+            handles = get_team_handles()
+            if handles:
+                show_team_analytics(handles)
+        elif choice == '5':
+            username = get_username()
+        elif choice == '6':
             print("\nThank you for using Codeforces Tutor!")
             print("Happy coding! 🚀")
             break
@@ -0,0 +1,190 @@
+"""
+Codeforces Tutor - Metrics
+In-process counters and histograms rendered in the Prometheus text format by
+the /metrics route, and request-scoped phase timings (time spent fetching,
+filtering, analyzing, rendering and in each API method) that the web app
+reports per route and in the Server-Timing header.
+"""
+
+import contextvars
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Latency buckets in seconds, from cache hits to slow API calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_registry: List['Metric'] = []
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    parts = ['%s="%s"' % (name, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+             for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{%s}' % ','.join(parts) if parts else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(ABC):
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self):
+        """(name suffix, label values, extra label, value) of every sample"""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, values, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [('', key, '', value) for key, value in sorted(self._values.items())]
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # per bucket counts (not cumulative), then sum and count
+                counts = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            counts[-2] += value
+            counts[-1] += 1
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, counts in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    samples.append(('_bucket', key, f'le="{_format_value(bound)}"', cumulative))
+                samples.append(('_bucket', key, 'le="+Inf"', counts[-1]))
+                samples.append(('_sum', key, '', counts[-2]))
+                samples.append(('_count', key, '', counts[-1]))
+        return samples
+
+
+class CallbackMetric(Metric):
+    """A value read when the metrics are rendered (e.g. a counter kept elsewhere)"""
+
+    def __init__(self, name: str, help: str, kind: str, read: Callable[[], float]):
+        super().__init__(name, help)
+        self.kind = kind
+        self.read = read
+
+    def samples(self):
+        return [('', (), '', self.read())]
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+API_REQUEST_SECONDS = Histogram('cf_tutor_api_request_seconds',
+                                'Codeforces API request latency (time to response headers)', ('method',))
+API_REQUESTS = Counter('cf_tutor_api_requests_total', 'Codeforces API requests by HTTP status', ('method', 'status'))
+CACHE_LOOKUPS = Counter('cf_tutor_cache_lookups_total', 'Cache lookups by cache and result', ('cache', 'result'))
+COALESCED_CALLS = Counter('cf_tutor_coalesced_calls_total',
+                          'Calls that joined an identical call already in flight', ('flight',))
+ROUTE_SECONDS = Histogram('cf_tutor_route_seconds', 'Request handling time per route', ('route',))
+ROUTE_PHASE_SECONDS = Histogram('cf_tutor_route_phase_seconds',
+                                'Time per route spent in each phase (fetch, filter, analyze, render, api.<method>)',
+                                ('route', 'phase'))
+
+
+# Phase timings of the request being handled: name -> [seconds, count]
+_request_timings: contextvars.ContextVar[Optional[Dict[str, list]]] = contextvars.ContextVar(
+    'request_timings', default=None)
+_record_lock = threading.Lock()
+
+
+def start_request() -> Dict[str, list]:
+    """Start collecting phase timings for the current request (and tasks/threads it starts)"""
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def record(phase: str, seconds: float):
+    """Add time spent in a phase to the current request's timings, if there is a request"""
+    timings = _request_timings.get()
+    if timings is not None:
+        with _record_lock:
+            entry = timings.setdefault(phase, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+
+@contextmanager
+def timed_phase(phase: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase, time.perf_counter() - start)
+
+
+def finish_request(route: str, timings: Dict[str, list], total: float):
+    """Observe the route's total time and phase timings, and stop collecting"""
+    _request_timings.set(None)
+    ROUTE_SECONDS.observe(total, route=route)
+    for phase, (seconds, _) in timings.items():
+        ROUTE_PHASE_SECONDS.observe(seconds, route=route, phase=phase)
+
+
+def server_timing(timings: Dict[str, list], total: float) -> str:
+    """Server-Timing header value (milliseconds) for the request's phases"""
+    parts = [f'{phase};dur={seconds * 1000:.1f}' + (f';desc="{count} calls"' if count > 1 else '')
+             for phase, (seconds, count) in timings.items()]
+    parts.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(parts)
@@ -0,0 +1,141 @@
+"""
+Codeforces Tutor - Background prefetching
+A daemon thread started with the web app. At boot it warms the contest list
+and the problem index, then on every cycle it refreshes them shortly before
+they expire, fetches recent contests still missing from the index, and syncs
+the submissions of handles that used the app recently. Its API calls pass
+the shared API limiter like all others and are also spaced to at most
+PREFETCH_RATE_SHARE of the call rate, so user requests keep most of the budget.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import List
+
+from concurrent_fetch import RateLimiter, fetch_in_order
+from config import (
+    API_REQUESTS_PER_SECOND, CONTEST_LIST_TTL, PROBLEM_INDEX_MAX_AGE, PREFETCH_INTERVAL,
+    PREFETCH_RATE_SHARE, PREFETCH_CONTESTS, PREFETCH_HANDLE_WINDOW, PREFETCH_MAX_HANDLES
+)
+from contest_cache import cached_contest_list, get_contest_list
+from problem_index import cached_problem_index, refresh_problem_index, remember_contest, save_problem_index
+from question_filtering import fetch_contest_problems
+from user_analytics import get_user_stats
+
+
+class Prefetcher:
+    """Keeps the contest list, problem index and recent users' submissions warm"""
+
+    def __init__(self, interval: float = PREFETCH_INTERVAL):
+        self.interval = interval
+        # background calls: a share of the API rate (call_api applies the global limit too)
+        self.budget = RateLimiter(API_REQUESTS_PER_SECOND * PREFETCH_RATE_SHARE)
+        # lowercased handle -> (handle, last seen)
+        self._handles = OrderedDict()
+        self._handles_lock = threading.Lock()
+        # contests whose standings could not be fetched; retried after the next index rebuild
+        self._failed_contests = set()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def note_handle(self, handle: str):
+        """Record that a handle used the app, so its submissions are kept synced"""
+        key = handle.lower()
+        with self._handles_lock:
+            self._handles[key] = (handle, time.time())
+            self._handles.move_to_end(key)
+            while len(self._handles) > PREFETCH_MAX_HANDLES:
+                self._handles.popitem(last=False)
+
+    def recent_handles(self) -> List[str]:
+        """Handles seen within PREFETCH_HANDLE_WINDOW, most recent first"""
+        cutoff = time.time() - PREFETCH_HANDLE_WINDOW
+        with self._handles_lock:
+            for key in [key for key, (_, seen) in self._handles.items() if seen < cutoff]:
+                del self._handles[key]
+            return [handle for handle, _ in reversed(self._handles.values())]
+
+    def start(self):
+        """Start the background thread (once)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='prefetch', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Prefetch cycle failed: {e}")
+            print(f"Prefetch cycle done in {time.monotonic() - started:.1f}s")
+            self._stop.wait(self.interval)
+
+    def run_once(self):
+        """One warm-up/refresh cycle"""
+        self._warm_contest_list()
+        self._warm_problem_index()
+        self._fill_missing_contests()
+        self._sync_handles()
+
+    def _warm_contest_list(self):
+        # refresh before the TTL runs out, so requests never see a stale list
+        contest_list = cached_contest_list()
+        if contest_list is None or contest_list.age() > CONTEST_LIST_TTL - self.interval:
+            self.budget.wait()
+            _, error = get_contest_list(refresh=True)
+            if error:
+                print(f"Prefetch: could not refresh contest list: {error}")
+
+    def _warm_problem_index(self):
+        index = cached_problem_index()
+        if index is None or index.is_stale(PROBLEM_INDEX_MAX_AGE - self.interval):
+            self.budget.wait()
+            _, error = refresh_problem_index()
+            if error:
+                print(f"Prefetch: could not refresh problem index: {error}")
+            else:
+                self._failed_contests.clear()
+
+    def _fill_missing_contests(self):
+        """Fetch standings of recent contests that problemset.problems did not cover"""
+        contest_list, index = cached_contest_list(), cached_problem_index()
+        if contest_list is None or index is None:
+            return
+        missing = [contest.id for contest in contest_list.divisional[:PREFETCH_CONTESTS]
+                   if index.contest_problems(contest.id) is None and contest.id not in self._failed_contests]
+        if not missing:
+            return
+
+        print(f"Prefetch: fetching {len(missing)} contests missing from the problem index...")
+        fetches = fetch_in_order(missing, fetch_contest_problems, max_workers=1, rate_limiter=self.budget)
+        try:
+            for contest_id, (problems, error) in fetches:
+                if error:
+                    self._failed_contests.add(contest_id)
+                else:
+                    remember_contest(contest_id, problems)
+                if self._stop.is_set():
+                    break
+        finally:
+            fetches.close()
+            save_problem_index()
+
+    def _sync_handles(self):
+        """Sync the stored submissions (and cached aggregate) of recently seen handles"""
+        for handle in self.recent_handles():
+            if self._stop.is_set():
+                return
+            # one budget slot per handle: an incremental sync is usually a single call
+            self.budget.wait()
+            _, error = get_user_stats(handle)
+            if error:
+                print(f"Prefetch: could not sync submissions of {handle}: {error}")
+
+
+# One prefetcher per process, started by app.py
+prefetcher = Prefetcher()
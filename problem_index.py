@@ -0,0 +1,205 @@
+"""
+Codeforces Tutor - Local problem index
+Problems of every contest, downloaded once with problemset.problems and kept
+in memory and on disk, keyed by contest id and by rating.
+"""
+
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from typing import Iterable, List, Dict, Optional
+
+from cf_api import describe_error, stream_api
+from config import CACHE_DIR, PROBLEM_INDEX_MAX_AGE, ensure_cache_dir
+from records import Problem
+
+INDEX_PATH = os.path.join(CACHE_DIR, 'problem_index.json')
+
+_INDEX_SPLIT = re.compile(r'^([A-Z]+)(\d*)$')
+
+# Process-wide, so an index's generation never repeats, even in a later index
+_generations = itertools.count(1)
+
+
+def problem_index_key(index: str):
+    """Sort key that keeps problems in contest order (A, B, C1, C2, ..., C10)"""
+    match = _INDEX_SPLIT.match(index or '')
+    if not match:
+        return (index or '', 0)
+    letters, number = match.groups()
+    return (letters, int(number) if number else 0)
+
+
+class ProblemIndex:
+    """Problems keyed by contest id (in contest order) and by rating"""
+
+    def __init__(self, contests: Dict[int, List[Problem]] = None, built_at: float = None):
+        self.built_at = built_at if built_at is not None else time.time()
+        self.by_contest: Dict[int, List[Problem]] = {}
+        self.by_rating: Dict[int, List[Problem]] = {}
+        self.dirty = False
+        # changes whenever the indexed problems do; caches built from the index key on it
+        self.generation = next(_generations)
+        for contest_id, problems in (contests or {}).items():
+            self.add_contest(contest_id, problems)
+        self.dirty = False
+
+    @classmethod
+    def from_problemset(cls, problems: Iterable[Dict]) -> 'ProblemIndex':
+        """Build the index from the problems of a problemset.problems result"""
+        contests = {}
+        for problem in problems:
+            if 'contestId' in problem:
+                contests.setdefault(problem['contestId'], []).append(Problem.from_api(problem))
+        return cls(contests)
+
+    def add_contest(self, contest_id: int, problems: List[Problem]):
+        """Add (or replace) the problem list of one contest"""
+        contest_id = int(contest_id)
+        if contest_id in self.by_contest:
+            for problem in self.by_contest[contest_id]:
+                if problem.rating is not None:
+                    self.by_rating[problem.rating].remove(problem)
+        ordered = sorted(problems, key=lambda p: problem_index_key(p.index))
+        self.by_contest[contest_id] = ordered
+        for problem in ordered:
+            if problem.rating is not None:
+                self.by_rating.setdefault(problem.rating, []).append(problem)
+        self.dirty = True
+        self.generation = next(_generations)
+
+    def contest_problems(self, contest_id: int) -> Optional[List[Problem]]:
+        """Problems of a contest in contest order, None if the contest is not indexed"""
+        return self.by_contest.get(int(contest_id))
+
+    def problems_by_rating(self, rating_lower: int, rating_upper: int) -> List[Problem]:
+        """All indexed problems with rating_lower <= rating <= rating_upper"""
+        result = []
+        for rating in sorted(self.by_rating):
+            if rating_lower <= rating <= rating_upper:
+                result.extend(self.by_rating[rating])
+        return result
+
+    def is_stale(self, max_age: int = PROBLEM_INDEX_MAX_AGE) -> bool:
+        return time.time() - self.built_at > max_age
+
+    def save(self, path: str = INDEX_PATH):
+        """Write the index to disk atomically"""
+        ensure_cache_dir()
+        data = {
+            'built_at': self.built_at,
+            'contests': {str(cid): [p.to_dict() for p in problems] for cid, problems in self.by_contest.items()},
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: str = INDEX_PATH) -> Optional['ProblemIndex']:
+        """Read the index from disk, None if it is missing or unreadable"""
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            contests = {int(cid): [Problem.from_api(p) for p in problems]
+                        for cid, problems in data['contests'].items()}
+            return cls(contests, built_at=data['built_at'])
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+def download_problem_index():
+    """Build a fresh index from one problemset.problems call, decoding problems as they arrive"""
+    print("Downloading problemset from Codeforces API...")
+    items, error = stream_api('problemset.problems', list_key='problems')
+    if error:
+        return None, error
+    try:
+        return ProblemIndex.from_problemset(items), None
+    except Exception as e:
+        return None, describe_error(e)
+    finally:
+        # the problem statistics that follow the problems are not needed
+        items.close()
+
+
+_index: Optional[ProblemIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_problem_index(refresh: bool = False) -> Optional[ProblemIndex]:
+    """Return the problem index from memory, disk or the API (in that order).
+
+    A stale index is rebuilt; if the rebuild fails the stale one is still used.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ProblemIndex.load()
+        if refresh or _index is None or _index.is_stale():
+            fresh, error = download_problem_index()
+            if fresh is not None:
+                _install(fresh)
+            else:
+                print(f"Could not build problem index: {error}")
+        return _index
+
+
+def _install(fresh: ProblemIndex):
+    """Replace the index with a fresh download; call with _index_lock held"""
+    global _index
+    # keep contests that were only known from standings calls
+    if _index is not None:
+        for contest_id, problems in _index.by_contest.items():
+            if fresh.contest_problems(contest_id) is None:
+                fresh.add_contest(contest_id, problems)
+    fresh.save()
+    fresh.generation = next(_generations)
+    _index = fresh
+
+
+def refresh_problem_index():
+    """Download a fresh index and swap it in; return (index, error).
+
+    Unlike get_problem_index(refresh=True) the download runs without the
+    lock, so requests keep using the current index meanwhile.
+    """
+    fresh, error = download_problem_index()
+    if fresh is None:
+        return None, error
+    with _index_lock:
+        _install(fresh)
+        return _index, None
+
+
+def cached_problem_index() -> Optional[ProblemIndex]:
+    """The index from memory or disk, without downloading one"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ProblemIndex.load()
+        return _index
+
+
+def remember_contest(contest_id: int, problems: List[Problem]):
+    """Add problems fetched from contest.standings to the in-memory index"""
+    with _index_lock:
+        if _index is not None:
+            _index.add_contest(contest_id, problems)
+
+
+def save_problem_index():
+    """Persist contests added to the in-memory index since the last save"""
+    with _index_lock:
+        if _index is not None and _index.dirty:
+            _index.save()
+
+
+if __name__ == "__main__":
+    index = get_problem_index(refresh=True)
+    if index:
+        print(f"Indexed {len(index.by_contest)} contests")
@@ -0,0 +1,203 @@
+"""
+Codeforces Tutor - Problem query index
+Inverted index over all indexed problems for instant multi-criteria
+filtering. Every problem gets a row number in filter order (contests newest
+first, problems in contest order), and each criterion is a bitset over the
+rows (a Python int), so a query is a handful of ANDs/ORs plus a scan of the
+lowest set bits.
+"""
+
+import bisect
+import threading
+from typing import Dict, List, Optional
+
+from contest_cache import CONTEST_TYPES, ContestList, get_contest_list
+from problem_index import ProblemIndex, get_problem_index
+from records import Contest, Problem
+from solved_set import SolvedSet, pack_problem_key
+
+
+def _bits_from(rows) -> int:
+    bits = 0
+    for row in rows:
+        bits |= 1 << row
+    return bits
+
+
+class ProblemQueryIndex:
+    """Bitsets per division, per problem position, per rating and per tag"""
+
+    def __init__(self, problem_index: ProblemIndex, contest_list: ContestList):
+        self.problems: List[Problem] = []
+        # contests by recency ordinal, their first rows (plus one past the end),
+        # and the ones (bit = ordinal) the problem index has no problems for
+        self.contests: List[Contest] = list(contest_list.divisional)
+        self.contest_first_row: List[int] = []
+        self.unindexed_contest_bits = 0
+        # row of every problem by its packed (contestId, index) key
+        self.row_of_key: Dict[int, int] = {}
+        # contests (bit = recency ordinal) and rows having each division label
+        self.contest_division_bits: Dict[str, int] = {t: 0 for t in CONTEST_TYPES}
+        self.division_bits: Dict[str, int] = {t: 0 for t in CONTEST_TYPES}
+        position_rows: Dict[int, List[int]] = {}
+        rating_rows: Dict[int, List[int]] = {}
+        tag_rows: Dict[str, List[int]] = {}
+
+        for ordinal, contest in enumerate(contest_list.divisional):
+            first_row = len(self.problems)
+            self.contest_first_row.append(first_row)
+            problems = problem_index.contest_problems(contest.id)
+            if problems is None:
+                self.unindexed_contest_bits |= 1 << ordinal
+                problems = []
+            self.problems.extend(problems)
+            contest_rows = ((1 << len(problems)) - 1) << first_row
+            for division in contest_list.divisions[contest.id]:
+                self.contest_division_bits[division] |= 1 << ordinal
+                self.division_bits[division] |= contest_rows
+            for position, problem in enumerate(problems):
+                row = first_row + position
+                key = pack_problem_key(problem.contestId, problem.index)
+                if key is not None:
+                    self.row_of_key[key] = row
+                position_rows.setdefault(position, []).append(row)
+                if problem.rating is not None:
+                    rating_rows.setdefault(problem.rating, []).append(row)
+                for tag in problem.tags:
+                    tag_rows.setdefault(tag, []).append(row)
+        self.contest_first_row.append(len(self.problems))
+
+        self.position_bits = {position: _bits_from(rows) for position, rows in position_rows.items()}
+        self.ratings = sorted(rating_rows)
+        self.rating_bits = {rating: _bits_from(rows) for rating, rows in rating_rows.items()}
+        self.tag_bits = {tag: _bits_from(rows) for tag, rows in tag_rows.items()}
+
+    def _last_recent_ordinal(self, wanted_contests: int, contest_count: int) -> Optional[int]:
+        """Ordinal of the `contest_count`-th most recent wanted contest, None if there are fewer"""
+        bits = wanted_contests
+        for _ in range(contest_count - 1):
+            bits &= bits - 1
+            if not bits:
+                break
+        if not bits or contest_count <= 0:
+            return None
+        return (bits & -bits).bit_length() - 1
+
+    def _recent_contest_rows(self, wanted_contests: int, contest_count: int) -> int:
+        """Rows of contests up to the `contest_count`-th most recent wanted one"""
+        last_ordinal = self._last_recent_ordinal(wanted_contests, contest_count)
+        if last_ordinal is None:
+            return (1 << len(self.problems)) - 1
+        return (1 << self.contest_first_row[last_ordinal + 1]) - 1
+
+    def _wanted_contests(self, filters: Dict) -> int:
+        wanted_contests = 0
+        for division in filters['contest_type']:
+            wanted_contests |= self.contest_division_bits.get(division, 0)
+        return wanted_contests
+
+    def unindexed_contests(self, filters: Dict) -> List[Contest]:
+        """Contests the filters select that the problem index has no problems for (newest first)"""
+        wanted_contests = self._wanted_contests(filters)
+        bits = wanted_contests & self.unindexed_contest_bits
+        if not bits:
+            return []
+        last_ordinal = self._last_recent_ordinal(wanted_contests, filters['contest_count'])
+        if last_ordinal is not None:
+            bits &= (1 << (last_ordinal + 1)) - 1
+        contests = []
+        while bits:
+            lowest = bits & -bits
+            contests.append(self.contests[lowest.bit_length() - 1])
+            bits ^= lowest
+        return contests
+
+    def rows_of(self, solved: SolvedSet) -> int:
+        """Bitset of the rows of the solved problems (cached on the SolvedSet)"""
+        if solved.query_bits is None or solved.query_bits[0] is not self:
+            bits = 0
+            for key in solved.keys:
+                row = self.row_of_key.get(key)
+                if row is not None:
+                    bits |= 1 << row
+            solved.query_bits = (self, bits)
+        return solved.query_bits[1]
+
+    def query_bits(self, filters: Dict, tags: List[str] = (), exclude: SolvedSet = None) -> int:
+        """Bitset of the rows matching the filters dict used by fetch_problems"""
+        wanted_contests = self._wanted_contests(filters)
+        wanted_rows = 0
+        for division in filters['contest_type']:
+            wanted_rows |= self.division_bits.get(division, 0)
+
+        positions = 0
+        for position in range(filters['question_start'] - 1, filters['question_end']):
+            positions |= self.position_bits.get(position, 0)
+
+        rated = 0
+        low = bisect.bisect_left(self.ratings, filters['rating_lower'])
+        high = bisect.bisect_right(self.ratings, filters['rating_upper'])
+        for rating in self.ratings[low:high]:
+            rated |= self.rating_bits[rating]
+
+        bits = wanted_rows & positions & rated
+        bits &= self._recent_contest_rows(wanted_contests, filters['contest_count'])
+        for tag in tags:
+            bits &= self.tag_bits.get(tag, 0)
+        if exclude is not None:
+            bits &= ~self.rows_of(exclude)
+        return bits
+
+    def query(self, filters: Dict, tags: List[str] = (), exclude: SolvedSet = None):
+        """Return (first max_questions matching problems in filter order, total matches)
+
+        Problems in `exclude` (e.g. the ones the user already solved) are left out.
+        """
+        bits = self.query_bits(filters, tags, exclude)
+        total = bits.bit_count()
+        problems = []
+        while bits and len(problems) < filters['max_questions']:
+            lowest = bits & -bits
+            problems.append(self.problems[lowest.bit_length() - 1])
+            bits ^= lowest
+        return problems, total
+
+
+_query_index: Optional[ProblemQueryIndex] = None
+_query_source = None
+_query_lock = threading.Lock()
+
+
+def get_query_index():
+    """Return (ProblemQueryIndex, error), rebuilt when the problem index or contest list changed"""
+    global _query_index, _query_source
+    problem_index = get_problem_index()
+    if problem_index is None:
+        return None, "Problem index is not available"
+    contest_list, error = get_contest_list()
+    if error:
+        return None, error
+
+    source = (problem_index.generation, contest_list.generation)
+    with _query_lock:
+        if _query_index is None or _query_source != source:
+            _query_index = ProblemQueryIndex(problem_index, contest_list)
+            _query_source = source
+        return _query_index, None
+
+
+def unindexed_contests(filters: Dict):
+    """Return (contests the filters select that are missing from the problem index, error)"""
+    index, error = get_query_index()
+    if error:
+        return None, error
+    return index.unindexed_contests(filters), None
+
+
+def search_problems(filters: Dict, tags: List[str] = (), exclude: SolvedSet = None):
+    """Return (problems, total matches, error) for the filters, from the query index"""
+    index, error = get_query_index()
+    if error:
+        return None, 0, error
+    problems, total = index.query(filters, tags, exclude)
+    return problems, total, None
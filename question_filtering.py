@@ -1,9 +1,14 @@
-from email.policy import default
-
-import requests
-import json
-import sys
-from typing import List, Dict, Any
+import asyncio
+from typing import List, Dict
+
+import metrics
+from cf_api import call_api, call_api_async
+from concurrent_fetch import fetch_in_order, fetch_in_order_async
+from contest_cache import select_contests
+from problem_index import get_problem_index, remember_contest, save_problem_index
+from records import Contest, Problem
+from solved_set import SolvedSet
+from user_analytics import get_solved_set
 
 def get_user_input_int(prompt: str, min_val: int = 800, max_val: int = 3500, default: int = None) -> int:
     """Get integer input from user with validation"""
@@ -104,90 +109,163 @@ def get_max_questions():
     max_q = get_user_input_int("Maximum number of questions you want (less than 50): ", min_val=1, max_val=50, default=10)
     return max_q
 
-def fetch_contests(user_contest_type:List[str] ,max_contest_count: int = 500):
-    """Fetch problems and contests from Codeforces API"""
+def get_exclude_solved() -> bool:
+    """Ask whether problems the user already solved should be left out"""
+    print("\n--- Solved Problems ---")
     try:
-        # Fetch contests
-        print("Fetching contests from Codeforces API...")
-        contests_url = "https://codeforces.com/api/contest.list"
-        contests_response = requests.get(contests_url, timeout=10)
+        answer = input("Exclude problems you have already solved? (Y/n): ").strip().lower()
+    except KeyboardInterrupt:
+        print("\nReturning to main menu...")
+        return None
+    return answer not in ('n', 'no')
 
-        if contests_response.status_code != 200:
-            print(f"Error fetching contests: HTTP {contests_response.status_code}")
+def fetch_contests(user_contest_type:List[str] ,max_contest_count: int = 500):
+    """Pick the most recent contests of the preferred types from the cached contest list"""
+    try:
+        contests, error = select_contests(user_contest_type, max_contest_count)
+        if error:
+            print(f"Error fetching contests: {error}")
             return None
 
-        contests_data = contests_response.json()
-        if contests_data['status'] != 'OK':
-            print(f"Contest API Error: {contests_data.get('comment', 'Unknown error')}")
-            return None
+        return contests
 
-        count = 0
-        relevant_contests = []
-        all_contest_types = ["Div. 1 + Div. 2", "Div. 1", "Div. 2", "Div. 3", "Div. 4"]
-        # choose contests according to preference
-        for contest in contests_data["result"]:
-            if contest["phase"] == "BEFORE": continue
-            for this_contest_type in all_contest_types:
-                if this_contest_type in contest["name"]:
-                    if this_contest_type in user_contest_type:
-                        count += 1
-                        relevant_contests.append(contest)
-                        break
-            if count == max_contest_count: break
-
-        return relevant_contests
-
-    except requests.exceptions.Timeout:
-        print("Request timeout. Please check your internet connection.")
-        return None
-    except requests.exceptions.RequestException as e:
-        print(f"Network error: {e}")
-        return None
     except Exception as e:
         print(f"Unexpected error: {e}")
         return None
 
-def fetch_problems(contests: List[Dict], filters: Dict)->List[Dict]:
+def _standings_problems(standings, error):
+    if error:
+        return None, error
+    return [Problem.from_api(p) for p in standings["problems"]], None
+
+def fetch_contest_problems(contest_id: int):
+    """Fetch the problem list of one contest from its standings"""
+    return _standings_problems(*call_api('contest.standings', {'contestId': contest_id, 'from': 1, 'count': 1}))
+
+async def fetch_contest_problems_async(contest_id: int):
+    """Async fetch_contest_problems"""
+    return _standings_problems(*await call_api_async('contest.standings', {'contestId': contest_id, 'from': 1, 'count': 1}))
+
+def _pick_problems(problems: List[Problem], filters: Dict, exclude: SolvedSet, picked: List[Problem]) -> bool:
+    """Add a contest's problems matching the filters to `picked`; True once max_questions are picked"""
+    for i, problem in enumerate(problems):
+        if exclude is not None and (problem.contestId, problem.index) in exclude:
+            continue
+        if (i >= filters["question_start"] - 1) and (i< filters["question_end"]):
+            if (problem.rating is not None) and ((problem.rating>=filters["rating_lower"]) and problem.rating<=filters["rating_upper"]):
+                picked.append(problem)
+                if len(picked)>=filters["max_questions"]: return True
+    return False
+
+def _indexed_problems(contests: List[Contest]):
+    """Problem lists of the contests from the local index (None where missing), and the missing ids"""
+    print("\nLooking up problems in the local problem index...")
+    index = get_problem_index()
+    indexed = {c.id: index.contest_problems(c.id) if index else None for c in contests}
+    missing_ids = [contest_id for contest_id, problems in indexed.items() if problems is None]
+    metrics.CACHE_LOOKUPS.inc(len(indexed) - len(missing_ids), cache='problem_index', result='hit')
+    metrics.CACHE_LOOKUPS.inc(len(missing_ids), cache='problem_index', result='miss')
+    if missing_ids:
+        print(f"Fetching {len(missing_ids)} contests from Codeforces API...")
+    return indexed, missing_ids
+
+def index_missing_contests(contests: List[Contest]) -> List[int]:
+    """Fetch the contests missing from the problem index and add them to it; returns the ids that could not be fetched"""
+    index = get_problem_index()
+    if index is None:
+        return [c.id for c in contests]
+    missing_ids = [c.id for c in contests if index.contest_problems(c.id) is None]
+    metrics.CACHE_LOOKUPS.inc(len(contests) - len(missing_ids), cache='problem_index', result='hit')
+    metrics.CACHE_LOOKUPS.inc(len(missing_ids), cache='problem_index', result='miss')
+    if not missing_ids:
+        return []
+    print(f"Fetching {len(missing_ids)} contests from Codeforces API...")
+    failed = []
+    live_fetches = fetch_in_order(missing_ids, fetch_contest_problems)
+    try:
+        for contest_id, (problems, error) in live_fetches:
+            if error:
+                print(f"Error fetching problems of contest {contest_id}: {error}")
+                failed.append(contest_id)
+            else:
+                remember_contest(contest_id, problems)
+    finally:
+        live_fetches.close()
+    save_problem_index()
+    return failed
+
+def fetch_problems(contests: List[Contest], filters: Dict, exclude: SolvedSet = None)->List[Problem]:
+    """Pick problems matching the filters from the given contests.
+
+    Problem lists come from the local problem index; only contests missing
+    from it are fetched from contest.standings (concurrently, in contest
+    order) and then added to the index. Problems in `exclude` (e.g. the
+    user's solved set) are skipped.
+    """
+    live_fetches = None
     try:
-        print("\nFetching problems from Codeforces API...")
+        indexed, missing_ids = _indexed_problems(contests)
+        if missing_ids:
+            live_fetches = fetch_in_order(missing_ids, fetch_contest_problems)
 
-        req_problems = [{}]
+        req_problems = []
         for contest in contests:
-            contest_id = contest["id"]
-            row1_url = f"https://codeforces.com/api/contest.standings?contestId={contest_id}&from=1&count=1"
-            row1_response = requests.get(row1_url, timeout=5)
-
-            if row1_response.status_code != 200:
-                print(f"Error fetching contests: HTTP {row1_response.status_code}")
-                return None
-
-            row1_data = row1_response.json()
-            if row1_data['status'] != 'OK':
-                print(f"Contest API Error: {row1_data.get('comment', 'Unknown error')}")
-                return None
-            for i, problem in enumerate(row1_data["result"]["problems"]):
-                if (i >= filters["question_start"] - 1) and (i< filters["question_end"]):
-                    if ("rating" in problem) and ((problem["rating"]>=filters["rating_lower"]) and problem["rating"]<=filters["rating_upper"]):
-                        # print(f"i = {i} rating = {problem["rating"]} id = {contest["id"]}\n")
-                        req_problems.append(problem)
-                        if len(req_problems)>filters["max_questions"]: break
-            if len(req_problems)>filters["max_questions"]: break
-
-        return req_problems[1:]
-
-
-    except requests.exceptions.Timeout:
-        print("Request timeout. Please check your internet connection.")
-        return None
-    except requests.exceptions.RequestException as e:
-        print(f"Network error: {e}")
+            contest_id = contest.id
+            problems = indexed[contest_id]
+            if problems is None:
+                _, (problems, error) = next(live_fetches)
+                if error:
+                    print(f"Error fetching problems of contest {contest_id}: {error}")
+                    return None
+                remember_contest(contest_id, problems)
+
+            if _pick_problems(problems, filters, exclude, req_problems): break
+
+        save_problem_index()
+        return req_problems
+
+    except Exception as e:
+        print(f"Unexpected error: {e}")
         return None
+    finally:
+        if live_fetches is not None:
+            live_fetches.close()
+
+
+async def fetch_problems_async(contests: List[Contest], filters: Dict, exclude: SolvedSet = None)->List[Problem]:
+    """fetch_problems for async views: missing contests are fetched as tasks on the event loop"""
+    live_fetches = None
+    try:
+        indexed, missing_ids = await asyncio.to_thread(_indexed_problems, contests)
+        if missing_ids:
+            live_fetches = fetch_in_order_async(missing_ids, fetch_contest_problems_async)
+
+        req_problems = []
+        for contest in contests:
+            contest_id = contest.id
+            problems = indexed[contest_id]
+            if problems is None:
+                _, (problems, error) = await anext(live_fetches)
+                if error:
+                    print(f"Error fetching problems of contest {contest_id}: {error}")
+                    return None
+                remember_contest(contest_id, problems)
+
+            if _pick_problems(problems, filters, exclude, req_problems): break
+
+        if missing_ids:
+            await asyncio.to_thread(save_problem_index)
+        return req_problems
+
     except Exception as e:
         print(f"Unexpected error: {e}")
         return None
+    finally:
+        if live_fetches is not None:
+            await live_fetches.aclose()
 
 
-def display_results(problems: List[Dict]):
+def display_results(problems: List[Problem]):
     """Display filtered problems as links"""
     # print(problems)
     if not problems:
@@ -198,8 +276,8 @@ def display_results(problems: List[Dict]):
     print("-" * 60)
 
     for problem in problems:
-        contest_id = problem['contestId']
-        index = problem['index']
+        contest_id = problem.contestId
+        index = problem.index
         link = f"https://codeforces.com/contest/{contest_id}/problem/{index}"
         print(link)
 
@@ -228,6 +306,10 @@ def filter_questions(username: str):
     if max_questions is None:
         return
 
+    exclude_solved = get_exclude_solved()
+    if exclude_solved is None:
+        return
+
     # Create filters dictionary
     filters = {
         'rating_lower': rating_lower,
@@ -253,7 +335,15 @@ def filter_questions(username: str):
     #     print("\n")
     # print("]\n")
 
-    filtered_problems = fetch_problems(contests_data, filters)
+    solved = None
+    if exclude_solved:
+        solved, error = get_solved_set(username)
+        if error:
+            print(f"Could not load solved problems, showing all: {error}")
+        else:
+            print(f"Excluding {len(solved)} solved problems")
+
+    filtered_problems = fetch_problems(contests_data, filters, exclude=solved)
 
     # Display results
     display_results(filtered_problems)
@@ -0,0 +1,160 @@
+"""
+Codeforces Tutor - API rate limiting
+A token bucket every Codeforces API call passes through. The default bucket
+lives in memory; the SQLite-backed one keeps its state in a file, so all
+processes using that file (e.g. several gunicorn workers) share one budget.
+
+The bucket is kept as a GCRA "theoretical arrival time": a call may start
+once the time it would be due at a steady `rate` is at most `burst - 1`
+intervals ahead of now, so bursts of up to `burst` calls go out at once.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import metrics
+from config import (
+    API_REQUESTS_PER_SECOND, API_BURST, API_MAX_QUEUE_WAIT, RATE_LIMIT_BACKEND, CACHE_DIR, ensure_cache_dir
+)
+
+RATE_LIMIT_PATH = os.path.join(CACHE_DIR, 'rate_limit.sqlite3')
+
+
+class RateBudgetExceeded(Exception):
+    """The call would have to queue longer than the limiter's max_wait"""
+
+
+class LimiterMetrics:
+    """Counters of calls let through, time spent queueing and calls rejected"""
+
+    def __init__(self):
+        self.calls = 0
+        self.delayed_calls = 0
+        self.rejected_calls = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, delay: Optional[float]):
+        with self._lock:
+            if delay is None:
+                self.rejected_calls += 1
+                return
+            self.calls += 1
+            if delay > 0:
+                self.delayed_calls += 1
+                self.total_wait += delay
+                self.max_wait = max(self.max_wait, delay)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'delayed_calls': self.delayed_calls,
+                'rejected_calls': self.rejected_calls,
+                'total_wait_seconds': self.total_wait,
+                'max_wait_seconds': self.max_wait,
+                'mean_wait_seconds': self.total_wait / self.calls if self.calls else 0.0,
+            }
+
+
+class TokenBucket:
+    """`rate` calls per second on average with bursts of up to `burst` calls, in memory"""
+
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self, rate: float, burst: int = 1, max_wait: float = None):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.tolerance = max(burst - 1, 0) * self.interval
+        self.max_wait = max_wait
+        self.metrics = LimiterMetrics()
+        self._tat = 0.0
+        self._lock = threading.Lock()
+
+    def _schedule(self, tat: float, now: float, max_wait: Optional[float]) -> Tuple[Optional[float], float]:
+        """(new arrival time or None if rejected, delay before the call may start)"""
+        tat = max(tat, now)
+        delay = max(tat - self.tolerance - now, 0.0)
+        if max_wait is not None and delay > max_wait:
+            return None, delay
+        return tat + self.interval, delay
+
+    def _take(self, max_wait: Optional[float]) -> Optional[float]:
+        with self._lock:
+            new_tat, delay = self._schedule(self._tat, self.clock(), max_wait)
+            if new_tat is None:
+                return None
+            self._tat = new_tat
+            return delay
+
+    def reserve(self, max_wait: float = None) -> Optional[float]:
+        """Reserve a call and return how long to wait before making it (None: rejected)"""
+        delay = self._take(self.max_wait if max_wait is None else max_wait)
+        self.metrics.record(delay)
+        return delay
+
+    def acquire(self, max_wait: float = None):
+        """Block until a call may start; raise RateBudgetExceeded if that takes longer than max_wait"""
+        delay = self.reserve(max_wait)
+        if delay is None:
+            raise RateBudgetExceeded()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class SQLiteTokenBucket(TokenBucket):
+    """TokenBucket whose state is one row of a SQLite file shared by processes"""
+
+    clock = staticmethod(time.time)
+
+    def __init__(self, rate: float, burst: int = 1, max_wait: float = None,
+                 path: str = RATE_LIMIT_PATH, name: str = 'codeforces'):
+        super().__init__(rate, burst, max_wait)
+        self.path = path
+        self.name = name
+        ensure_cache_dir()
+        conn = self._connect()
+        try:
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tat REAL NOT NULL)")
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def _take(self, max_wait: Optional[float]) -> Optional[float]:
+        conn = self._connect()
+        try:
+            # IMMEDIATE takes the write lock up front, so read-modify-write is atomic across processes
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT tat FROM buckets WHERE name = ?", (self.name,)).fetchone()
+            new_tat, delay = self._schedule(row[0] if row else 0.0, self.clock(), max_wait)
+            if new_tat is not None:
+                conn.execute("INSERT OR REPLACE INTO buckets (name, tat) VALUES (?, ?)", (self.name, new_tat))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return None if new_tat is None else delay
+
+
+def make_api_limiter() -> TokenBucket:
+    """The limiter selected by CF_TUTOR_RATE_LIMIT_BACKEND ('memory' or 'sqlite')"""
+    if RATE_LIMIT_BACKEND == 'sqlite':
+        return SQLiteTokenBucket(API_REQUESTS_PER_SECOND, API_BURST, API_MAX_QUEUE_WAIT)
+    return TokenBucket(API_REQUESTS_PER_SECOND, API_BURST, API_MAX_QUEUE_WAIT)
+
+
+# Every Codeforces API call made by this process waits on this bucket
+api_limiter = make_api_limiter()
+
+metrics.CallbackMetric('cf_tutor_rate_limit_calls_total', 'API calls let through by the rate limiter',
+                       'counter', lambda: api_limiter.metrics.calls)
+metrics.CallbackMetric('cf_tutor_rate_limit_rejected_total', 'API calls rejected for queueing too long',
+                       'counter', lambda: api_limiter.metrics.rejected_calls)
+metrics.CallbackMetric('cf_tutor_rate_limit_wait_seconds_total', 'Time API calls spent queued in the rate limiter',
+                       'counter', lambda: api_limiter.metrics.total_wait)
+metrics.CallbackMetric('cf_tutor_rate_limit_max_wait_seconds', 'Longest time an API call was queued',
+                       'gauge', lambda: api_limiter.metrics.max_wait)
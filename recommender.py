@@ -0,0 +1,262 @@
+"""
+Codeforces Tutor - Problem recommender
+Scores every indexed problem for a user at once. The catalog keeps a
+problem x tag 0/1 matrix and a rating per problem. A user's weakness vector
+weighs each tag by how much less often the user solved it than problems
+around their rating carry it. A problem's score is its rating fit (a bell
+around a bit above the user's rating) times a base weight plus the mean
+weakness of its tags.
+
+Scoring is one matrix-vector product with NumPy; without NumPy the same
+formula runs as a Python loop.
+"""
+
+import math
+import sys
+import threading
+from typing import Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+from problem_index import ProblemIndex, get_problem_index
+from records import Problem
+from solved_set import SolvedSet, pack_problem_key
+from user_analytics import fetch_user_info, get_stats_and_solved_set
+
+# Recommended problems centre this much above the user's rating
+RATING_STEP_UP = 100
+# Standard deviation of the rating fit; problems beyond MAX_RATING_DISTANCE are not scored
+RATING_SPREAD = 150
+MAX_RATING_DISTANCE = 3 * RATING_SPREAD
+# Rating band (around the target) whose tag mix a user is compared with
+TAG_BAND = 200
+# Keeps tags the user never solved (or rare ones) from dominating the weakness
+TAG_SMOOTHING = 0.01
+# Score of a matching-rating problem without weak tags, relative to the tag part
+BASE_WEIGHT = 0.25
+# Scores are rounded to this many decimals, so the summation order (BLAS or
+# Python) cannot reorder problems with equal scores
+SCORE_DECIMALS = 9
+DEFAULT_RATING = 1200
+WEAK_TAGS_SHOWN = 5
+
+
+class Recommendation:
+    __slots__ = ('problem', 'score', 'weak_tags')
+
+    def __init__(self, problem: Problem, score: float, weak_tags: List[str]):
+        self.problem = problem
+        self.score = score
+        # the problem's tags the user is weak in, weakest first
+        self.weak_tags = weak_tags
+
+
+class ProblemCatalog:
+    """Rated indexed problems (newest contests first) with their tag matrix"""
+
+    def __init__(self, problem_index: ProblemIndex):
+        self.problems: List[Problem] = []
+        for contest_id in sorted(problem_index.by_contest, reverse=True):
+            self.problems.extend(p for p in problem_index.by_contest[contest_id] if p.rating is not None)
+        self.tags = sorted({tag for problem in self.problems for tag in problem.tags})
+        self.tag_column = {tag: column for column, tag in enumerate(self.tags)}
+        # per problem: tag columns, rating and packed key (-1 when it has none)
+        self.problem_tags = [[self.tag_column[tag] for tag in problem.tags] for problem in self.problems]
+        self.rating_list = [problem.rating for problem in self.problems]
+        self.key_list = [pack_problem_key(p.contestId, p.index) or -1 for p in self.problems]
+
+        if np is not None:
+            n = len(self.problems)
+            self.tag_matrix = np.zeros((n, len(self.tags)), dtype=np.float64)
+            rows = [row for row, columns in enumerate(self.problem_tags) for _ in columns]
+            columns = [column for columns in self.problem_tags for column in columns]
+            self.tag_matrix[rows, columns] = 1.0
+            self.tag_counts = np.maximum(self.tag_matrix.sum(axis=1), 1.0)
+            self.ratings = np.array(self.rating_list, dtype=np.float64)
+            self.keys = np.array(self.key_list, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.problems)
+
+    def band_tag_shares(self, center: float) -> List[float]:
+        """Share of each tag among the tags of problems rated within TAG_BAND of `center`"""
+        if np is not None:
+            in_band = np.abs(self.ratings - center) <= TAG_BAND
+            counts = self.tag_matrix[in_band].sum(axis=0)
+            total = counts.sum()
+            return (counts / total).tolist() if total else [0.0] * len(self.tags)
+        counts = [0] * len(self.tags)
+        for rating, columns in zip(self.rating_list, self.problem_tags):
+            if abs(rating - center) <= TAG_BAND:
+                for column in columns:
+                    counts[column] += 1
+        total = sum(counts)
+        return [count / total for count in counts] if total else [0.0] * len(self.tags)
+
+
+def target_rating(user_rating: Optional[int], stats: Dict) -> int:
+    """The user's rating; for unrated users the 75th percentile of their solved problem ratings"""
+    if user_rating:
+        return user_rating
+    distribution = stats.get('rating_distribution')
+    if not distribution:
+        return DEFAULT_RATING
+    remaining = sum(distribution.values()) * 0.25
+    for rating in sorted(distribution, reverse=True):
+        remaining -= distribution[rating]
+        if remaining <= 0:
+            return rating
+    return DEFAULT_RATING
+
+
+def weakness_vector(catalog: ProblemCatalog, stats: Dict, center: float) -> List[float]:
+    """Per catalog tag: log ratio of the tag's share around `center` to its share of the user's solves (>= 0)"""
+    solved_tags = stats.get('tags') or {}
+    solved_total = sum(solved_tags.values())
+    weakness = []
+    for tag, expected in zip(catalog.tags, catalog.band_tag_shares(center)):
+        user_share = solved_tags.get(tag, 0) / solved_total if solved_total else 0.0
+        weakness.append(max(0.0, math.log((expected + TAG_SMOOTHING) / (user_share + TAG_SMOOTHING))))
+    return weakness
+
+
+def _score_numpy(catalog: ProblemCatalog, weakness: List[float], center: float, exclude: Optional[SolvedSet]):
+    distance = catalog.ratings - center
+    fit = np.exp(-0.5 * (distance / RATING_SPREAD) ** 2)
+    tag_score = (catalog.tag_matrix @ np.asarray(weakness)) / catalog.tag_counts
+    scores = np.round(fit * (BASE_WEIGHT + tag_score), SCORE_DECIMALS)
+    scores[np.abs(distance) > MAX_RATING_DISTANCE] = -1.0
+    if exclude is not None and len(exclude):
+        solved = np.frombuffer(exclude.keys, dtype=np.int64)
+        scores[np.isin(catalog.keys, solved, assume_unique=False)] = -1.0
+    return scores
+
+
+def _top_numpy(scores, k: int) -> List[int]:
+    candidates = np.flatnonzero(scores >= 0)
+    if len(candidates) > k:
+        # keep everything tied with the k-th best, so ties are broken below and not by the partition
+        kth_best = -np.partition(-scores[candidates], k - 1)[k - 1]
+        candidates = candidates[scores[candidates] >= kth_best]
+    # best first; on equal scores the newer contest (lower row) first
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order[:k]].tolist()
+
+
+def _top_python(catalog: ProblemCatalog, weakness: List[float], center: float,
+                exclude: Optional[SolvedSet], k: int):
+    """The same scores as _score_numpy, for the k best rows; returns (rows, scores by row)"""
+    solved = set(exclude.keys) if exclude is not None else set()
+    scored = []
+    for row, (rating, columns, key) in enumerate(zip(catalog.rating_list, catalog.problem_tags, catalog.key_list)):
+        distance = rating - center
+        if abs(distance) > MAX_RATING_DISTANCE or key in solved:
+            continue
+        fit = math.exp(-0.5 * (distance / RATING_SPREAD) ** 2)
+        tag_score = sum(weakness[column] for column in columns) / max(len(columns), 1)
+        scored.append((-round(fit * (BASE_WEIGHT + tag_score), SCORE_DECIMALS), row))
+    scored.sort()
+    top = scored[:k]
+    return [row for _, row in top], {row: -score for score, row in top}
+
+
+def recommend(catalog: ProblemCatalog, weakness: List[float], center: float, k: int = 10,
+              exclude: SolvedSet = None) -> List[Recommendation]:
+    """The k best scored problems for a weakness vector and rating centre (problems in `exclude` are left out)"""
+    if k <= 0 or not len(catalog):
+        return []
+    if np is not None:
+        scores = _score_numpy(catalog, weakness, center, exclude)
+        rows = _top_numpy(scores, k)
+        score_of = {row: float(scores[row]) for row in rows}
+    else:
+        rows, score_of = _top_python(catalog, weakness, center, exclude, k)
+
+    recommendations = []
+    for row in rows:
+        columns = sorted(catalog.problem_tags[row], key=lambda column: -weakness[column])
+        weak_tags = [catalog.tags[column] for column in columns if weakness[column] > 0]
+        recommendations.append(Recommendation(catalog.problems[row], score_of[row], weak_tags))
+    return recommendations
+
+
+def weakest_tags(catalog: ProblemCatalog, weakness: List[float], count: int = WEAK_TAGS_SHOWN) -> List[str]:
+    """The tags with the largest weakness, weakest first"""
+    ranked = sorted(range(len(weakness)), key=lambda column: -weakness[column])
+    return [catalog.tags[column] for column in ranked[:count] if weakness[column] > 0]
+
+
+_catalog: Optional[ProblemCatalog] = None
+_catalog_source = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """Return (ProblemCatalog, error), rebuilt when the problem index changed (its generation)"""
+    global _catalog, _catalog_source
+    problem_index = get_problem_index()
+    if problem_index is None:
+        return None, "Problem index is not available"
+    source = problem_index.generation
+    with _catalog_lock:
+        if _catalog is None or _catalog_source != source:
+            _catalog = ProblemCatalog(problem_index)
+            _catalog_source = source
+        return _catalog, None
+
+
+def recommendations_for(stats: Dict, user_info: Dict, solved: Optional[SolvedSet], k: int = 10):
+    """Return ({'recommendations', 'target_rating', 'weak_tags'}, error) for a user's stats and profile"""
+    catalog, error = get_catalog()
+    if error:
+        return None, error
+    stats = stats or {}
+    rating = target_rating((user_info or {}).get('rating'), stats)
+    center = rating + RATING_STEP_UP
+    weakness = weakness_vector(catalog, stats, center)
+    return {
+        'recommendations': recommend(catalog, weakness, center, k, exclude=solved),
+        'target_rating': rating,
+        'weak_tags': weakest_tags(catalog, weakness),
+    }, None
+
+
+def get_recommendations(username: str, k: int = 10):
+    """Fetch a user's profile, stats and solved problems and return (recommendations_for result, error)"""
+    user_info, error = fetch_user_info(username)
+    if error:
+        return None, error
+    stats, solved, error = get_stats_and_solved_set(username)
+    if error:
+        return None, error
+    return recommendations_for(stats, user_info, solved, k)
+
+
+def show_recommendations(username: str, k: int = 10, pause: bool = True):
+    """Recommended problems for the terminal application"""
+    print(f"\n=== RECOMMENDED PROBLEMS FOR: {username} ===")
+    result, error = get_recommendations(username, k)
+    if error:
+        print(f"Error: {error}")
+    else:
+        print(f"Your rating: {result['target_rating']}; recommending problems around {result['target_rating'] + RATING_STEP_UP}")
+        if result['weak_tags']:
+            print(f"Weakest tags: {', '.join(result['weak_tags'])}")
+        print("\n" + "=" * 80)
+        for i, recommendation in enumerate(result['recommendations'], 1):
+            problem = recommendation.problem
+            focus = f" [{', '.join(recommendation.weak_tags[:3])}]" if recommendation.weak_tags else ""
+            print(f"{i:2d}. {problem.contestId}{problem.index} {problem.name} ({problem.rating}){focus}")
+            print(f"    https://codeforces.com/contest/{problem.contestId}/problem/{problem.index}")
+        print("=" * 80)
+    if pause:
+        input("\nPress Enter to return to main menu...")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python recommender.py HANDLE [COUNT]")
+    show_recommendations(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 10, pause=False)
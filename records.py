@@ -0,0 +1,129 @@
+"""
+Codeforces Tutor - Compact API records
+Slotted classes holding only the fields the app uses from Codeforces API
+objects. Built once when a response is decoded; repeated strings (verdicts,
+languages, tags, problem indexes, phases) are interned so every record
+shares one copy.
+
+Attribute names follow the API field names, so templates can use the same
+expressions (problem.contestId, problem.rating, ...) as with the raw dicts.
+"""
+
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+def _compact(record) -> Dict:
+    """The record's non-empty fields as an API-shaped dict"""
+    data = {}
+    for field in record.__slots__:
+        value = getattr(record, field)
+        if value is None or value == ():
+            continue
+        if isinstance(value, tuple):
+            value = list(value)
+        elif hasattr(value, 'to_dict'):
+            value = value.to_dict()
+        data[field] = value
+    return data
+
+
+class Problem:
+    __slots__ = ('contestId', 'index', 'name', 'rating', 'tags')
+
+    def __init__(self, contestId: int = None, index: str = None, name: str = None,
+                 rating: int = None, tags: Tuple[str, ...] = ()):
+        self.contestId = contestId
+        self.index = index
+        self.name = name
+        self.rating = rating
+        self.tags = tags
+
+    @classmethod
+    def from_api(cls, data: Dict) -> 'Problem':
+        return cls(data.get('contestId'), _intern(data.get('index')), data.get('name'),
+                   data.get('rating'), tuple(sys.intern(tag) for tag in data.get('tags', ())))
+
+    @property
+    def key(self) -> Optional[Tuple[int, str]]:
+        """(contestId, index), or None if either is unknown"""
+        if self.contestId is None or self.index is None:
+            return None
+        return (self.contestId, self.index)
+
+    def to_dict(self) -> Dict:
+        return _compact(self)
+
+    def __repr__(self):
+        return f"Problem({self.contestId}{self.index}, rating={self.rating})"
+
+
+class Submission:
+    __slots__ = ('id', 'contestId', 'creationTimeSeconds', 'problem', 'programmingLanguage', 'verdict')
+
+    def __init__(self, id: int = None, contestId: int = None, creationTimeSeconds: int = None,
+                 problem: Problem = None, programmingLanguage: str = None, verdict: str = None):
+        self.id = id
+        self.contestId = contestId
+        self.creationTimeSeconds = creationTimeSeconds
+        self.problem = problem
+        self.programmingLanguage = programmingLanguage
+        self.verdict = verdict
+
+    @classmethod
+    def from_api(cls, data: Dict) -> 'Submission':
+        problem = data.get('problem')
+        return cls(data.get('id'), data.get('contestId'), data.get('creationTimeSeconds'),
+                   Problem.from_api(problem) if problem is not None else None,
+                   _intern(data.get('programmingLanguage')), _intern(data.get('verdict')))
+
+    def to_dict(self) -> Dict:
+        return _compact(self)
+
+    def __repr__(self):
+        return f"Submission({self.id}, {self.verdict})"
+
+
+class Contest:
+    __slots__ = ('id', 'name', 'type', 'phase', 'startTimeSeconds', 'durationSeconds')
+
+    def __init__(self, id: int = None, name: str = '', type: str = None, phase: str = None,
+                 startTimeSeconds: int = None, durationSeconds: int = None):
+        self.id = id
+        self.name = name
+        self.type = type
+        self.phase = phase
+        self.startTimeSeconds = startTimeSeconds
+        self.durationSeconds = durationSeconds
+
+    @classmethod
+    def from_api(cls, data: Dict) -> 'Contest':
+        return cls(data.get('id'), data.get('name', ''), _intern(data.get('type')), _intern(data.get('phase')),
+                   data.get('startTimeSeconds'), data.get('durationSeconds'))
+
+    def to_dict(self) -> Dict:
+        return _compact(self)
+
+    def __repr__(self):
+        return f"Contest({self.id}, {self.name!r})"
+
+
+def as_submissions(submissions: Iterable) -> List[Submission]:
+    """Submission records from API dicts (records are passed through)"""
+    return [s if isinstance(s, Submission) else Submission.from_api(s) for s in submissions]
+
+
+def recent_activity_entry(submission: Submission) -> Dict:
+    """The dict shown for a submission in the analytics 'recent_activity' list"""
+    problem = submission.problem
+    return {
+        'problem_name': (problem.name if problem is not None else None) or 'Unknown',
+        'verdict': submission.verdict or 'UNKNOWN',
+        'contest_id': submission.contestId,
+        'index': problem.index if problem is not None else None,
+        'timestamp': submission.creationTimeSeconds
+    }
@@ -0,0 +1,67 @@
+"""
+Codeforces Tutor - Response cache
+A thread-safe LRU cache bounded by an approximate memory budget, used to
+keep analytics results and rendered pages per handle.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class CacheEntry:
+    __slots__ = ('value', 'size', 'version', 'stored_at')
+
+    def __init__(self, value: Any, size: int, version: str):
+        self.value = value
+        self.size = size
+        self.version = version
+        self.stored_at = time.time()
+
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+    def touch(self):
+        """Mark the entry as confirmed up to date now"""
+        self.stored_at = time.time()
+
+
+class LRUCache:
+    """Least recently used entries are evicted once `max_bytes` is exceeded"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: 'OrderedDict[Hashable, CacheEntry]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, value: Any, size: int, version: str) -> CacheEntry:
+        entry = CacheEntry(value, size, version)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old.size
+            if size <= self.max_bytes:
+                self._entries[key] = entry
+                self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= evicted.size
+        return entry
+
+    def pop(self, key: Hashable):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.total_bytes -= entry.size
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,195 @@
+"""
+Codeforces Tutor - On-disk API response store
+Successful API responses are kept as gzip files named after the API method
+and a hash of the parameters, so they survive restarts. Entries younger than
+their method's TTL are served without calling the API; older ones are still
+served when the API cannot be reached. In offline mode (CF_TUTOR_OFFLINE=1)
+only stored responses are used, which also lets tests and benchmarks replay
+recorded responses without network access.
+
+Two kinds of entries exist: raw response bodies (call_api) and the items of
+a streamed list as one JSON array (stream_api), written while the list is
+being decoded.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from config import RESPONSE_STORE_DIR, RESPONSE_STORE_MAX_BYTES
+
+# How long a stored response is served without asking the API (seconds).
+# Methods whose results have their own in-memory cache keep short TTLs here.
+RESPONSE_TTLS = {
+    'contest.list': 10 * 60,
+    'contest.standings': 24 * 60 * 60,
+    'problemset.problems': 60 * 60,
+    'user.info': 5 * 60,
+    'user.rating': 60 * 60,
+    'user.status': 60,
+}
+DEFAULT_TTL = 60
+
+COMPRESS_LEVEL = 5
+
+# After eviction the store is at most this share of its size cap
+EVICT_TO = 0.9
+
+
+class StoredResponse:
+    __slots__ = ('path', 'age', 'ttl')
+
+    def __init__(self, path: str, age: float, ttl: float):
+        self.path = path
+        self.age = age
+        self.ttl = ttl
+
+    @property
+    def fresh(self) -> bool:
+        return self.age < self.ttl
+
+
+class EntryWriter:
+    """Writes the items of a streamed list; the entry only appears once commit() is called"""
+
+    def __init__(self, store: 'ResponseStore', path: str):
+        self.store = store
+        self.path = path
+        self.tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self.file = gzip.open(self.tmp_path, 'wt', encoding='utf-8', compresslevel=COMPRESS_LEVEL)
+        self.file.write('[')
+        self.first = True
+
+    def write_item(self, raw_json: str):
+        if not self.first:
+            self.file.write(',')
+        self.file.write(raw_json)
+        self.first = False
+
+    def commit(self):
+        try:
+            self.file.write(']')
+            self.file.close()
+            os.replace(self.tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not store response: {e}")
+            self.discard()
+            return
+        self.store._added(self.path)
+
+    def discard(self):
+        """Drop an unfinished entry (no-op after commit)"""
+        if os.path.exists(self.tmp_path):
+            if not self.file.closed:
+                self.file.close()
+            os.remove(self.tmp_path)
+
+
+class ResponseStore:
+    """Size-capped directory of gzip-compressed API responses"""
+
+    def __init__(self, directory: str = RESPONSE_STORE_DIR, max_bytes: int = RESPONSE_STORE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._total_bytes = None
+        self._lock = threading.Lock()
+
+    def _path(self, kind: str, method: str, params: Dict = None) -> str:
+        key = json.dumps([kind, method, sorted((name, str(value)) for name, value in (params or {}).items())])
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()[:24]
+        return os.path.join(self.directory, f"{method}-{kind}-{digest}.json.gz")
+
+    def lookup(self, kind: str, method: str, params: Dict = None) -> Optional[StoredResponse]:
+        """The stored response for a call, None if there is none"""
+        path = self._path(kind, method, params)
+        try:
+            age = time.time() - os.stat(path).st_mtime
+        except OSError:
+            return None
+        return StoredResponse(path, age, RESPONSE_TTLS.get(method, DEFAULT_TTL))
+
+    def read_body(self, entry: StoredResponse) -> Optional[bytes]:
+        """The stored response body, None if the entry was evicted meanwhile"""
+        try:
+            with gzip.open(entry.path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def open_items(self, entry: StoredResponse):
+        """Text file positioned after the '[' of a stored list, None if it was evicted meanwhile"""
+        try:
+            f = gzip.open(entry.path, 'rt', encoding='utf-8')
+            f.read(1)
+            return f
+        except OSError:
+            return None
+
+    def put_body(self, kind: str, method: str, params: Dict, body: bytes):
+        """Store a response body"""
+        path = self._path(kind, method, params)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with gzip.open(tmp_path, 'wb', compresslevel=COMPRESS_LEVEL) as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not store {method} response: {e}")
+            return
+        self._added(path)
+
+    def writer(self, kind: str, method: str, params: Dict = None) -> Optional[EntryWriter]:
+        """EntryWriter for the items of a streamed list, None if the store is not writable"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            return EntryWriter(self, self._path(kind, method, params))
+        except OSError as e:
+            print(f"Could not store {method} response: {e}")
+            return None
+
+    def _entries(self):
+        with os.scandir(self.directory) as entries:
+            return [(e.stat().st_mtime, e.stat().st_size, e.path) for e in entries if e.name.endswith('.json.gz')]
+
+    def _known_total(self) -> int:
+        """Total size of the entries, scanned once; call with _lock held"""
+        if self._total_bytes is None:
+            try:
+                self._total_bytes = sum(size for _, size, _ in self._entries())
+            except OSError:
+                self._total_bytes = 0
+        return self._total_bytes
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._known_total()
+
+    def _added(self, path: str):
+        """Account for a new entry and evict the oldest ones once over the size cap"""
+        with self._lock:
+            try:
+                self._total_bytes = self._known_total() + os.path.getsize(path)
+            except OSError:
+                return
+            if self._total_bytes <= self.max_bytes:
+                return
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, entry_path in entries:
+                if total <= self.max_bytes * EVICT_TO:
+                    break
+                try:
+                    os.remove(entry_path)
+                    total -= size
+                except OSError:
+                    pass
+            self._total_bytes = total
+
+
+# The store used by cf_api
+response_store = ResponseStore()
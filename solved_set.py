@@ -0,0 +1,46 @@
+"""
+Codeforces Tutor - Solved problem sets
+A user's solved problems as a frozen set of (contestId, index) pairs, for
+"already solved?" checks at the cost of one hash lookup, and packed into a
+sorted array of 64-bit keys for bulk work: the query index turns the keys
+into a row bitset once per set, and the recommender matches them against its
+packed problem keys with NumPy.
+"""
+
+import re
+from array import array
+from typing import Iterable, Optional, Tuple
+
+_INDEX_PARTS = re.compile(r'^([A-Z]{1,3})(\d{0,2})$')
+
+
+def pack_problem_key(contest_id: int, index: str) -> Optional[int]:
+    """(contestId, index) as one int that sorts like the pair; None for unusual indexes"""
+    match = _INDEX_PARTS.match(index or '')
+    if contest_id is None or not match:
+        return None
+    letters, number = match.groups()
+    letters_value = 0
+    for letter in letters:
+        letters_value = letters_value * 27 + (ord(letter) - 64)
+    return (contest_id << 22) | (letters_value << 7) | (int(number) if number else 0)
+
+
+class SolvedSet:
+    """Sorted packed (contestId, index) keys of the problems a user solved"""
+
+    __slots__ = ('problems', 'keys', 'query_bits')
+
+    def __init__(self, problems: Iterable[Tuple[int, str]] = ()):
+        self.problems = frozenset(problems)
+        keys = {pack_problem_key(contest_id, index) for contest_id, index in self.problems}
+        keys.discard(None)
+        self.keys = array('q', sorted(keys))
+        # (query index, row bitset) cached by ProblemQueryIndex.rows_of
+        self.query_bits = None
+
+    def __contains__(self, problem: Tuple[int, str]) -> bool:
+        return problem in self.problems
+
+    def __len__(self):
+        return len(self.problems)
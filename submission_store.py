@@ -0,0 +1,163 @@
+"""
+Codeforces Tutor - Submission store
+Every handle's submissions are kept in a local SQLite database, as compact
+records holding only the fields the app uses. A sync only
+downloads submissions newer than the ones already stored, in small
+user.status pages, so repeat visits transfer a few KB.
+"""
+
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+from cf_api import call_api, describe_error, stream_api
+from concurrent_fetch import SingleFlight
+from config import CACHE_DIR, SUBMISSION_SYNC_PAGE_SIZE, ensure_cache_dir
+from records import Submission, as_submissions
+
+STORE_PATH = os.path.join(CACHE_DIR, 'submissions.sqlite3')
+
+# Submissions decoded from a streamed history are written in batches of this size
+STORE_BATCH_SIZE = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    handle TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    verdict TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (handle, id)
+) WITHOUT ROWID;
+"""
+
+
+@contextmanager
+def _connect(path: str = STORE_PATH):
+    """Open the store and run the block in one transaction"""
+    ensure_cache_dir()
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        conn.executescript(_SCHEMA)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _key(handle: str) -> str:
+    # Codeforces handles are case-insensitive
+    return handle.lower()
+
+
+def resume_id(handle: str) -> Optional[int]:
+    """Id from which the next sync has to look again
+
+    That is the oldest submission still being judged (its verdict can still
+    change), or else the newest stored one; None when nothing is stored yet.
+    """
+    with _connect() as conn:
+        pending = conn.execute(
+            "SELECT MIN(id) FROM submissions WHERE handle = ? AND (verdict IS NULL OR verdict = 'TESTING')",
+            (_key(handle),)).fetchone()[0]
+        if pending is not None:
+            return pending
+        return conn.execute("SELECT MAX(id) FROM submissions WHERE handle = ?",
+                            (_key(handle),)).fetchone()[0]
+
+
+def _insert(conn: sqlite3.Connection, handle: str, submissions: List):
+    rows = [(_key(handle), s.id, s.verdict, json.dumps(s.to_dict(), separators=(',', ':')))
+            for s in as_submissions(submissions)]
+    conn.executemany("INSERT OR REPLACE INTO submissions (handle, id, verdict, data) VALUES (?, ?, ?, ?)", rows)
+
+
+def store_submissions(handle: str, submissions: List):
+    """Insert or update submissions (API dicts or records) of a handle"""
+    with _connect() as conn:
+        _insert(conn, handle, submissions)
+
+
+def load_submissions(handle: str, after_id: int = None) -> List[Submission]:
+    """Stored submissions of a handle, newest first (only ids > after_id if given)"""
+    query = "SELECT data FROM submissions WHERE handle = ?"
+    params = [_key(handle)]
+    if after_id is not None:
+        query += " AND id > ?"
+        params.append(after_id)
+    with _connect() as conn:
+        rows = conn.execute(query + " ORDER BY id DESC", params).fetchall()
+    return [Submission.from_api(json.loads(data)) for (data,) in rows]
+
+
+def _batches(items: Iterator, size: int) -> Iterator[List]:
+    batch = []
+    for item in items:
+        batch.append(Submission.from_api(item))
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# Concurrent syncs of one handle share a single download
+_sync_flights = SingleFlight('submission_sync')
+
+
+def sync_submissions(handle: str, page_size: int = SUBMISSION_SYNC_PAGE_SIZE) -> Tuple[Optional[int], Optional[str]]:
+    """Download submissions the store does not have yet; returns (number fetched, error)"""
+    return _sync_flights.do(_key(handle), _sync_submissions, handle, page_size)
+
+
+def _sync_submissions(handle: str, page_size: int) -> Tuple[Optional[int], Optional[str]]:
+    print(f"Syncing submissions for {handle}...")
+    known_from = resume_id(handle)
+
+    if known_from is None:
+        # first visit: the whole history in one streamed call, written in
+        # batches within one transaction so a broken download stores nothing
+        items, error = stream_api('user.status', {'handle': handle})
+        if error:
+            return None, error
+        total = 0
+        try:
+            with _connect() as conn:
+                for batch in _batches(items, STORE_BATCH_SIZE):
+                    _insert(conn, handle, batch)
+                    total += len(batch)
+        except Exception as e:
+            return None, describe_error(e)
+        finally:
+            items.close()
+        return total, None
+
+    fetched = []
+    start = 1
+    while True:
+        page, error = call_api('user.status', {'handle': handle, 'from': start, 'count': page_size})
+        if error:
+            return None, error
+        fetched.extend(s for s in page if s['id'] >= known_from)
+        if len(page) < page_size or page[-1]['id'] <= known_from:
+            break
+        start += page_size
+
+    if fetched:
+        store_submissions(handle, fetched)
+    return len(fetched), None
+
+
+def get_submissions(handle: str) -> Tuple[Optional[List[Submission]], Optional[str]]:
+    """Sync the handle and return its full submission history, newest first.
+
+    If the sync fails but older data is stored, the stored data is returned.
+    """
+    _, error = sync_submissions(handle)
+    submissions = load_submissions(handle)
+    if error:
+        if not submissions:
+            return None, error
+        print(f"Could not sync submissions for {handle}, using stored data: {error}")
+    return submissions, None
@@ -0,0 +1,277 @@
+"""
+Codeforces Tutor - Team analytics
+Side-by-side comparison of many handles (e.g. a coach's students). All
+profiles come from one batched user.info call; the members' submission syncs
+and rating histories are then fetched concurrently, TEAM_FETCH_WORKERS
+members at a time, with every call passing the shared API rate limiter. Each
+member's submissions are analyzed as on the single-user analytics page.
+"""
+
+import asyncio
+import re
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from cf_api import call_api, call_api_async
+from concurrent_fetch import fetch_in_order
+from config import TEAM_MAX_HANDLES, TEAM_FETCH_WORKERS
+from user_analytics import fetch_user_rating_history, fetch_user_rating_history_async, get_user_stats
+
+HANDLE_SEPARATORS = re.compile(r'[\s,;]+')
+
+# Codeforces fails the whole user.info call when one handle does not exist
+_NOT_FOUND = re.compile(r'User with handle (\S+) not found')
+
+# Comparison table columns: (row key, heading); rows sort on any of the keys
+TEAM_COLUMNS = [
+    ('handle', 'Handle'),
+    ('rating', 'Rating'),
+    ('max_rating', 'Max Rating'),
+    ('contests', 'Contests'),
+    ('last_change', 'Last Change'),
+    ('best_rank', 'Best Rank'),
+    ('solved', 'Solved'),
+    ('submissions', 'Submissions'),
+    ('acceptance', 'AC %'),
+    ('hardest_solved', 'Hardest Solved'),
+    ('last_active', 'Last Active'),
+]
+TEAM_SORT_KEYS = [key for key, _ in TEAM_COLUMNS]
+# Smaller is better for these; the rest sort best (largest) first
+_ASCENDING_KEYS = {'handle', 'best_rank'}
+
+
+def parse_handles(text: str) -> List[str]:
+    """Handles separated by commas, semicolons or whitespace, without duplicates"""
+    handles, seen = [], set()
+    for handle in HANDLE_SEPARATORS.split(text or ''):
+        if handle and handle.lower() not in seen:
+            seen.add(handle.lower())
+            handles.append(handle)
+    return handles
+
+
+def _missing_handle(error: str, handles: List[str]) -> Optional[str]:
+    """The requested handle a failed user.info call complains about, if any"""
+    match = _NOT_FOUND.search(error or '')
+    if match:
+        missing = match.group(1).lower()
+        for handle in handles:
+            if handle.lower() == missing:
+                return handle
+    return None
+
+
+def _team_info_result(handles: List[str], result, error, not_found: List[str]):
+    """Next step of the batched user.info lookup: (users, error, handles to ask again)"""
+    if not error:
+        return {user['handle'].lower(): user for user in result}, None, None
+    missing = _missing_handle(error, handles)
+    if missing is None:
+        return None, error, None
+    not_found.append(missing)
+    return None, None, [handle for handle in handles if handle != missing]
+
+
+def fetch_team_info(handles: List[str]):
+    """Profiles of all handles from one user.info call; returns (users by lowercased handle, not found, error).
+
+    Handles that do not exist are dropped and the call repeated without them.
+    """
+    not_found = []
+    while handles:
+        result, error = call_api('user.info', {'handles': ';'.join(handles)})
+        users, error, handles = _team_info_result(handles, result, error, not_found)
+        if handles is None:
+            return users, not_found, error
+    return {}, not_found, None
+
+
+async def fetch_team_info_async(handles: List[str]):
+    """Async fetch_team_info"""
+    not_found = []
+    while handles:
+        result, error = await call_api_async('user.info', {'handles': ';'.join(handles)})
+        users, error, handles = _team_info_result(handles, result, error, not_found)
+        if handles is None:
+            return users, not_found, error
+    return {}, not_found, None
+
+
+def team_row(user_info: Dict, stats: Optional[Dict], rating_history: Optional[List], errors: Dict) -> Dict:
+    """One member's line of the comparison table (None where data is missing)"""
+    stats = stats or {}
+    row = {
+        'handle': user_info['handle'],
+        'rank': user_info.get('rank'),
+        'rating': user_info.get('rating'),
+        'max_rating': user_info.get('maxRating'),
+        'contests': None, 'last_change': None, 'best_rank': None,
+        'solved': stats.get('unique_problems_solved'),
+        'submissions': stats.get('total_submissions'),
+        'acceptance': None, 'hardest_solved': None, 'last_active': None,
+        'top_tags': [tag for tag, _ in stats['tags'].most_common(3)] if stats.get('tags') else [],
+        'errors': errors,
+    }
+    if rating_history is not None:
+        row['contests'] = len(rating_history)
+        if rating_history:
+            last = rating_history[-1]
+            row['last_change'] = last.get('newRating', 0) - last.get('oldRating', 0)
+            row['best_rank'] = min(change.get('rank', 0) for change in rating_history)
+    if stats.get('total_submissions'):
+        row['acceptance'] = round(stats['accepted_submissions'] / stats['total_submissions'] * 100, 1)
+    if stats.get('rating_distribution'):
+        row['hardest_solved'] = max(stats['rating_distribution'])
+    if stats.get('recent_activity'):
+        row['last_active'] = stats['recent_activity'][0]['timestamp']
+    return row
+
+
+def sort_rows(rows: List[Dict], key: str = 'rating') -> List[Dict]:
+    """Rows best first on a TEAM_SORT_KEYS column; members without a value come last"""
+    if key not in TEAM_SORT_KEYS:
+        key = 'rating'
+    known = [row for row in rows if row[key] is not None]
+    unknown = [row for row in rows if row[key] is None]
+    if key == 'handle':
+        known.sort(key=lambda row: row['handle'].lower())
+    else:
+        known.sort(key=lambda row: row[key], reverse=key not in _ASCENDING_KEYS)
+    return known + unknown
+
+
+def _member_data(handle: str):
+    """(stats, rating history, errors) of one member"""
+    try:
+        (stats, stats_error), (rating_history, rating_error) = (
+            get_user_stats(handle), fetch_user_rating_history(handle))
+    except Exception as e:
+        return None, None, {'stats': f"Unexpected error: {e}"}
+    return stats, rating_history, _member_errors(stats_error, rating_error)
+
+
+def _member_errors(stats_error: Optional[str], rating_error: Optional[str]) -> Dict:
+    errors = {}
+    if stats_error:
+        errors['stats'] = stats_error
+    if rating_error:
+        errors['rating_history'] = rating_error
+    return errors
+
+
+async def _member_data_async(handle: str, slots: asyncio.Semaphore):
+    async with slots:
+        (stats, stats_error), (rating_history, rating_error) = await asyncio.gather(
+            asyncio.to_thread(get_user_stats, handle), fetch_user_rating_history_async(handle))
+    return stats, rating_history, _member_errors(stats_error, rating_error)
+
+
+def _checked_handles(handles: List[str]) -> Tuple[List[str], Optional[str]]:
+    handles = parse_handles(';'.join(handles))
+    if not handles:
+        return handles, "No handles given"
+    if len(handles) > TEAM_MAX_HANDLES:
+        return handles, f"At most {TEAM_MAX_HANDLES} handles can be compared at once"
+    return handles, None
+
+
+def fetch_team_analytics(handles: List[str]):
+    """Return (comparison rows in input order, handles not found, error) for a team"""
+    handles, error = _checked_handles(handles)
+    if error:
+        return None, [], error
+    users, not_found, error = fetch_team_info(handles)
+    if error:
+        return None, not_found, error
+
+    print(f"Fetching submissions and rating histories of {len(users)} members...")
+    rows = []
+    fetches = fetch_in_order(list(users.values()), lambda user: _member_data(user['handle']),
+                             max_workers=TEAM_FETCH_WORKERS)
+    try:
+        for user, (stats, rating_history, errors) in fetches:
+            rows.append(team_row(user, stats, rating_history, errors))
+    finally:
+        fetches.close()
+    return rows, not_found, None
+
+
+async def fetch_team_analytics_async(handles: List[str]):
+    """fetch_team_analytics for async views: members are fetched as tasks on the event loop"""
+    handles, error = _checked_handles(handles)
+    if error:
+        return None, [], error
+    users, not_found, error = await fetch_team_info_async(handles)
+    if error:
+        return None, not_found, error
+
+    slots = asyncio.Semaphore(TEAM_FETCH_WORKERS)
+    outcomes = await asyncio.gather(*(_member_data_async(user['handle'], slots) for user in users.values()),
+                                    return_exceptions=True)
+    rows = []
+    for user, outcome in zip(users.values(), outcomes):
+        if isinstance(outcome, Exception):
+            outcome = None, None, {'stats': f"Unexpected error: {outcome}"}
+        rows.append(team_row(user, *outcome))
+    return rows, not_found, None
+
+
+def _cell(row: Dict, key: str) -> str:
+    value = row[key]
+    if value is None:
+        return '-'
+    if key == 'last_change':
+        return f"{value:+d}"
+    if key == 'last_active':
+        return datetime.fromtimestamp(value).strftime('%Y-%m-%d')
+    return str(value)
+
+
+def display_team_table(rows: List[Dict]):
+    """Print the comparison table"""
+    headings = [heading for _, heading in TEAM_COLUMNS]
+    cells = [[_cell(row, key) for key, _ in TEAM_COLUMNS] for row in rows]
+    widths = [max([len(heading)] + [len(line[i]) for line in cells]) for i, heading in enumerate(headings)]
+
+    print("\n" + "=" * (sum(widths) + 2 * len(widths)))
+    print("  ".join(heading.ljust(width) for heading, width in zip(headings, widths)))
+    print("-" * (sum(widths) + 2 * len(widths)))
+    for row, line in zip(rows, cells):
+        print("  ".join(cell.ljust(width) for cell, width in zip(line, widths)))
+        for name, error in row['errors'].items():
+            print(f"    {row['handle']}: could not fetch {name.replace('_', ' ')}: {error}")
+    print("=" * (sum(widths) + 2 * len(widths)))
+
+
+def get_team_handles() -> List[str]:
+    """Ask for the handles to compare"""
+    try:
+        text = input(f"\nEnter up to {TEAM_MAX_HANDLES} handles (separated by spaces or commas): ")
+    except KeyboardInterrupt:
+        print("\nReturning to main menu...")
+        return []
+    return parse_handles(text)
+
+
+def show_team_analytics(handles: List[str], pause: bool = True):
+    """Team comparison for the terminal application"""
+    print(f"\n=== TEAM COMPARISON: {len(handles)} HANDLES ===")
+    rows, not_found, error = fetch_team_analytics(handles)
+    if not_found:
+        print(f"Handles not found: {', '.join(not_found)}")
+    if error:
+        print(f"Error fetching team: {error}")
+    elif not rows:
+        print("None of the handles exist.")
+    else:
+        display_team_table(sort_rows(rows))
+    if pause:
+        input("\nPress Enter to return to main menu...")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python team_analytics.py HANDLE [HANDLE...]")
+    show_team_analytics(sys.argv[1:], pause=False)
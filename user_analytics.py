@@ -1,161 +1,405 @@
-import requests
+import asyncio
+import hashlib
+import heapq
+import itertools
 import json
-from collections import defaultdict, Counter
-from datetime import datetime
-import sys
-
-def fetch_user_info(username: str):
-    """Fetch user basic information"""
-    try:
-        url = f"https://codeforces.com/api/user.info?handles={username}"
-        response = requests.get(url, timeout=10)
-
-        if response.status_code != 200:
-            return None, f"HTTP Error {response.status_code}"
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+import analytics_columnar
+import metrics
+from activity_timeline import RatingTimeline, SubmissionTimeline, rating_activity, submission_activity
+from cf_api import call_api, call_api_async
+from config import COLUMNAR_MIN_SUBMISSIONS
+from records import Submission, as_submissions, recent_activity_entry
+from solved_set import SolvedSet
+from submission_store import sync_submissions, load_submissions
+
+def _first_user(result, error):
+    if error:
+        return None, error
 
-        data = response.json()
-        if data['status'] != 'OK':
-            return None, data.get('comment', 'Unknown API error')
+    if not result:
+        return None, "User not found"
 
-        if not data['result']:
-            return None, "User not found"
+    return result[0], None
 
-        return data['result'][0], None
+def fetch_user_info(username: str):
+    """Fetch user basic information"""
+    return _first_user(*call_api('user.info', {'handles': username}))
 
-    except requests.exceptions.Timeout:
-        return None, "Request timeout"
-    except requests.exceptions.RequestException as e:
-        return None, f"Network error: {e}"
-    except Exception as e:
-        return None, f"Unexpected error: {e}"
+async def fetch_user_info_async(username: str):
+    """Async fetch_user_info"""
+    return _first_user(*await call_api_async('user.info', {'handles': username}))
 
 def fetch_user_submissions(username: str, count: int = 1000):
     """Fetch user submissions"""
-    try:
-        print(f"Fetching submissions for {username}...")
-        url = f"https://codeforces.com/api/user.status?handle={username}&from=1&count={count}"
-        response = requests.get(url, timeout=15)
-
-        if response.status_code != 200:
-            return None, f"HTTP Error {response.status_code}"
-
-        data = response.json()
-        if data['status'] != 'OK':
-            return None, data.get('comment', 'Unknown API error')
-
-        return data['result'], None
-
-    except requests.exceptions.Timeout:
-        return None, "Request timeout"
-    except requests.exceptions.RequestException as e:
-        return None, f"Network error: {e}"
-    except Exception as e:
-        return None, f"Unexpected error: {e}"
+    print(f"Fetching submissions for {username}...")
+    return call_api('user.status', {'handle': username, 'from': 1, 'count': count})
 
 def fetch_user_rating_history(username: str):
     """Fetch user rating history"""
-    try:
-        url = f"https://codeforces.com/api/user.rating?handle={username}"
-        response = requests.get(url, timeout=10)
-
-        if response.status_code != 200:
-            return None, f"HTTP Error {response.status_code}"
-
-        data = response.json()
-        if data['status'] != 'OK':
-            return None, data.get('comment', 'Unknown API error')
-
-        return data['result'], None
-
-    except requests.exceptions.Timeout:
-        return None, "Request timeout"
-    except requests.exceptions.RequestException as e:
-        return None, f"Network error: {e}"
-    except Exception as e:
-        return None, f"Unexpected error: {e}"
+    return call_api('user.rating', {'handle': username})
+
+async def fetch_user_rating_history_async(username: str):
+    """Async fetch_user_rating_history"""
+    return await call_api_async('user.rating', {'handle': username})
+
+# Verdicts with their own counter; everything else goes to 'other_verdicts'
+VERDICT_STATS = {
+    'OK': 'accepted_submissions',
+    'WRONG_ANSWER': 'wrong_answer',
+    'TIME_LIMIT_EXCEEDED': 'time_limit_exceeded',
+    'RUNTIME_ERROR': 'runtime_error',
+    'COMPILATION_ERROR': 'compilation_error',
+}
+RECENT_ACTIVITY_SIZE = 10
+# Process-wide, so an aggregate's generation never repeats, even in a later aggregate
+_aggregate_generations = itertools.count(1)
+# Counters whose change means new or rejudged submissions (analytics_data_version)
+VERSION_COUNTERS = (['total_submissions'] + list(VERDICT_STATS.values()) +
+                    ['other_verdicts', 'unique_problems_solved', 'unique_problems_attempted'])
+
+def _recency(submission):
+    return (submission.creationTimeSeconds or 0, submission.id or 0)
+
+class SubmissionAggregate:
+    """Submission statistics that can be extended and combined without a rescan.
+
+    update() adds new submissions in O(new); merge() adds another aggregate
+    (another user, another time window) in O(size of its sets and counters).
+    """
+
+    def __init__(self, submissions=None):
+        self.total_submissions = 0
+        self.verdicts = Counter()
+        self.solved_problems = set()
+        self.attempted_problems = set()
+        self.languages = Counter()
+        self.tags = Counter()
+        self.rating_distribution = Counter()
+        self.contest_participation = set()
+        # (creationTimeSeconds, id, activity) of the most recent submissions
+        self.recent = []
+        self.max_id = None
+        # submissions still being judged; their verdict may change later
+        self.pending_ids = set()
+        # changes whenever the statistics do; caches built from them key on it
+        self.generation = next(_aggregate_generations)
+        if submissions:
+            self.update(submissions)
+
+    @classmethod
+    def from_submissions(cls, submissions):
+        """Build an aggregate, using the NumPy engine for large histories when available"""
+        aggregate = cls()
+        submissions = as_submissions(submissions)
+        if analytics_columnar.available() and len(submissions) >= COLUMNAR_MIN_SUBMISSIONS:
+            columns = analytics_columnar.SubmissionColumns(submissions)
+            vars(aggregate).update(analytics_columnar.aggregate_state(columns, RECENT_ACTIVITY_SIZE))
+        else:
+            aggregate.update(submissions)
+        return aggregate
+
+    def update(self, submissions):
+        """Add submissions (records or API dicts, any iterable) to the aggregate.
+
+        The submissions are read once and not kept, so they can come from a stream.
+        """
+        # min-heap of the newest submissions seen; -seq keeps earlier ones first on ties
+        newest = []
+        for seq, submission in enumerate(submissions):
+            if isinstance(submission, dict):
+                submission = Submission.from_api(submission)
+            entry = _recency(submission) + (-seq, submission)
+            if len(newest) < RECENT_ACTIVITY_SIZE:
+                heapq.heappush(newest, entry)
+            elif entry[:3] > newest[0][:3]:
+                heapq.heapreplace(newest, entry)
+
+            verdict = submission.verdict or 'UNKNOWN'
+            problem = submission.problem
+            key = problem.key if problem is not None else None
+
+            self.total_submissions += 1
+            self.verdicts[VERDICT_STATS.get(verdict, 'other_verdicts')] += 1
+
+            if key is not None:
+                self.attempted_problems.add(key)
+
+            # Count programming languages
+            self.languages[submission.programmingLanguage or 'Unknown'] += 1
+
+            # Solved problems, their tags and rating distribution
+            if verdict == 'OK':
+                if key is not None:
+                    self.solved_problems.add(key)
+                if problem is not None:
+                    for tag in problem.tags:
+                        self.tags[tag] += 1
+                    if problem.rating is not None:
+                        self.rating_distribution[(problem.rating // 100) * 100] += 1
+            elif verdict in ('UNKNOWN', 'TESTING'):
+                self.pending_ids.add(submission.id)
+
+            # Track contest participation
+            if submission.contestId:
+                self.contest_participation.add(submission.contestId)
+
+            if submission.id is not None and (self.max_id is None or submission.id > self.max_id):
+                self.max_id = submission.id
+
+        if newest:
+            self.generation = next(_aggregate_generations)
+        newest.sort(key=lambda entry: entry[:3], reverse=True)
+        self._keep_recent([(time, id, recent_activity_entry(s)) for time, id, _, s in newest])
+        return self
+
+    def merge(self, other: 'SubmissionAggregate'):
+        """Add the statistics of another aggregate to this one"""
+        self.total_submissions += other.total_submissions
+        self.verdicts.update(other.verdicts)
+        self.solved_problems |= other.solved_problems
+        self.attempted_problems |= other.attempted_problems
+        self.languages.update(other.languages)
+        self.tags.update(other.tags)
+        self.rating_distribution.update(other.rating_distribution)
+        self.contest_participation |= other.contest_participation
+        self.pending_ids |= other.pending_ids
+        if other.max_id is not None and (self.max_id is None or other.max_id > self.max_id):
+            self.max_id = other.max_id
+        self._keep_recent(other.recent)
+        self.generation = next(_aggregate_generations)
+        return self
+
+    def _keep_recent(self, entries):
+        if entries:
+            self.recent = heapq.nlargest(RECENT_ACTIVITY_SIZE, self.recent + entries,
+                                         key=lambda entry: entry[:2])
+
+    def to_stats(self):
+        """The statistics dict used by the templates and display functions"""
+        if not self.total_submissions:
+            return {}
+
+        stats = {'total_submissions': self.total_submissions}
+        for name in list(VERDICT_STATS.values()) + ['other_verdicts']:
+            stats[name] = self.verdicts[name]
+        stats.update({
+            'solved_problems': set(self.solved_problems),
+            'attempted_problems': set(self.attempted_problems),
+            'languages': Counter(self.languages),
+            'tags': Counter(self.tags),
+            'rating_distribution': Counter(self.rating_distribution),
+            'contest_participation': set(self.contest_participation),
+            'recent_activity': [dict(activity) for _, _, activity in self.recent],
+        })
+        stats['unique_problems_solved'] = len(self.solved_problems)
+        stats['unique_problems_attempted'] = len(self.attempted_problems)
+        stats['unsolved_attempts'] = stats['total_submissions'] - stats['accepted_submissions']
+        return stats
 
 def analyze_submissions(submissions):
     """Analyze user submissions for various statistics"""
     if not submissions:
         return {}
+    return SubmissionAggregate.from_submissions(submissions).to_stats()
+
+_user_aggregates = {}
+_user_aggregates_lock = threading.Lock()
+
+def _synced_aggregate(username: str):
+    """Sync a user's submissions and return (aggregate, sync error).
+
+    The user's aggregate is kept in memory and only updated with the
+    submissions added by the sync; it is rebuilt from the store when it
+    contains submissions that were still being judged.
+    """
+    _, sync_error = sync_submissions(username)
+
+    key = username.lower()
+    with _user_aggregates_lock:
+        aggregate = _user_aggregates.get(key)
+        metrics.CACHE_LOOKUPS.inc(cache='user_aggregate', result='miss' if aggregate is None or aggregate.pending_ids else 'hit')
+        with metrics.timed_phase('analyze'):
+            if aggregate is None or aggregate.pending_ids:
+                aggregate = SubmissionAggregate.from_submissions(load_submissions(username))
+            else:
+                aggregate.update(load_submissions(username, after_id=aggregate.max_id))
+        _user_aggregates[key] = aggregate
+    if sync_error:
+        print(f"Could not sync submissions for {username}, using stored data: {sync_error}")
+    return aggregate, sync_error
+
+def get_user_stats(username: str):
+    """Sync a user's submissions and return (stats, error)"""
+    aggregate, sync_error = _synced_aggregate(username)
+    with _user_aggregates_lock, metrics.timed_phase('analyze'):
+        stats = aggregate.to_stats()
+    if sync_error and not stats:
+        return None, sync_error
+    return stats, None
+
+_solved_sets = {}
+
+def _solved_set_of(username: str, aggregate):
+    """The user's cached SolvedSet, rebuilt when the aggregate changed; call with the lock held"""
+    key = username.lower()
+    generation, solved = _solved_sets.get(key, (None, None))
+    if generation != aggregate.generation:
+        solved = SolvedSet(aggregate.solved_problems)
+        _solved_sets[key] = (aggregate.generation, solved)
+    return solved
+
+def get_solved_set(username: str):
+    """Return (SolvedSet of the user's accepted problems, error).
+
+    The set is rebuilt only when the user's aggregate changed.
+    """
+    aggregate, sync_error = _synced_aggregate(username)
+    with _user_aggregates_lock:
+        if sync_error and aggregate.total_submissions == 0:
+            return None, sync_error
+        return _solved_set_of(username, aggregate), None
+
+def get_stats_and_solved_set(username: str):
+    """get_user_stats and get_solved_set with a single sync; returns (stats, SolvedSet, error)"""
+    aggregate, sync_error = _synced_aggregate(username)
+    with _user_aggregates_lock:
+        if sync_error and aggregate.total_submissions == 0:
+            return None, None, sync_error
+        with metrics.timed_phase('analyze'):
+            stats = aggregate.to_stats()
+        return stats, _solved_set_of(username, aggregate), None
+
+_user_timelines = {}
+
+def _timeline_of(username: str, aggregate):
+    """The user's cached SubmissionTimeline, brought up to the aggregate's submissions; call with the lock held"""
+    key = username.lower()
+    timeline = _user_timelines.get(key)
+    if timeline is not None and not timeline.pending_ids and timeline.max_id != aggregate.max_id:
+        if not timeline.extend(load_submissions(username, after_id=timeline.max_id)):
+            timeline = None
+    if timeline is None or timeline.pending_ids:
+        timeline = SubmissionTimeline(load_submissions(username))
+    _user_timelines[key] = timeline
+    return timeline
+
+def get_user_stats_with_activity(username: str):
+    """get_user_stats plus stats['activity']: windowed counts, heatmap and streaks (see activity_timeline)"""
+    aggregate, sync_error = _synced_aggregate(username)
+    with _user_aggregates_lock, metrics.timed_phase('analyze'):
+        stats = aggregate.to_stats()
+        if stats:
+            stats['activity'] = submission_activity(_timeline_of(username, aggregate))
+    if sync_error and not stats:
+        return None, sync_error
+    return stats, None
+
+_analytics_executor = ThreadPoolExecutor(max_workers=12, thread_name_prefix='analytics')
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result, error = func(*args)
+    return result, error, time.perf_counter() - start
+
+def fetch_user_analytics(username: str):
+    """Fetch user info, submission stats and rating history concurrently.
+
+    Returns a dict with 'user_info', 'stats' (with 'activity') and
+    'rating_history' (None when that call failed), 'rating_activity' (the
+    rating history over the activity windows), 'errors' (call name -> error)
+    and 'timings' (call name -> seconds). The page takes as long as the
+    slowest call.
+    """
+    calls = {
+        'user_info': (fetch_user_info, username),
+        'stats': (get_user_stats_with_activity, username),
+        'rating_history': (fetch_user_rating_history, username),
+    }
+    futures = {name: _analytics_executor.submit(_timed, *call) for name, call in calls.items()}
+
+    bundle = {'errors': {}, 'timings': {}}
+    for name, future in futures.items():
+        try:
+            result, error, elapsed = future.result()
+        except Exception as e:
+            result, error, elapsed = None, f"Unexpected error: {e}", None
+        _add_to_bundle(bundle, name, result, error, elapsed)
+    _add_rating_activity(bundle)
+    return bundle
+
+def _add_rating_activity(bundle):
+    if bundle['rating_history'] is not None:
+        bundle['rating_activity'] = rating_activity(RatingTimeline(bundle['rating_history']))
+    else:
+        bundle['rating_activity'] = None
 
-    stats = {
-        'total_submissions': len(submissions),
-        'accepted_submissions': 0,
-        'wrong_answer': 0,
-        'time_limit_exceeded': 0,
-        'runtime_error': 0,
-        'compilation_error': 0,
-        'other_verdicts': 0,
-        'solved_problems': set(),
-        'attempted_problems': set(),
-        'languages': Counter(),
-        'tags': Counter(),
-        'rating_distribution': Counter(),
-        'contest_participation': set(),
-        'recent_activity': []
+def _add_to_bundle(bundle, name, result, error, elapsed):
+    bundle[name] = result
+    if error:
+        bundle['errors'][name] = error
+    if elapsed is not None:
+        bundle['timings'][name] = elapsed
+
+async def _timed_async(call):
+    start = time.perf_counter()
+    result, error = await call
+    return result, error, time.perf_counter() - start
+
+async def fetch_user_analytics_async(username: str):
+    """fetch_user_analytics for async views: the three calls run as tasks on the event loop.
+
+    The submission sync (paged API calls plus the SQLite store) runs on a
+    worker thread. Returns the same bundle as fetch_user_analytics.
+    """
+    calls = {
+        'user_info': fetch_user_info_async(username),
+        'stats': asyncio.to_thread(get_user_stats_with_activity, username),
+        'rating_history': fetch_user_rating_history_async(username),
     }
+    outcomes = await asyncio.gather(*(_timed_async(call) for call in calls.values()), return_exceptions=True)
 
-    for submission in submissions:
-        verdict = submission.get('verdict', 'UNKNOWN')
-
-        # Count verdicts
-        if verdict == 'OK':
-            stats['accepted_submissions'] += 1
-            # Add solved problem
-            problem = submission.get('problem', {})
-            if 'contestId' in problem and 'index' in problem:
-                stats['solved_problems'].add((problem['contestId'], problem['index']))
-        elif verdict == 'WRONG_ANSWER':
-            stats['wrong_answer'] += 1
-        elif verdict == 'TIME_LIMIT_EXCEEDED':
-            stats['time_limit_exceeded'] += 1
-        elif verdict == 'RUNTIME_ERROR':
-            stats['runtime_error'] += 1
-        elif verdict == 'COMPILATION_ERROR':
-            stats['compilation_error'] += 1
+    bundle = {'errors': {}, 'timings': {}}
+    for name, outcome in zip(calls, outcomes):
+        if isinstance(outcome, Exception):
+            result, error, elapsed = None, f"Unexpected error: {outcome}", None
         else:
-            stats['other_verdicts'] += 1
-
-        # Add attempted problem
-        problem = submission.get('problem', {})
-        if 'contestId' in problem and 'index' in problem:
-            stats['attempted_problems'].add((problem['contestId'], problem['index']))
-
-        # Count programming languages
-        lang = submission.get('programmingLanguage', 'Unknown')
-        stats['languages'][lang] += 1
-
-        # Count problem tags (only for solved problems)
-        if verdict == 'OK' and problem:
-            tags = problem.get('tags', [])
-            for tag in tags:
-                stats['tags'][tag] += 1
-
-            # Count rating distribution
-            if 'rating' in problem:
-                rating_range = (problem['rating'] // 100) * 100
-                stats['rating_distribution'][rating_range] += 1
-
-        # Track contest participation
-        if submission.get('contestId'):
-            stats['contest_participation'].add(submission['contestId'])
-
-        # Recent activity (last 10 submissions)
-        if len(stats['recent_activity']) < 10:
-            stats['recent_activity'].append({
-                'problem_name': problem.get('name', 'Unknown'),
-                'verdict': verdict,
-                'contest_id': submission.get('contestId'),
-                'index': problem.get('index'),
-                'timestamp': submission.get('creationTimeSeconds')
-            })
-
-    stats['unique_problems_solved'] = len(stats['solved_problems'])
-    stats['unique_problems_attempted'] = len(stats['attempted_problems'])
-    stats['unsolved_attempts'] = stats['total_submissions'] - stats['accepted_submissions']
-
-    return stats
+            result, error, elapsed = outcome
+        _add_to_bundle(bundle, name, result, error, elapsed)
+    _add_rating_activity(bundle)
+    return bundle
+
+# user.info fields shown on the analytics page
+DISPLAYED_USER_FIELDS = ('handle', 'firstName', 'lastName', 'country', 'organization', 'rating',
+                         'maxRating', 'rank', 'maxRank', 'contribution', 'friendOfCount')
+
+def analytics_data_version(bundle):
+    """Short hash of everything fetch_user_analytics returned that the page shows.
+
+    Cheap to compute: new or rejudged submissions change the verdict
+    counters (every one of them, so a rejudge from one failing verdict to
+    another counts too), the solved/attempted totals or the verdicts in the
+    recent activity; new contests change the rating history length and last
+    update time. The date is included because the activity windows end today.
+    """
+    user_info = bundle['user_info'] or {}
+    stats = bundle['stats'] or {}
+    rating_history = bundle['rating_history'] or []
+    key = [
+        [user_info.get(field) for field in DISPLAYED_USER_FIELDS],
+        [stats.get(name) for name in VERSION_COUNTERS],
+        [(activity['timestamp'], activity['verdict']) for activity in stats.get('recent_activity') or ()],
+        len(rating_history),
+        rating_history[-1].get('ratingUpdateTimeSeconds') if rating_history else None,
+        sorted(bundle['errors']),
+        date.today().isoformat(),
+    ]
+    return hashlib.sha1(json.dumps(key, default=str).encode('utf-8')).hexdigest()[:16]
 
 def display_user_info(user_info):
     """Display user basic information"""
@@ -280,6 +524,28 @@ def display_recent_activity(stats):
 
         print(f"{i:2d}. {verdict_emoji} {activity['problem_name'][:40]} ({problem_id}) [{timestamp_str}]")
 
+def display_activity(activity, rating_windows=None):
+    """Display the activity windows and streaks"""
+    if not activity:
+        return
+
+    print("\n" + "="*60)
+    print("                ACTIVITY OVER TIME")
+    print("="*60)
+
+    print(f"{'Window':<10}{'Subs':>7}{'AC':>7}{'Solved':>8}{'Days':>6}{'Contests':>10}{'Rating':>8}")
+    rating_windows = rating_windows or [None] * len(activity['windows'])
+    for window, rating_window in zip(activity['windows'], rating_windows):
+        contests, change = '-', '-'
+        if rating_window is not None:
+            contests = str(rating_window['contests'])
+            change = f"{rating_window['rating_change']:+d}" if rating_window['contests'] else '-'
+        print(f"{window['days']:>3} days  {window['submissions']:>7}{window['accepted']:>7}"
+              f"{window['newly_solved']:>8}{window['active_days']:>6}{contests:>10}{change:>8}")
+
+    print(f"\nCurrent streak: {activity['current_streak']} days")
+    print(f"Longest streak: {activity['longest_streak']} days")
+
 def display_contest_performance(rating_history):
     """Display contest performance"""
     if not rating_history:
@@ -320,48 +586,41 @@ def show_user_analytics(username: str):
     """Main user analytics function"""
     print(f"\n=== USER ANALYTICS FOR: {username} ===")
 
-    # Fetch user information
-    print("Fetching user information...")
-    user_info, error = fetch_user_info(username)
-    if error:
-        print(f"Error fetching user info: {error}")
+    # Fetch user information, submissions and rating history at once
+    print("Fetching user information, submissions and contest performance...")
+    bundle = fetch_user_analytics(username)
+    errors = bundle['errors']
+    timings = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in bundle['timings'].items())
+    print(f"Fetched in: {timings}")
+
+    if 'user_info' in errors:
+        print(f"Error fetching user info: {errors['user_info']}")
         print("Please check if the username is correct and try again.")
         input("\nPress Enter to return to main menu...")
         return
 
     # Display user information
-    display_user_info(user_info)
+    display_user_info(bundle['user_info'])
 
-    # Fetch submissions
-    submissions, error = fetch_user_submissions(username, 1000)
-    if error:
-        print(f"\nError fetching submissions: {error}")
-        input("\nPress Enter to return to main menu...")
-        return
-
-    if not submissions:
+    stats = bundle['stats']
+    if 'stats' in errors:
+        print(f"\nError fetching submissions: {errors['stats']}")
+    elif not stats:
         print("\nNo submissions found for this user.")
-        input("\nPress Enter to return to main menu...")
-        return
-
-    # Analyze submissions
-    print("\nAnalyzing submissions...")
-    stats = analyze_submissions(submissions)
-
-    # Display all statistics
-    display_submission_stats(stats)
-    display_language_stats(stats)
-    display_tag_distribution(stats)
-    display_rating_distribution(stats)
-    display_recent_activity(stats)
-
-    # Fetch and display contest performance
-    print("\nFetching contest performance...")
-    rating_history, error = fetch_user_rating_history(username)
-    if not error:
-        display_contest_performance(rating_history)
     else:
-        print(f"Could not fetch rating history: {error}")
+        # Display all statistics
+        display_submission_stats(stats)
+        display_language_stats(stats)
+        display_tag_distribution(stats)
+        display_rating_distribution(stats)
+        display_recent_activity(stats)
+        display_activity(stats.get('activity'), bundle['rating_activity'])
+
+    # Display contest performance
+    if 'rating_history' not in errors:
+        display_contest_performance(bundle['rating_history'])
+    else:
+        print(f"Could not fetch rating history: {errors['rating_history']}")
 
     print("\n" + "="*60)
     print("                 ANALYSIS COMPLETE")